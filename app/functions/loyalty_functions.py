@@ -1,5 +1,7 @@
 import os
-from ..utils.sheets_base import GoogleSheetsBase
+from ..storage import StorageBackend, get_storage_backend
+from ..utils.stamp_ledger import stamp_ledger
+from ..utils.tool_result_cache import tool_result_cache
 from typing import Dict, List, Optional, Any
 from datetime import datetime
 import json
@@ -9,27 +11,38 @@ import asyncio
 
 logger = logging.getLogger(__name__)
 
-class LoyaltySheet(GoogleSheetsBase):
-    def __init__(self):
-        super().__init__(
-            sheet_id=os.getenv('LOYALTY_SHEET_ID'),
-            range_name='Sheet1!A2:F'
-        )
+class LoyaltySheet:
+    """Loyalty stamps, kept in the configured storage backend (Google Sheets by default)"""
+    def __init__(self, backend: Optional[StorageBackend] = None):
+        self._backend = backend
+
+    @property
+    def backend(self) -> StorageBackend:
+        """Lazy load the storage backend"""
+        if self._backend is None:
+            self._backend = get_storage_backend()
+        return self._backend
+
+    @staticmethod
+    def _current_stamps(customer: Dict[str, Any]) -> int:
+        """Get the stored stamp balance"""
+        # The backend's value wins, so corrections made in the sheet and writes by other
+        # workers are counted from; the ledger only orders updates and keeps the audit trail
+        return int(customer.get('stamps') or 0)
 
     async def get_stamp_loyalty(self, nomor_telepon: str) -> dict:
         """Get loyalty stamp information for a customer by phone number"""
         try:
-            values = await self.get_values()
-            for row in values:
-                if len(row) > 1 and row[1] == nomor_telepon:
-                    return {
-                        "status": "success",
-                        "data": {
-                            "nama": row[0],
-                            "nomor_telepon": row[1],
-                            "jumlah_stamp": row[3],
-                        }
+            customer = await self.backend.get_customer(nomor_telepon)
+            if customer:
+                return {
+                    "status": "success",
+                    "data": {
+                        "nama": customer['name'],
+                        "nomor_telepon": customer['phone'],
+                        "jumlah_stamp": str(self._current_stamps(customer)),
                     }
+                }
             
             return {
                 "status": "not_found",
@@ -46,29 +59,29 @@ class LoyaltySheet(GoogleSheetsBase):
         """Add loyalty stamps to specific customer's account"""
         print(f"Adding {stamps_to_add} stamps to {phone_number}")
         try:
-            values = await self.get_values()
-            if not values:
-                return {"success": False, "error": "No values found in sheet"}
-            
-            # Find the customer's row
-            for row_index, row in enumerate(values):
-                if len(row) > 1 and row[1] == phone_number:
-                    current_stamps = int(row[3]) if len(row) > 3 else 0
-                    new_stamps = current_stamps + stamps_to_add
-                    
-                    # Update stamps in the loyalty sheet (row_index + 2 because data starts at row 2)
-                    await self.update_values(
-                        f'Sheet1!D{row_index + 2}',
-                        [[str(new_stamps)]]
-                    )
-                    return {
-                        "success": True,
-                        "previous_stamps": current_stamps,
-                        "added_stamps": stamps_to_add,
-                        "current_stamps": new_stamps
-                    }
-            
-            return {"success": False, "error": "Customer not found"}
+            # Updates for the same phone are applied one at a time, in arrival order
+            async with stamp_ledger.lock_for(phone_number):
+                customer = await self.backend.get_customer(phone_number)
+                if not customer:
+                    return {"success": False, "error": "Customer not found"}
+
+                current_stamps = self._current_stamps(customer)
+                new_stamps = current_stamps + stamps_to_add
+
+                # Store the new balance first, then record the change in the ledger
+                await self.backend.set_stamps(phone_number, new_stamps)
+                await self.backend.append_stamp_event(
+                    stamp_ledger.record(phone_number, stamps_to_add, current_stamps)
+                )
+                # Cached stamp lookups would show the old balance
+                tool_result_cache.invalidate("get_stamp_loyalty")
+
+            return {
+                "success": True,
+                "previous_stamps": current_stamps,
+                "added_stamps": stamps_to_add,
+                "current_stamps": new_stamps
+            }
         
         except Exception as e:
             print(f"Error adding stamps: {str(e)}")
@@ -80,13 +93,124 @@ loyalty_sheet = LoyaltySheet()
 # Expose function at module level for backward compatibility
 get_stamp_loyalty = loyalty_sheet.get_stamp_loyalty
 
-class InvoiceSheet(GoogleSheetsBase):
-    def __init__(self):
-        super().__init__(
-            sheet_id="1n0mHlQRbFOVSoykTwUuGIFb9AFbvV9XEHeiJM69Wo5s",
-            range_name='Sheet1!A2:E'  # A-E for ID, Total, Claimed, Claimed By, Claimed At columns
+class InvoiceSheet:
+    """Invoice claims, kept in the configured storage backend (Google Sheets by default)"""
+    def __init__(self, backend: Optional[StorageBackend] = None):
+        self._backend = backend
+        # Stamps are added through the loyalty sheet sharing this backend
+        self.loyalty_sheet = loyalty_sheet if backend is None else LoyaltySheet(backend)
+        # Serializes claims so the same invoice can't be claimed twice concurrently
+        self._claim_lock: Optional[asyncio.Lock] = None
+
+    @property
+    def backend(self) -> StorageBackend:
+        """Lazy load the storage backend"""
+        if self._backend is None:
+            self._backend = get_storage_backend()
+        return self._backend
+
+    @staticmethod
+    def _clean_invoice_id(invoice: Dict[str, Any]) -> str:
+        invoice_id = invoice.get("id", "").strip()
+        # Remove '#' from the beginning of invoice ID if present
+        if invoice_id.startswith('#'):
+            invoice_id = invoice_id[1:]
+        return invoice_id
+
+    async def _claim_invoices(self, invoices: List[Dict[str, Any]], phone_number: str, customer_name: str, phone_logger) -> Dict[str, Any]:
+        """Check and claim invoices with one lookup and one claim write
+
+        Must be called while holding the claim lock.
+        """
+        existing_invoices = await self.backend.get_invoices(
+            [self._clean_invoice_id(invoice) for invoice in invoices]
         )
 
+        # Check if any invoice has been claimed
+        claimed_invoices = []
+        for invoice in invoices:
+            invoice_id = self._clean_invoice_id(invoice)
+            logger.info(f"[DEBUG] Checking invoice {invoice_id}")
+            
+            if not invoice_id:
+                logger.warning(f"[DEBUG] Invoice missing ID: {json.dumps(invoice, default=str)}")
+                continue
+                
+            if invoice_id in existing_invoices and existing_invoices[invoice_id]["claimed"]:
+                claimed_by = existing_invoices[invoice_id]["claimed_by"]
+                claimed_invoices.append({
+                    "id": invoice_id,
+                    "claimed_by": claimed_by
+                })
+
+        if claimed_invoices:
+            claimed_details = "\n".join([
+                f"- Invoice {inv['id']} telah diklaim oleh {inv['claimed_by']}"
+                for inv in claimed_invoices
+            ])
+            if phone_logger:
+                phone_logger.warning(f"Found {len(claimed_invoices)} previously claimed invoices")
+            return {
+                "status": "has_been_claimed",
+                "message": f"Beberapa invoice telah diklaim sebelumnya:\n{claimed_details}",
+                "claimed_invoices": claimed_invoices
+            }
+
+        # Continue with existing processing for unclaimed invoices
+        total_amount = 0
+        processed_invoices = []
+        current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        claimed_by = f"{customer_name} ({phone_number})"
+        new_invoices = []
+        updated_invoices = []
+        
+        for invoice in invoices:
+            # Extract invoice ID and total
+            invoice_id = self._clean_invoice_id(invoice)
+            invoice_total_raw = invoice.get("total", "0").strip()
+            
+            # Skip empty invoice IDs
+            if not invoice_id:
+                if phone_logger:
+                    phone_logger.warning("Skipping invoice with empty ID")
+                continue
+            
+            # Skip invoices listed more than once in the same claim
+            if invoice_id in processed_invoices:
+                continue
+            
+            # Parse invoice total
+            try:
+                # Remove any non-numeric characters except decimal point
+                invoice_total_clean = ''.join(c for c in invoice_total_raw if c.isdigit() or c == '.')
+                invoice_total = float(invoice_total_clean)
+            except ValueError:
+                if phone_logger:
+                    phone_logger.error(f"Failed to parse invoice total: {invoice_total_raw}")
+                continue
+            
+            if not invoice_id or not invoice_total:
+                continue
+            
+            if invoice_id not in existing_invoices:
+                # Add new invoice with claim details
+                new_invoices.append({"id": invoice_id, "total": invoice_total})
+                total_amount += invoice_total
+                processed_invoices.append(invoice_id)
+            elif not existing_invoices[invoice_id]["claimed"]:
+                # Update existing unclaimed invoice
+                updated_invoices.append(invoice_id)
+                total_amount += invoice_total
+                processed_invoices.append(invoice_id)
+
+        if new_invoices or updated_invoices:
+            await self.backend.claim_invoices(new_invoices, updated_invoices, claimed_by, current_time)
+
+        return {
+            "total_amount": total_amount,
+            "processed_invoices": processed_invoices
+        }
+
     async def process_invoices(self, **kwargs) -> Dict:
         """Process invoices and update loyalty stamps"""
         try:
@@ -121,111 +245,15 @@ class InvoiceSheet(GoogleSheetsBase):
                     "message": "Nomor telepon diperlukan dalam metadata"
                 }
 
-            # Get current invoice data
-            values = await self.get_values()
-            existing_invoices = {
-                row[0]: {
-                    "total": row[1], 
-                    "claimed": row[2].lower() == "true",
-                    "claimed_by": row[3] if len(row) > 3 else None,
-                    "claimed_at": row[4] if len(row) > 4 else None
-                } 
-                for row in values if len(row) >= 3
-            }
-            
-            # Check if any invoice has been claimed
-            claimed_invoices = []
-            for invoice in invoices:
-                invoice_id = invoice.get("id", "").strip()
-                logger.info(f"[DEBUG] Checking invoice {invoice_id}")
-                
-                # Remove '#' from the beginning of invoice ID if present
-                if invoice_id.startswith('#'):
-                    invoice_id = invoice_id[1:]
-                
-                if not invoice_id:
-                    logger.warning(f"[DEBUG] Invoice missing ID: {json.dumps(invoice, default=str)}")
-                    continue
-                    
-                if invoice_id in existing_invoices and existing_invoices[invoice_id]["claimed"]:
-                    claimed_by = existing_invoices[invoice_id]["claimed_by"]
-                    claimed_invoices.append({
-                        "id": invoice_id,
-                        "claimed_by": claimed_by
-                    })
-
-            if claimed_invoices:
-                claimed_details = "\n".join([
-                    f"- Invoice {inv['id']} telah diklaim oleh {inv['claimed_by']}"
-                    for inv in claimed_invoices
-                ])
-                if phone_logger:
-                    phone_logger.warning(f"Found {len(claimed_invoices)} previously claimed invoices")
-                return {
-                    "status": "has_been_claimed",
-                    "message": f"Beberapa invoice telah diklaim sebelumnya:\n{claimed_details}",
-                    "claimed_invoices": claimed_invoices
-                }
+            if self._claim_lock is None:
+                self._claim_lock = asyncio.Lock()
 
-            # Continue with existing processing for unclaimed invoices
-            total_amount = 0
-            processed_invoices = []
-            current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            
-            for invoice in invoices:
-                # Extract invoice ID and total
-                invoice_id = invoice.get("id", "").strip()
-                invoice_total_raw = invoice.get("total", "0").strip()
-                
-                # Remove '#' from the beginning of invoice ID if present
-                if invoice_id.startswith('#'):
-                    invoice_id = invoice_id[1:]
-                
-                # Skip empty invoice IDs
-                if not invoice_id:
-                    if phone_logger:
-                        phone_logger.warning("Skipping invoice with empty ID")
-                    continue
-                
-                # Parse invoice total
-                try:
-                    # Remove any non-numeric characters except decimal point
-                    invoice_total_clean = ''.join(c for c in invoice_total_raw if c.isdigit() or c == '.')
-                    invoice_total = float(invoice_total_clean)
-                except ValueError:
-                    if phone_logger:
-                        phone_logger.error(f"Failed to parse invoice total: {invoice_total_raw}")
-                    continue
-                
-                if not invoice_id or not invoice_total:
-                    continue
-                
-                if invoice_id not in existing_invoices:
-                    # Add new invoice with claim details
-                    await self.append_values([
-                        [
-                            invoice_id, 
-                            str(invoice_total), 
-                            "true",
-                            f"{customer_name} ({phone_number})",
-                            current_time
-                        ]
-                    ])
-                    total_amount += invoice_total
-                    processed_invoices.append(invoice_id)
-                elif not existing_invoices[invoice_id]["claimed"]:
-                    # Update existing unclaimed invoice
-                    row_num = next(i for i, row in enumerate(values) if row[0] == invoice_id) + 2
-                    await self.update_values(
-                        f'Sheet1!C{row_num}:E{row_num}',
-                        [[
-                            "true",
-                            f"{customer_name} ({phone_number})",
-                            current_time
-                        ]]
-                    )
-                    total_amount += invoice_total
-                    processed_invoices.append(invoice_id)
+            async with self._claim_lock:
+                claim_result = await self._claim_invoices(invoices, phone_number, customer_name, phone_logger)
+            if claim_result.get("status") == "has_been_claimed":
+                return claim_result
+            total_amount = claim_result["total_amount"]
+            processed_invoices = claim_result["processed_invoices"]
 
             # Calculate and add loyalty stamps
             stamps_added = 0
@@ -234,7 +262,7 @@ class InvoiceSheet(GoogleSheetsBase):
             if total_amount > 0:
                 stamps_to_add = int(total_amount // 50000)
                 if stamps_to_add > 0:
-                    stamp_result = await loyalty_sheet.add_stamps(phone_number, stamps_to_add)
+                    stamp_result = await self.loyalty_sheet.add_stamps(phone_number, stamps_to_add)
                     if stamp_result["success"]:
                         previous_stamps = stamp_result["previous_stamps"]
                         stamps_added = stamp_result["added_stamps"]
@@ -252,7 +280,7 @@ class InvoiceSheet(GoogleSheetsBase):
                 max_retries = 3
                 
                 while retry_count < max_retries:
-                    stamp_info = await loyalty_sheet.get_stamp_loyalty(phone_number)
+                    stamp_info = await self.loyalty_sheet.get_stamp_loyalty(phone_number)
                     if stamp_info["status"] == "success":
                         current_stamps = int(stamp_info["data"]["jumlah_stamp"])
                         if phone_logger:
@@ -12,6 +12,17 @@ import docx
 from .routers import assistant_router
 from .routers import whatsapp
 from .utils.app_logger import app_logger, log_request
+from .storage import get_storage_backend, STORAGE_BACKEND, STORAGE_SHEETS_MIRROR
+from .utils.sheets_rate_limiter import sheets_rate_limiter
+from .utils.sheets_client import sheets_client
+from .services.openai_client import openai_client
+from .services.run_poller import run_poller
+from .services.thread_pool import warm_thread_pool
+from .services.job_queue import chat_job_queue
+from .services.run_serializer import thread_run_serializer
+from .services.thread_rotation import thread_rotation
+from .utils.tool_result_cache import tool_result_cache
+from .utils.usage_store import usage_store
 import datetime
 
 # Load environment variables from .env file
@@ -22,6 +33,89 @@ app = FastAPI()
 app.include_router(assistant_router.router)
 app.include_router(whatsapp.router)
 
+@app.on_event("startup")
+async def warm_up_sheets_client():
+    """Build the Sheets service and fetch a token before the first webhook needs them"""
+    if STORAGE_BACKEND == 'sheets' or STORAGE_SHEETS_MIRROR:
+        await sheets_client.warm_up()
+
+@app.on_event("startup")
+async def start_storage_backend():
+    """Start storage background work, e.g. syncing hand edits made in the loyalty sheet"""
+    await get_storage_backend().start()
+
+@app.on_event("shutdown")
+async def drain_chat_jobs():
+    """Let queued background chats finish while storage and the OpenAI client are still open"""
+    await chat_job_queue.stop()
+
+@app.on_event("shutdown")
+async def close_storage_backend():
+    """Flush pending storage writes (e.g. write-behind Google Sheets updates) before the process exits"""
+    await get_storage_backend().close()
+
+@app.on_event("startup")
+async def start_thread_pool():
+    """Pre-create OpenAI threads so first messages don't wait for threads.create"""
+    await warm_thread_pool.start()
+
+@app.on_event("startup")
+async def replay_chat_jobs():
+    """Run the background chats a previous process accepted but didn't finish"""
+    await chat_job_queue.replay()
+
+@app.on_event("shutdown")
+async def stop_thread_pool():
+    """Stop refilling the thread pool before the OpenAI client closes"""
+    await warm_thread_pool.stop()
+
+@app.on_event("shutdown")
+async def close_openai_client():
+    """Close the pooled OpenAI connections"""
+    await openai_client.close()
+
+@app.get("/metrics/sheets")
+async def sheets_metrics():
+    """Google Sheets quota usage: requests, time queued for the quota, 429s and retries"""
+    return sheets_rate_limiter.metrics()
+
+@app.get("/metrics/openai")
+async def openai_metrics():
+    """OpenAI run polling (runs waited for, status polls made, timeouts), the tool result cache,
+    the warm thread pool, per-thread run serialization and thread rotation"""
+    return {
+        "polling": run_poller.metrics(),
+        "tool_cache": tool_result_cache.metrics(),
+        "thread_pool": warm_thread_pool.metrics(),
+        "runs": thread_run_serializer.metrics(),
+        "rotation": thread_rotation.metrics()
+    }
+
+@app.get("/metrics/jobs")
+async def job_metrics():
+    """Background chat queue: depth, admissions, refusals (429s), replays, queue wait and execution times,
+    and journalled jobs by state"""
+    return chat_job_queue.metrics()
+
+@app.get("/metrics/usage")
+async def usage_metrics(group_by: str = "phone", days: Optional[float] = 7, limit: int = 20):
+    """Assistant run tokens and cost in the last `days` days, totalled and per assistant, thread,
+    phone, model or tool (group_by), most expensive first"""
+    if usage_store is None:
+        raise HTTPException(status_code=404, detail="Usage recording is turned off (USAGE_DB_PATH is empty)")
+    try:
+        groups = usage_store.summary(group_by, days, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"days": days, "totals": usage_store.totals(days), "group_by": group_by, "groups": groups}
+
+@app.get("/metrics/usage/runs")
+async def usage_runs(thread_id: Optional[str] = None, phone_number: Optional[str] = None, limit: int = 50):
+    """The latest runs of a thread or customer with their tokens, cost, duration and functions called"""
+    if usage_store is None:
+        raise HTTPException(status_code=404, detail="Usage recording is turned off (USAGE_DB_PATH is empty)")
+    return usage_store.runs(thread_id, phone_number, limit)
+
 # Configure logging middleware
 @app.middleware("http")
 async def log_request_middleware(request: Request, call_next):
@@ -22,6 +22,9 @@ class Action(BaseModel):
     auth_type: Optional[str] = None
     auth_key: Optional[str] = None
     function_path: Optional[str] = None  # Format: "module_name.function_name"
+    timeout: Optional[float] = None  # Seconds; defaults to OPENAI_TOOL_TIMEOUT
+    cache_ttl: Optional[float] = None  # Seconds to reuse results for the same arguments; not cached if unset
+    read_only: bool = False  # Only reads data, so it may be cancelled at its time limit; writers never are
     
     class Config:
         arbitrary_types_allowed = True
@@ -56,6 +59,7 @@ class AssistantResponse(BaseModel):
 class RunStatus(BaseModel):
     status: str
     response_data: Optional[Dict[str, Any]] = None
+    polls: Optional[int] = None  # Number of status requests made while waiting for the run
 
 class TextContent(BaseModel):
     type: Literal["text"] = "text"
@@ -94,8 +98,10 @@ class ChatRequest(BaseModel):
     assistant_id: str
     thread_id: Optional[str] = None
     messages: List[ChatMessage]
+    timeout: Optional[float] = None  # Seconds to reply within; defaults to OPENAI_CHAT_BUDGET
+    phone_number: Optional[str] = None  # Customer the chat is for, used to attribute token usage
 
 class ChatResponse(BaseModel):
-    thread_id: str
+    thread_id: Optional[str] = None  # None only if time ran out before a new thread was created
     messages: Optional[List[ChatMessage]] = None
     status: str
@@ -2,6 +2,7 @@ from fastapi import APIRouter, HTTPException, Depends
 from ..models.assistant_models import AssistantConfig, AssistantResponse, Action, RunStatus, ThreadMessages, ChatRequest, ChatResponse, AssistantUpdateRequest
 from ..services.openai_service import OpenAIAssistantService
 from ..services.action_service import ActionService
+from ..services.job_queue import QueueFullError
 from typing import Dict
 from functools import lru_cache
 from ..models.manychat_models import ManyChatRequest, ManyChatResponse
@@ -143,6 +144,8 @@ async def handle_manychat(request: ManyChatRequest):
         service = OpenAIAssistantService()
         response = await service.manychat(request)
         return response
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
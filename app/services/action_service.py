@@ -1,4 +1,3 @@
-import asyncio
 import httpx
 from typing import Dict, Any, List, Callable
 from ..models.assistant_models import Action
@@ -6,12 +5,12 @@ import json
 from pathlib import Path
 import os
 from fastapi import HTTPException
-import importlib
 from functools import partial
+from .function_registry import function_registry, load_function
 
 class ActionService:
     _instance = None
-    _actions_file = Path("app/data/actions.json")
+    _actions_file = function_registry.actions_file
 
     def __new__(cls):
         if cls._instance is None:
@@ -24,41 +23,23 @@ class ActionService:
         self._actions_file.parent.mkdir(parents=True, exist_ok=True)
         if not self._actions_file.exists():
             self._save_actions({})
-        self._load_actions()
-        self._function_registry = {}
 
-    def _load_actions(self) -> None:
-        """Load actions from JSON file."""
-        try:
-            with open(self._actions_file, 'r') as f:
-                data = json.load(f)
-                self._actions = {
-                    name: Action(**action_data)
-                    for name, action_data in data.get('actions', {}).items()
-                }
-        except json.JSONDecodeError:
-            self._actions = {}
-            self._save_actions(self._actions)
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Failed to load actions: {str(e)}")
+    @property
+    def _actions(self) -> Dict[str, Action]:
+        """Actions from the shared function registry, reloaded when actions.json changes."""
+        return function_registry.actions()
 
     def _save_actions(self, actions: Dict[str, Any]) -> None:
         """Save actions to JSON file."""
         try:
-            with open(self._actions_file, 'w') as f:
-                json.dump({'actions': {
-                    name: action.dict()
-                    for name, action in actions.items()
-                }}, f, indent=4)
+            function_registry.save(actions)
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Failed to save actions: {str(e)}")
 
     def _load_function(self, function_path: str) -> Callable:
         """Dynamically load a function from a module."""
         try:
-            module_path, function_name = function_path.rsplit('.', 1)
-            module = importlib.import_module(module_path)
-            return getattr(module, function_name)
+            return load_function(function_path)
         except Exception as e:
             raise HTTPException(
                 status_code=500,
@@ -70,10 +51,11 @@ class ActionService:
         try:
             # Verify local function can be loaded if specified
             if action.is_local_function:
-                self._function_registry[action.name] = self._load_function(action.function_path)
-            
-            self._actions[action.name] = action
-            self._save_actions(self._actions)
+                self._load_function(action.function_path)
+
+            actions = self._actions
+            actions[action.name] = action
+            self._save_actions(actions)
             return True
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Failed to register action: {str(e)}")
@@ -91,10 +73,10 @@ class ActionService:
     def delete_action(self, name: str) -> bool:
         """Delete an action by name."""
         try:
-            if name in self._actions:
-                del self._actions[name]
-                self._function_registry.pop(name, None)  # Remove from function registry if exists
-                self._save_actions(self._actions)
+            actions = self._actions
+            if name in actions:
+                del actions[name]
+                self._save_actions(actions)
                 return True
             return False
         except Exception as e:
@@ -131,18 +113,14 @@ class ActionService:
 
         try:
             if action.is_local_function:
-                # Execute local function
-                func = self._function_registry.get(action_name)
-                if not func:
-                    # Try loading function if not in registry
-                    func = self._load_function(action.function_path)
-                    self._function_registry[action_name] = func
-                
+                # Execute local function from the shared dispatch table
+                entry = function_registry.get(action_name)
+
                 # Execute function with parameters
-                if asyncio.iscoroutinefunction(func):
-                    result = await func(**parameters)
+                if entry.is_async:
+                    result = await entry.func(**parameters)
                 else:
-                    result = func(**parameters)
+                    result = entry.func(**parameters)
                 return result
             else:
                 # Execute remote API call
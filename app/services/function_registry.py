@@ -0,0 +1,135 @@
+import json
+import logging
+import asyncio
+import importlib
+import threading
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+from ..models.assistant_models import Action, ActionParameter
+
+logger = logging.getLogger(__name__)
+
+ACTIONS_FILE = Path('app/data/actions.json')
+
+def load_function(function_path: str) -> Callable:
+    """Import the module of a "module_name.function_name" path and return the function"""
+    module_path, function_name = function_path.rsplit('.', 1)
+    module = importlib.import_module(module_path)
+    return getattr(module, function_name)
+
+class RegisteredFunction:
+    """One entry of the dispatch table: an action with its resolved callable and parameter schema"""
+    __slots__ = ("action", "func", "is_async", "parameters", "timeout", "error")
+
+    def __init__(self, action: Action, func: Optional[Callable] = None, error: Optional[str] = None):
+        self.action = action
+        self.func = func
+        self.is_async = asyncio.iscoroutinefunction(func)
+        self.parameters: Dict[str, ActionParameter] = {param.name: param for param in action.parameters}
+        self.timeout = action.timeout
+        # Why the callable could not be resolved, if it could not
+        self.error = error
+
+class FunctionRegistry:
+    """
+    Dispatch table compiled from actions.json.
+
+    The file is parsed and every local function imported once. Later lookups only stat the
+    file and recompile when its mtime or size has changed, so edits to actions.json (by hand
+    or through ActionService) are picked up without a restart. If the file cannot be parsed,
+    the last good table stays in use.
+    """
+    def __init__(self, actions_file: Path = ACTIONS_FILE):
+        self.actions_file = Path(actions_file)
+        self._lock = threading.Lock()
+        self._version: Optional[Tuple[int, int]] = None
+        self._actions: Dict[str, Action] = {}
+        self._entries: Dict[str, RegisteredFunction] = {}
+
+    def _file_version(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = self.actions_file.stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _compile(self, actions: Dict[str, Action]) -> Dict[str, RegisteredFunction]:
+        entries = {}
+        for name, action in actions.items():
+            previous = self._entries.get(name)
+            if previous is not None and previous.func is not None and previous.action.function_path == action.function_path:
+                # Unchanged function path: keep the callable already resolved
+                entries[name] = RegisteredFunction(action, previous.func)
+            elif action.is_local_function:
+                try:
+                    entries[name] = RegisteredFunction(action, load_function(action.function_path))
+                except Exception as e:
+                    logger.error(f"Failed to load function {action.function_path} for action {name}: {str(e)}")
+                    entries[name] = RegisteredFunction(action, error=str(e))
+            else:
+                entries[name] = RegisteredFunction(action, error="not a local function")
+        return entries
+
+    def refresh(self, force: bool = False) -> None:
+        """Recompile the table if actions.json changed since it was last read"""
+        version = self._file_version()
+        if not force and version == self._version:
+            return
+
+        with self._lock:
+            version = self._file_version()
+            if not force and version == self._version:
+                return
+            if version is None:
+                actions = {}
+            else:
+                try:
+                    with open(self.actions_file, 'r') as f:
+                        data = json.load(f)
+                    actions = {
+                        name: Action(**action_data)
+                        for name, action_data in data.get('actions', {}).items()
+                    }
+                except Exception as e:
+                    # Keep serving the last good table; a half-written file is retried next time
+                    logger.error(f"Failed to load {self.actions_file}: {str(e)}")
+                    return
+            self._entries = self._compile(actions)
+            self._actions = actions
+            self._version = version
+            logger.info(f"Loaded {len(actions)} actions from {self.actions_file}")
+
+    def get(self, name: str) -> RegisteredFunction:
+        """Look up a callable action"""
+        self.refresh()
+        entry = self._entries.get(name)
+        if entry is None:
+            raise ValueError(f"Function {name} not found in registered actions")
+        if entry.func is None and entry.action.is_local_function:
+            # The import failed when the table was compiled (e.g. configuration missing then); retry it
+            try:
+                entry = RegisteredFunction(entry.action, load_function(entry.action.function_path))
+                self._entries[name] = entry
+            except Exception as e:
+                entry.error = str(e)
+        if entry.func is None:
+            raise ValueError(f"Function {name} cannot be called: {entry.error}")
+        return entry
+
+    def actions(self) -> Dict[str, Action]:
+        """All registered actions by name"""
+        self.refresh()
+        return dict(self._actions)
+
+    def save(self, actions: Dict[str, Action]) -> None:
+        """Write the actions to actions.json and recompile the table"""
+        with self._lock:
+            with open(self.actions_file, 'w') as f:
+                json.dump({'actions': {
+                    name: action.dict()
+                    for name, action in actions.items()
+                }}, f, indent=4)
+        self.refresh(force=True)
+
+# Create singleton instance
+function_registry = FunctionRegistry()
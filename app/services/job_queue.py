@@ -0,0 +1,234 @@
+import os
+import math
+import time
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+from .job_store import JobStore, job_store
+
+logger = logging.getLogger(__name__)
+
+# Background chats processed at once, and how many may wait before new ones are refused
+CHAT_WORKERS = int(os.getenv('CHAT_WORKERS', '20'))
+CHAT_QUEUE_MAX = int(os.getenv('CHAT_QUEUE_MAX', '200'))
+# Seconds to let queued chats finish on shutdown
+CHAT_QUEUE_DRAIN_TIMEOUT = float(os.getenv('CHAT_QUEUE_DRAIN_TIMEOUT', '30'))
+
+class QueueFullError(Exception):
+    """Raised when a job is refused because the queue is at its depth limit"""
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class TimingStats:
+    """Count, total and max of a duration"""
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    @property
+    def average(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def metrics(self) -> Dict[str, float]:
+        return {"average": round(self.average, 4), "max": round(self.max, 4), "total": round(self.total, 2)}
+
+class JobQueue:
+    """
+    Bounded queue of background jobs run by a fixed pool of workers.
+
+    Jobs are admitted only while fewer than max_depth are waiting; beyond that submit() raises
+    QueueFullError so the endpoint can answer 429 instead of piling up unbounded work. Queue wait
+    and execution times are recorded to size the workers against the OpenAI rate limits.
+
+    With a store, jobs submitted with a payload are journalled before they are queued. Workers
+    claim them in the store before running them, and replay() runs the unfinished ones again
+    after a restart through the handler registered for their kind.
+    """
+    def __init__(self, name: str, workers: int = CHAT_WORKERS, max_depth: int = CHAT_QUEUE_MAX,
+                 store: Optional[JobStore] = None):
+        self.name = name
+        self.workers = max(1, workers)
+        self.max_depth = max_depth
+        self.store = store
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._handlers: Dict[str, Callable[[Dict[str, Any]], Awaitable[Any]]] = {}
+        # Journalled jobs waiting in this process's queue, so a sweep doesn't queue them twice
+        self._queued_ids: Set[int] = set()
+        self._sweep_task: Optional[asyncio.Task] = None
+        self.in_flight = 0
+
+        self.submitted = 0
+        self.rejected = 0
+        self.completed = 0
+        self.failed = 0
+        self.replayed = 0
+        self.queue_wait = TimingStats()
+        self.execution = TimingStats()
+
+    @property
+    def queue(self) -> asyncio.Queue:
+        # Created lazily so it binds to the running event loop
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        return self._queue
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def retry_after(self) -> int:
+        """Seconds until the queued jobs are likely to have been worked off"""
+        return max(1, math.ceil(self.depth * (self.execution.average or 1.0) / self.workers))
+
+    def check_capacity(self) -> None:
+        """Refuse early, before any work is done for a job that could not be queued"""
+        if self.depth >= self.max_depth:
+            self.rejected += 1
+            raise QueueFullError(f"{self.name} queue is full ({self.depth} jobs waiting)", self.retry_after())
+
+    def register(self, kind: str, handler: Callable[[Dict[str, Any]], Awaitable[Any]]) -> None:
+        """Set the coroutine function that runs replayed jobs of a kind from their payload"""
+        self._handlers[kind] = handler
+
+    def _journal(self, method: str, *args) -> Any:
+        """Call the store, logging instead of raising so a store error never loses the job in memory"""
+        try:
+            return getattr(self.store, method)(*args)
+        except Exception as e:
+            logger.error(f"{self.name} job store {method} failed: {str(e)}")
+            return None
+
+    def submit(self, job_name: str, job: Callable[[], Awaitable[Any]], payload: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Queue a job; job is called by a worker to get the coroutine to run.
+
+        payload is what the job_name handler needs to run the job again after a restart;
+        when it is given and the queue has a store, the job is journalled first.
+        """
+        self.check_capacity()
+        job_id = None
+        if self.store is not None and payload is not None:
+            job_id = self._journal("add", self.name, job_name, payload)
+        self._enqueue(job_name, job, job_id)
+        self.submitted += 1
+
+    def _enqueue(self, job_name: str, job: Callable[[], Awaitable[Any]], job_id: Optional[int]) -> None:
+        self.start()
+        if job_id is not None:
+            self._queued_ids.add(job_id)
+        self.queue.put_nowait((job_name, job, time.monotonic(), job_id))
+
+    async def replay(self) -> None:
+        """Queue the journalled jobs left unfinished by an earlier process, then keep sweeping for abandoned ones"""
+        if self.store is None:
+            return
+        self._requeue_unfinished()
+        if self._sweep_task is None or self._sweep_task.done():
+            self._sweep_task = asyncio.create_task(self._sweep())
+
+    def _requeue_unfinished(self) -> None:
+        recovered = self._journal("recover", self.name) or []
+        replayed = 0
+        for job_id, kind, payload in recovered:
+            if job_id in self._queued_ids:
+                continue
+            handler = self._handlers.get(kind)
+            if handler is None:
+                self._journal("fail", job_id, f"no handler registered for {kind}")
+                continue
+            self._enqueue(kind, lambda handler=handler, payload=payload: handler(payload), job_id)
+            replayed += 1
+        if replayed:
+            self.replayed += replayed
+            logger.info(f"Replaying {replayed} unfinished {self.name} jobs")
+
+    async def _sweep(self) -> None:
+        """Pick up jobs whose worker died (e.g. a crashed process) once their lease has run out"""
+        while True:
+            await asyncio.sleep(self.store.lease / 2)
+            self._requeue_unfinished()
+
+    def start(self) -> None:
+        """Start the workers if they aren't running"""
+        self._workers = [task for task in self._workers if not task.done()]
+        while len(self._workers) < self.workers:
+            self._workers.append(asyncio.create_task(self._work()))
+
+    async def _work(self) -> None:
+        while True:
+            job_name, job, enqueued_at, job_id = await self.queue.get()
+            if job_id is not None:
+                self._queued_ids.discard(job_id)
+                if self._journal("claim", job_id) is False:
+                    # Another worker (possibly in another process) has it already
+                    self.queue.task_done()
+                    continue
+
+            started_at = time.monotonic()
+            self.queue_wait.add(started_at - enqueued_at)
+            self.in_flight += 1
+            try:
+                await job()
+                self.completed += 1
+                if job_id is not None:
+                    self._journal("complete", job_id)
+            except asyncio.CancelledError:
+                # Interrupted by shutdown: hand the job back so the next start runs it
+                if job_id is not None:
+                    self._journal("release", job_id)
+                raise
+            except Exception as e:
+                self.failed += 1
+                logger.exception(f"{self.name} job {job_name} failed")
+                if job_id is not None:
+                    self._journal("fail", job_id, str(e))
+            finally:
+                self.in_flight -= 1
+                self.execution.add(time.monotonic() - started_at)
+                self.queue.task_done()
+
+    async def stop(self, drain_timeout: float = CHAT_QUEUE_DRAIN_TIMEOUT) -> None:
+        """Let queued jobs finish for up to drain_timeout seconds, then stop the workers; journalled jobs left over are replayed on the next start"""
+        if self._sweep_task is not None:
+            self._sweep_task.cancel()
+            self._sweep_task = None
+        if self._queue is not None and self._workers:
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout=drain_timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"{self.name} queue still had {self.depth} waiting and {self.in_flight} running jobs at shutdown")
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._queue = None
+        self._queued_ids.clear()
+
+    def metrics(self) -> Dict[str, Any]:
+        metrics = {
+            "workers": self.workers,
+            "max_depth": self.max_depth,
+            "depth": self.depth,
+            "in_flight": self.in_flight,
+            "submitted": self.submitted,
+            "rejected": self.rejected,
+            "completed": self.completed,
+            "failed": self.failed,
+            "replayed": self.replayed,
+            "queue_wait_seconds": self.queue_wait.metrics(),
+            "execution_seconds": self.execution.metrics()
+        }
+        if self.store is not None:
+            metrics["journal"] = self._journal("counts", self.name)
+        return metrics
+
+# Create singleton instance
+chat_job_queue = JobQueue("chat", store=job_store)
@@ -0,0 +1,152 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import logging
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Journal of accepted background chats; empty keeps jobs in memory only
+CHAT_JOB_STORE_PATH = os.getenv('CHAT_JOB_STORE_PATH', 'app/data/jobs.db')
+# Seconds a claimed job may run before another worker may take it over; longer than a chat's budget
+CHAT_JOB_LEASE = float(os.getenv('CHAT_JOB_LEASE', '120'))
+# Claims after which a job that keeps getting interrupted is given up on
+CHAT_JOB_MAX_ATTEMPTS = int(os.getenv('CHAT_JOB_MAX_ATTEMPTS', '3'))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    queue TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    lease_until REAL,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs (queue, state, id);
+"""
+
+class JobStore:
+    """
+    SQLite journal of background jobs, so accepted work survives a restart or crash.
+
+    A job is written as `queued` before the request is answered. A worker claims it with one
+    conditional UPDATE, so only one worker (in this or another process sharing the file) runs
+    it; the claim holds a lease that outlives the chat budget. Finished jobs are deleted and
+    failed ones kept with their error. On startup, queued jobs and those whose lease ran out
+    (their worker died) are handed back to be run again.
+    """
+    def __init__(self, db_path: str = CHAT_JOB_STORE_PATH, lease: float = CHAT_JOB_LEASE,
+                 max_attempts: int = CHAT_JOB_MAX_ATTEMPTS):
+        self.db_path = db_path
+        self.lease = lease
+        self.max_attempts = max_attempts
+        # Identifies this process's claims
+        self.worker_id = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._conn: Optional[sqlite3.Connection] = None
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """Lazy open the database and create the schema"""
+        if self._conn is None:
+            if str(self.db_path) != ':memory:':
+                Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.db_path), check_same_thread=False, timeout=5)
+            conn.row_factory = sqlite3.Row
+            # WAL with NORMAL sync: commits survive a process crash and take well under a millisecond
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def add(self, queue: str, kind: str, payload: Dict[str, Any]) -> int:
+        """Record an accepted job and return its ID"""
+        now = time.time()
+        with self.conn:
+            cursor = self.conn.execute(
+                "INSERT INTO jobs (queue, kind, payload, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (queue, kind, json.dumps(payload, default=str), now, now)
+            )
+        return cursor.lastrowid
+
+    def claim(self, job_id: int) -> bool:
+        """Take a queued job for this worker; False if another worker has it or it is gone"""
+        now = time.time()
+        with self.conn:
+            cursor = self.conn.execute(
+                "UPDATE jobs SET state = 'running', worker = ?, lease_until = ?, attempts = attempts + 1, updated_at = ? "
+                "WHERE id = ? AND state = 'queued'",
+                (self.worker_id, now + self.lease, now, job_id)
+            )
+        return cursor.rowcount == 1
+
+    def complete(self, job_id: int) -> None:
+        with self.conn:
+            self.conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+
+    def fail(self, job_id: int, error: str) -> None:
+        with self.conn:
+            self.conn.execute(
+                "UPDATE jobs SET state = 'failed', error = ?, lease_until = NULL, updated_at = ? WHERE id = ?",
+                (error, time.time(), job_id)
+            )
+
+    def release(self, job_id: int) -> None:
+        """Put a claimed job back, e.g. when it was interrupted by shutdown"""
+        with self.conn:
+            self.conn.execute(
+                "UPDATE jobs SET state = 'queued', worker = NULL, lease_until = NULL, updated_at = ? "
+                "WHERE id = ? AND state = 'running'",
+                (time.time(), job_id)
+            )
+
+    def recover(self, queue: str) -> List[Tuple[int, str, Dict[str, Any]]]:
+        """
+        Requeue jobs whose worker died mid-run and return every unfinished job of a queue.
+
+        A running job counts as abandoned once its lease has run out and it belongs to another
+        process; this process's own jobs are still being worked on however long they take.
+
+        Jobs already claimed max_attempts times are marked failed instead, so a message that
+        crashes the process is not replayed forever.
+        """
+        now = time.time()
+        with self.conn:
+            self.conn.execute(
+                "UPDATE jobs SET state = 'failed', error = 'interrupted too many times', lease_until = NULL, updated_at = ? "
+                "WHERE queue = ? AND state = 'running' AND lease_until < ? AND worker != ? AND attempts >= ?",
+                (now, queue, now, self.worker_id, self.max_attempts)
+            )
+            expired = self.conn.execute(
+                "UPDATE jobs SET state = 'queued', worker = NULL, lease_until = NULL, updated_at = ? "
+                "WHERE queue = ? AND state = 'running' AND lease_until < ? AND worker != ?",
+                (now, queue, now, self.worker_id)
+            ).rowcount
+        if expired:
+            logger.warning(f"Requeued {expired} {queue} jobs interrupted mid-run")
+
+        rows = self.conn.execute(
+            "SELECT id, kind, payload FROM jobs WHERE queue = ? AND state = 'queued' ORDER BY id", (queue,)
+        ).fetchall()
+        return [(row['id'], row['kind'], json.loads(row['payload'])) for row in rows]
+
+    def counts(self, queue: str) -> Dict[str, int]:
+        """Jobs of a queue by state"""
+        rows = self.conn.execute("SELECT state, COUNT(*) FROM jobs WHERE queue = ? GROUP BY state", (queue,))
+        return {state: count for state, count in rows}
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+# Create singleton instance
+job_store = JobStore() if CHAT_JOB_STORE_PATH else None
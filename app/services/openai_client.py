@@ -0,0 +1,80 @@
+import os
+import asyncio
+import logging
+from typing import Optional
+import httpx
+from openai import AsyncOpenAI
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of OpenAI API requests in flight at once across the process; an open run
+# stream only holds a slot until its response starts
+OPENAI_MAX_CONCURRENCY = int(os.getenv('OPENAI_MAX_CONCURRENCY', '50'))
+# Separate slots for cancelling runs and posting queued messages, so they never wait behind chats
+OPENAI_CONTROL_CONCURRENCY = int(os.getenv('OPENAI_CONTROL_CONCURRENCY', '5'))
+# HTTP connection pool to api.openai.com; unlimited when unset, since open run streams keep
+# their connection for the whole run
+OPENAI_MAX_CONNECTIONS = int(os.getenv('OPENAI_MAX_CONNECTIONS') or 0) or None
+OPENAI_MAX_KEEPALIVE = int(os.getenv('OPENAI_MAX_KEEPALIVE', '20'))
+OPENAI_KEEPALIVE_EXPIRY = float(os.getenv('OPENAI_KEEPALIVE_EXPIRY', '30'))
+# Timeouts in seconds for one API request, and for opening a connection
+OPENAI_TIMEOUT = float(os.getenv('OPENAI_TIMEOUT', '60'))
+OPENAI_CONNECT_TIMEOUT = float(os.getenv('OPENAI_CONNECT_TIMEOUT', '5'))
+OPENAI_MAX_RETRIES = int(os.getenv('OPENAI_MAX_RETRIES', '2'))
+
+class OpenAIClient:
+    """
+    Process-wide AsyncOpenAI client on a tuned httpx connection pool.
+
+    Every OpenAIAssistantService instance shares the client, so keep-alive connections
+    are reused across chats, and the request slots cap how many API calls run at once.
+    """
+    def __init__(self):
+        self._client: Optional[AsyncOpenAI] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._control_slots: Optional[asyncio.Semaphore] = None
+
+    @property
+    def client(self) -> AsyncOpenAI:
+        """Lazy create the client"""
+        if self._client is None:
+            api_key = os.getenv("OPENAI_API_KEY")
+            if not api_key:
+                raise ValueError("OPENAI_API_KEY environment variable is not set")
+            self._client = AsyncOpenAI(
+                api_key=api_key,
+                max_retries=OPENAI_MAX_RETRIES,
+                http_client=httpx.AsyncClient(
+                    limits=httpx.Limits(
+                        max_connections=OPENAI_MAX_CONNECTIONS,
+                        max_keepalive_connections=OPENAI_MAX_KEEPALIVE,
+                        keepalive_expiry=OPENAI_KEEPALIVE_EXPIRY
+                    ),
+                    timeout=httpx.Timeout(OPENAI_TIMEOUT, connect=OPENAI_CONNECT_TIMEOUT)
+                )
+            )
+        return self._client
+
+    @property
+    def slots(self) -> asyncio.Semaphore:
+        """Semaphore limiting concurrent API requests to OPENAI_MAX_CONCURRENCY"""
+        # Created lazily so it binds to the running event loop
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(OPENAI_MAX_CONCURRENCY)
+        return self._slots
+
+    @property
+    def control_slots(self) -> asyncio.Semaphore:
+        """Semaphore limiting concurrent cancel and queued-message requests to OPENAI_CONTROL_CONCURRENCY"""
+        if self._control_slots is None:
+            self._control_slots = asyncio.Semaphore(OPENAI_CONTROL_CONCURRENCY)
+        return self._control_slots
+
+    async def close(self) -> None:
+        """Close the pooled connections"""
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
+# Create singleton instance
+openai_client = OpenAIClient()
@@ -1,8 +1,7 @@
 import logging
 import os
-from openai import OpenAI
+from openai import AsyncOpenAI, APIConnectionError
 import json
-import importlib
 from ..models.assistant_models import (
     AssistantConfig, AssistantResponse, ChatMessage, ContentItem, ImageFileContent, RunStatus, TextContent, 
     ThreadMessages, ChatRequest, ChatResponse
@@ -10,33 +9,125 @@ from ..models.assistant_models import (
 from ..models.manychat_models import ManyChatRequest, ManyChatResponse
 from ..models.whatsapp_models import WhatsAppChatRequest, WhatsAppResponse
 from .manychat_service import ManyChatService
+from .openai_client import openai_client
+from .run_poller import run_poller
+from .thread_pool import warm_thread_pool
+from .thread_cursors import thread_cursors
+from .job_queue import chat_job_queue, QueueFullError
+from .run_serializer import thread_run_serializer
+from .function_registry import function_registry
+from .thread_rotation import (
+    thread_rotation, OPENAI_THREAD_SUMMARY_MODEL, OPENAI_THREAD_SUMMARY_MESSAGES, OPENAI_THREAD_CARRY_MESSAGES
+)
 import asyncio
-from functools import partial
-from typing import Optional, Dict, Any
+from contextvars import ContextVar
+from typing import Optional, Dict, Any, List, Set, Tuple
+from ..utils.tool_result_cache import tool_result_cache
+from ..utils.usage_store import usage_store
 from ..utils.google_sheets import check_customer_exists, update_customer_name, insert_customer
 
 logger = logging.getLogger(__name__)
+
+# Follow runs through the Assistants event stream instead of polling runs.retrieve
+OPENAI_STREAM_RUNS = os.getenv('OPENAI_STREAM_RUNS', 'true').lower() == 'true'
+
+# Post the user's message together with the run: createAndRun for new threads, additional_messages otherwise
+OPENAI_COMBINED_RUNS = os.getenv('OPENAI_COMBINED_RUNS', 'true').lower() == 'true'
+
+# Seconds a chat has to reply, counted from when the message arrives, before it is answered with
+# OPENAI_FALLBACK_REPLY and its run cancelled; the cancel request gets OPENAI_CANCEL_TIMEOUT more
+OPENAI_CHAT_BUDGET = float(os.getenv('OPENAI_CHAT_BUDGET', '60'))
+OPENAI_CANCEL_TIMEOUT = float(os.getenv('OPENAI_CANCEL_TIMEOUT', '5'))
+OPENAI_FALLBACK_REPLY = os.getenv(
+    'OPENAI_FALLBACK_REPLY',
+    'Mohon maaf, balasan kami membutuhkan waktu lebih lama dari biasanya. Silakan kirim pesan Anda lagi sebentar lagi.'
+)
+# Sent instead when the chat had started writing data (e.g. claiming invoices), which finishes regardless
+# and must not be repeated
+OPENAI_PROCESSING_REPLY = os.getenv(
+    'OPENAI_PROCESSING_REPLY',
+    'Mohon maaf, balasan kami membutuhkan waktu lebih lama dari biasanya. Permintaan Anda sudah kami terima dan sedang '
+    'diproses, jadi tidak perlu dikirim ulang.'
+)
+
+# Run statuses after which a run does no more work
+TERMINAL_RUN_STATUSES = ("completed", "failed", "expired", "cancelled", "incomplete")
+
+# Tool calls from one run step executed at once, and the default time limit for each (seconds);
+# an action can set its own limit with "timeout" in actions.json. Only actions marked "read_only"
+# are cancelled at the limit; the run stops waiting for others and they finish in the background
+OPENAI_TOOL_CONCURRENCY = int(os.getenv('OPENAI_TOOL_CONCURRENCY', '4'))
+OPENAI_TOOL_TIMEOUT = float(os.getenv('OPENAI_TOOL_TIMEOUT', '20'))
+
+# Instructions for summarizing a thread that is being replaced by a fresh one
+THREAD_SUMMARY_PROMPT = (
+    "You summarize a customer service chat so it can continue in a new conversation. Write a compact "
+    "summary in the language of the chat. Keep the customer's name and details, orders, invoice numbers, "
+    "loyalty stamp balances, promises made and any open questions. Leave out greetings and small talk."
+)
+# Heads the summary posted to the new thread
+THREAD_SUMMARY_HEADER = "Summary of the earlier conversation (context only, no reply needed):"
+
+class ToolStillRunningError(Exception):
+    """A function that writes data ran past its time limit; it keeps running instead of being cancelled"""
+    def __init__(self, function_name: str):
+        super().__init__(f"{function_name} is still running")
+        self.function_name = function_name
+
+# Calls of writer functions still in progress, kept referenced until they finish
+_writer_tasks: Set[asyncio.Task] = set()
+# Writer calls made by the chat running in the current task, so its deadline knows about them
+_chat_writes: ContextVar[Optional[List[asyncio.Task]]] = ContextVar("chat_writes", default=None)
+
+def _finish_writer_task(task: asyncio.Task) -> None:
+    _writer_tasks.discard(task)
+    # Retrieving the outcome keeps the failure of a call nobody waits for anymore from going unreported
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f"Writer function call failed: {str(task.exception())}")
+
+class RunHandle:
+    """The thread and run a chat is working on, as far as they are known yet"""
+    __slots__ = ("thread_id", "run_id", "tools", "steps")
+
+    def __init__(self, thread_id: Optional[str] = None):
+        self.thread_id = thread_id
+        self.run_id: Optional[str] = None
+        # Functions the run has called, and the model steps it took (one more than its rounds of
+        # tool calls), for usage accounting
+        self.tools: List[str] = []
+        self.steps = 1
+
+    def track(self, run) -> None:
+        self.thread_id = run.thread_id
+        self.run_id = run.id
+
 class OpenAIAssistantService:
-    def __init__(self):
-        self._client = None
+    def __init__(self, client: Optional[AsyncOpenAI] = None, stream_runs: bool = OPENAI_STREAM_RUNS,
+                 combined_runs: bool = OPENAI_COMBINED_RUNS):
+        self._client = client
+        self.stream_runs = stream_runs
+        self.combined_runs = combined_runs
 
     @property
-    def client(self):
+    def client(self) -> AsyncOpenAI:
+        """The AsyncOpenAI client, shared by every service instance unless one was given"""
         if self._client is None:
-            api_key = os.getenv("OPENAI_API_KEY")
-            if not api_key:
-                raise ValueError("OPENAI_API_KEY environment variable is not set")
-            self._client = OpenAI(api_key=api_key)
+            self._client = openai_client.client
         return self._client
 
-    async def _run_sync(self, func, *args, **kwargs):
-        """Run synchronous OpenAI operations in a thread pool."""
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(None, partial(func, *args, **kwargs))
+    async def _request(self, func, *args, **kwargs):
+        """Make an OpenAI API call once a request slot is free."""
+        async with openai_client.slots:
+            return await func(*args, **kwargs)
+
+    async def _control_request(self, func, *args, **kwargs):
+        """Make a cancel or queued-message API call on the control slots, which chats never hold"""
+        async with openai_client.control_slots:
+            return await func(*args, **kwargs)
 
     async def create_assistant(self, config: AssistantConfig) -> AssistantResponse:
         try:
-            assistant = await self._run_sync(
+            assistant = await self._request(
                 self.client.beta.assistants.create,
                 name=config.name,
                 instructions=config.instructions,
@@ -58,7 +149,7 @@ class OpenAIAssistantService:
 
     async def create_thread(self) -> AssistantResponse:
         try:
-            thread = await self._run_sync(self.client.beta.threads.create)
+            thread = await self._request(self.client.beta.threads.create)
             return AssistantResponse(
                 assistant_id="",
                 thread_id=thread.id,
@@ -74,7 +165,7 @@ class OpenAIAssistantService:
 
     async def add_message(self, thread_id: str, content: str) -> AssistantResponse:
         try:
-            message = await self._run_sync(
+            message = await self._request(
                 self.client.beta.threads.messages.create,
                 thread_id=thread_id,
                 role="user",
@@ -95,7 +186,7 @@ class OpenAIAssistantService:
 
     async def run_assistant(self, assistant_id: str, thread_id: str) -> AssistantResponse:
         try:
-            run = await self._run_sync(
+            run = await self._request(
                 self.client.beta.threads.runs.create,
                 thread_id=thread_id,
                 assistant_id=assistant_id
@@ -115,7 +206,7 @@ class OpenAIAssistantService:
 
     async def get_run_status(self, thread_id: str, run_id: str) -> RunStatus:
         try:
-            run = await self._run_sync(
+            run = await self._request(
                 self.client.beta.threads.runs.retrieve,
                 thread_id=thread_id,
                 run_id=run_id
@@ -128,18 +219,23 @@ class OpenAIAssistantService:
             return RunStatus(status="error", response_data={"error": str(e)})
 
     async def wait_for_completion(self, thread_id: str, run_id: str, timeout: int = 300) -> RunStatus:
-        start_time = asyncio.get_event_loop().time()
-        while (asyncio.get_event_loop().time() - start_time) < timeout:
-            run_status = await self.get_run_status(thread_id, run_id)
-            if run_status.status in ["completed", "failed", "expired"]:
-                return run_status
-            await asyncio.sleep(1)
-        return RunStatus(status="timeout")
+        deadline = asyncio.get_running_loop().time() + timeout
+        run_status, polls = await run_poller.poll(
+            lambda: self.get_run_status(thread_id, run_id),
+            lambda status: status.status in TERMINAL_RUN_STATUSES,
+            deadline
+        )
+        timed_out = run_status.status not in TERMINAL_RUN_STATUSES
+        run_poller.record(polls, timed_out)
+        if timed_out:
+            return RunStatus(status="timeout", polls=polls)
+        run_status.polls = polls
+        return run_status
 
     async def get_messages(self, thread_id: str, limit: int = 10, order: str = "desc") -> ThreadMessages:
         """Get messages with proper content type handling"""
         try:
-            messages = await self._run_sync(
+            messages = await self._request(
                 self.client.beta.threads.messages.list,
                 thread_id=thread_id,
                 limit=limit,
@@ -182,35 +278,59 @@ class OpenAIAssistantService:
             raise ValueError(f"Error retrieving messages: {str(e)}")
 
     async def _execute_function(self, function_name: str, arguments: Dict[str, Any]) -> Any:
-        """Execute a registered function by importing and calling it dynamically."""
+        """Execute a registered function through the shared dispatch table."""
         try:
-            # Get function details from actions.json
-            with open('app/data/actions.json', 'r') as f:
-                actions = json.load(f)
-            
-            if function_name not in actions['actions']:
-                raise ValueError(f"Function {function_name} not found in registered actions")
-            
-            action = actions['actions'][function_name]
-            module_path, func_name = action['function_path'].rsplit('.', 1)
-            
-            # Import the module and get the function
-            module = importlib.import_module(module_path)
-            func = getattr(module, func_name)
-            
-            # Execute the function with provided arguments
-            result = await func(**arguments)
-            return result
+            entry = function_registry.get(function_name)
+            cache_ttl = entry.action.cache_ttl
+            if cache_ttl:
+                found, result = tool_result_cache.get(function_name, arguments)
+                if found:
+                    return result
+
+            timeout = entry.timeout or OPENAI_TOOL_TIMEOUT
+            if entry.action.read_only:
+                # Execute the function with provided arguments, within its time limit
+                return await asyncio.wait_for(self._call_function(entry, function_name, arguments), timeout=timeout)
+
+            # A writer cancelled part-way would leave storage half updated (e.g. invoices claimed without
+            # their stamps), so past the time limit the run stops waiting and the call finishes on its own
+            task = asyncio.ensure_future(self._call_function(entry, function_name, arguments))
+            _writer_tasks.add(task)
+            chat_writes = _chat_writes.get()
+            if chat_writes is not None:
+                chat_writes.append(task)
+            task.add_done_callback(_finish_writer_task)
+            try:
+                return await asyncio.wait_for(asyncio.shield(task), timeout=timeout)
+            except asyncio.TimeoutError:
+                raise ToolStillRunningError(function_name)
+        except (asyncio.TimeoutError, ToolStillRunningError):
+            raise
         except Exception as e:
             raise ValueError(f"Error executing function {function_name}: {str(e)}")
 
+    @staticmethod
+    async def _call_function(entry, function_name: str, arguments: Dict[str, Any]) -> Any:
+        """Run a registered function and cache its result if the action allows it"""
+        if not entry.action.cache_ttl:
+            return await entry.func(**arguments)
+
+        # A writer finishing while this call runs invalidates the function; the result may then be stale
+        generation = tool_result_cache.generation(function_name)
+        result = await entry.func(**arguments)
+        tool_result_cache.put(function_name, arguments, result, entry.action.cache_ttl, generation)
+        return result
+
     async def chat(self, request: ChatRequest) -> ChatResponse:
         try:
             # Create or use existing thread
             thread_id = request.thread_id
             if not thread_id:
-                thread = await self._run_sync(self.client.beta.threads.create)
-                thread_id = thread.id
+                if self.combined_runs:
+                    # A ready pooled thread costs no round trip; otherwise the thread is created along with the run
+                    thread_id = self._take_ready_thread()
+                else:
+                    thread_id = await self._create_initial_thread()
 
             # Parse the content if it's a JSON string
             message_content = request.messages[-1].content
@@ -223,119 +343,459 @@ class OpenAIAssistantService:
                     # If not JSON, use the content as is
                     pass
 
-            # Add message with proper content
-            await self._run_sync(
-                self.client.beta.threads.messages.create,
-                thread_id=thread_id,
-                role="user",
-                content=message_content  # Use the extracted or original content
+            # The budget covers waiting behind an active run as well as the run itself
+            deadline = asyncio.get_running_loop().time() + (request.timeout or OPENAI_CHAT_BUDGET)
+
+            if not thread_id:
+                return await self._run_message(None, request.assistant_id, message_content, deadline, request.phone_number)
+
+            # Messages sent while this thread has a run active are merged into one follow-up run
+            return await thread_run_serializer.submit(
+                thread_id,
+                message_content,
+                lambda content: self._run_message(thread_id, request.assistant_id, content, deadline, request.phone_number),
+                lambda: ChatResponse(thread_id=thread_id, messages=[], status="coalesced")
             )
 
-            # Run assistant
-            run = await self._run_sync(
-                self.client.beta.threads.runs.create,
+        except Exception as e:
+            logger.error(f"Chat error: {str(e)}")
+            raise ValueError(f"Chat error: {str(e)}")
+
+    async def _run_message(self, thread_id: Optional[str], assistant_id: str, message_content: Any,
+                           deadline: float, phone_number: Optional[str] = None) -> ChatResponse:
+        """Post a message, run the assistant on it and collect the reply, by the deadline (loop.time())
+
+        Past the deadline the run stream or polling, read-only tool calls and the message fetch are
+        cancelled, the run is cancelled on OpenAI so the thread accepts messages again, and the
+        fallback reply is returned with status "timeout". Writer tool calls are never cancelled; they
+        finish in the background and the reply tells the customer not to send the request again.
+        """
+        handle = RunHandle(thread_id)
+        timeout = deadline - asyncio.get_running_loop().time()
+        if timeout <= 0 and thread_id:
+            # Out of time before a run could start, e.g. messages merged behind a long run: they are
+            # still added to the thread so the conversation stays complete, but not answered
+            logger.warning(f"Chat on thread {thread_id} ran out of time before its run started")
+            await self._post_message(thread_id, message_content)
+            return ChatResponse(
                 thread_id=thread_id,
-                assistant_id=request.assistant_id
+                messages=[ChatMessage(role="assistant", content=OPENAI_FALLBACK_REPLY)],
+                status="timeout"
+            )
+
+        writes: List[asyncio.Task] = []
+        token = _chat_writes.set(writes)
+        try:
+            return await asyncio.wait_for(
+                self._run_to_completion(handle, assistant_id, message_content, phone_number), timeout=timeout
+            )
+        except asyncio.TimeoutError:
+            logger.warning(f"Chat on thread {handle.thread_id} ran out of time; cancelling run {handle.run_id}")
+            if handle.run_id:
+                await self._cancel_run(handle.thread_id, handle.run_id)
+            if writes:
+                logger.warning(f"Chat on thread {handle.thread_id} timed out with {sum(1 for task in writes if not task.done())} "
+                               f"of {len(writes)} writer calls still running")
+            return ChatResponse(
+                thread_id=handle.thread_id,
+                messages=[ChatMessage(role="assistant", content=OPENAI_PROCESSING_REPLY if writes else OPENAI_FALLBACK_REPLY)],
+                status="timeout"
+            )
+        finally:
+            _chat_writes.reset(token)
+
+    async def _run_to_completion(self, handle: RunHandle, assistant_id: str, message_content: Any,
+                                 phone_number: Optional[str] = None) -> ChatResponse:
+        started_at = asyncio.get_running_loop().time()
+        if self.stream_runs:
+            thread_id, run_status, processed_messages = await self._stream_run(
+                handle, assistant_id, message_content
+            )
+        else:
+            # Add the message and run the assistant
+            async with openai_client.slots:
+                run = await self._start_run(handle.thread_id, assistant_id, message_content)
+            handle.track(run)
+            thread_id = run.thread_id
+            run_status = await self._poll_run(thread_id, run.id, handle)
+            processed_messages = await self._list_run_messages(thread_id, run.id)
+
+        self._record_usage(run_status, assistant_id, phone_number, handle.tools,
+                           asyncio.get_running_loop().time() - started_at, handle.steps)
+        return ChatResponse(
+            thread_id=thread_id,
+            messages=processed_messages,
+            status=run_status.status
+        )
+
+    @staticmethod
+    def _record_usage(run, assistant_id: str, phone_number: Optional[str], tools: List[str], duration: float,
+                      steps: int = 1) -> None:
+        """Store a finished run's token usage and track its thread's size; accounting never fails the chat"""
+        if getattr(run, "usage", None) is None:
+            return
+        # A run's usage adds up the prompt of every model step, each of which re-read the thread
+        thread_rotation.observe(run.thread_id, (run.usage.prompt_tokens or 0) // max(steps, 1))
+        if usage_store is None:
+            return
+        try:
+            usage_store.record(
+                run_id=run.id,
+                thread_id=run.thread_id,
+                assistant_id=getattr(run, "assistant_id", None) or assistant_id,
+                model=getattr(run, "model", None),
+                status=run.status,
+                prompt_tokens=run.usage.prompt_tokens or 0,
+                completion_tokens=run.usage.completion_tokens or 0,
+                phone_number=phone_number,
+                tools=tools,
+                duration=duration,
+                steps=steps
+            )
+        except Exception as e:
+            logger.error(f"Failed to record usage of run {run.id}: {str(e)}")
+
+    async def _post_message(self, thread_id: str, content: Any) -> None:
+        """Add a user message to a thread without running the assistant; a slow or failing API only gets logged"""
+        try:
+            await asyncio.wait_for(
+                self._control_request(self.client.beta.threads.messages.create, thread_id=thread_id, role="user", content=content),
+                timeout=OPENAI_CANCEL_TIMEOUT
             )
+        except Exception as e:
+            logger.error(f"Failed to add a message to thread {thread_id}: {str(e)}")
 
-            # Wait for completion or handle function calls
-            while True:
-                run_status = await self._run_sync(
+    async def _cancel_run(self, thread_id: str, run_id: str) -> None:
+        """Cancel a run that is no longer waited for, without letting a slow API hold the caller"""
+        try:
+            await asyncio.wait_for(
+                self._control_request(self.client.beta.threads.runs.cancel, thread_id=thread_id, run_id=run_id),
+                timeout=OPENAI_CANCEL_TIMEOUT
+            )
+        except Exception as e:
+            logger.error(f"Failed to cancel run {run_id} on thread {thread_id}: {str(e)}")
+
+    async def _run_tool_calls(self, tool_calls) -> List[Dict[str, str]]:
+        """Execute the functions a run asked for concurrently and build its tool outputs"""
+        slots = asyncio.Semaphore(OPENAI_TOOL_CONCURRENCY)
+
+        async def run_tool_call(tool_call) -> Dict[str, str]:
+            async with slots:
+                result = await self._run_tool_call(tool_call.function.name, tool_call.function.arguments)
+            return {
+                "tool_call_id": tool_call.id,
+                "output": json.dumps(result)
+            }
+
+        # Outputs stay in the order the run listed the calls
+        return list(await asyncio.gather(*[run_tool_call(tool_call) for tool_call in tool_calls]))
+
+    async def _run_tool_call(self, function_name: str, raw_arguments: str) -> Any:
+        """Execute one tool call; a failure becomes an error output the assistant can read instead of aborting the chat"""
+        try:
+            arguments = json.loads(raw_arguments) if raw_arguments else {}
+            return await self._execute_function(function_name, arguments)
+        except asyncio.TimeoutError:
+            logger.warning(f"Function {function_name} timed out")
+            return {"error": {"type": "timeout", "function": function_name,
+                              "message": f"{function_name} did not respond in time"}}
+        except ToolStillRunningError:
+            logger.warning(f"Function {function_name} is still running past its time limit")
+            return {"error": {"type": "still_processing", "function": function_name,
+                              "message": f"{function_name} is still being processed and will finish on its own; do not call it again"}}
+        except json.JSONDecodeError as e:
+            logger.error(f"Invalid arguments for function {function_name}: {str(e)}")
+            return {"error": {"type": "invalid_arguments", "function": function_name, "message": str(e)}}
+        except Exception as e:
+            logger.error(f"Function {function_name} failed: {str(e)}")
+            return {"error": {"type": "execution_error", "function": function_name, "message": str(e)}}
+
+    async def _poll_run(self, thread_id: str, run_id: str, handle: Optional[RunHandle] = None):
+        """Wait for a run by polling it with backoff, handling function calls along the way"""
+        total_polls = 0
+        while True:
+            run_status, polls = await run_poller.poll(
+                lambda: self._request(
                     self.client.beta.threads.runs.retrieve,
                     thread_id=thread_id,
-                    run_id=run.id
+                    run_id=run_id
+                ),
+                lambda run: run.status == "requires_action" or run.status in TERMINAL_RUN_STATUSES
+            )
+            total_polls += polls
+
+            if run_status.status == "requires_action":
+                tool_calls = run_status.required_action.submit_tool_outputs.tool_calls
+                if handle is not None:
+                    handle.tools.extend(tool_call.function.name for tool_call in tool_calls)
+                    handle.steps += 1
+                tool_outputs = await self._run_tool_calls(tool_calls)
+
+                # Submit tool outputs back to the run
+                await self._request(
+                    self.client.beta.threads.runs.submit_tool_outputs,
+                    thread_id=thread_id,
+                    run_id=run_id,
+                    tool_outputs=tool_outputs
                 )
-                
-                if run_status.status == "requires_action":
-                    tool_calls = run_status.required_action.submit_tool_outputs.tool_calls
-                    tool_outputs = []
-                    
-                    for tool_call in tool_calls:
-                        function_name = tool_call.function.name
-                        arguments = json.loads(tool_call.function.arguments)
-                        
-                        # Execute the function
-                        result = await self._execute_function(function_name, arguments)
-                        
-                        tool_outputs.append({
-                            "tool_call_id": tool_call.id,
-                            "output": json.dumps(result)
-                        })
-                    
-                    # Submit tool outputs back to the run
-                    await self._run_sync(
-                        self.client.beta.threads.runs.submit_tool_outputs,
+                # The next step starts polling quickly again
+                continue
+
+            run_poller.record(total_polls)
+            return run_status
+
+    async def _start_run(self, thread_id: Optional[str], assistant_id: str, content: Any, **kwargs):
+        """Post the user's message and start a run on it, in as few round trips as possible
+
+        With combined runs the message travels with the run: one createAndRun call when there
+        is no thread yet, or runs.create with additional_messages. If that is rejected, the
+        message is posted on its own first, as before. Callers hold a request slot while it opens.
+
+        Returns:
+            The run, or its event stream when stream=True is passed
+        """
+        message = {"role": "user", "content": content}
+        if self.combined_runs:
+            try:
+                if thread_id:
+                    return await self.client.beta.threads.runs.create(
                         thread_id=thread_id,
-                        run_id=run.id,
-                        tool_outputs=tool_outputs
-                    )
-                    continue
-                
-                if run_status.status in ["completed", "failed", "expired"]:
-                    break
-                    
-                await asyncio.sleep(1)
-
-            # Get messages with proper content handling
-            messages = await self._run_sync(
-                self.client.beta.threads.messages.list,
-                thread_id=thread_id,
-                order="desc",
-                limit=10
-            )
-
-            # Process messages with proper content extraction
-            processed_messages = []
-            for msg in messages.data:
-                content = []
-                for content_item in msg.content:
-                    if content_item.type == 'text':
-                        content.append({
-                            'type': 'text',
-                            'text': content_item.text.value
-                        })
-                    elif content_item.type == 'image':
-                        content.append({
-                            'type': 'image_file',
-                            'image_file': content_item.image_file.file_id
-                        })
-                processed_messages.append(
-                    ChatMessage(
-                        role=msg.role,
-                        content=content[0]['text'] if content else ""  # Extract just the text content
+                        assistant_id=assistant_id,
+                        additional_messages=[message],
+                        **kwargs
                     )
+                return await self.client.beta.threads.create_and_run(
+                    assistant_id=assistant_id,
+                    thread={"messages": [message]},
+                    **kwargs
                 )
-
-            return ChatResponse(
-                thread_id=thread_id,
-                messages=processed_messages,
-                status=run_status.status
-            )
-
-        except Exception as e:
-            logger.error(f"Chat error: {str(e)}")
-            raise ValueError(f"Chat error: {str(e)}")
+            except APIConnectionError:
+                # The request may have been applied; retrying it another way could post the message twice
+                raise
+            except Exception as e:
+                logger.warning(f"Combined run request failed, posting the message separately: {str(e)}")
+
+        if not thread_id:
+            thread = await self.client.beta.threads.create()
+            thread_id = thread.id
+        await self.client.beta.threads.messages.create(thread_id=thread_id, **message)
+        return await self.client.beta.threads.runs.create(
+            thread_id=thread_id,
+            assistant_id=assistant_id,
+            **kwargs
+        )
+
+    async def _stream_run(self, handle: RunHandle, assistant_id: str, content: Any) -> Tuple[str, Any, List[ChatMessage]]:
+        """Post a message on handle's thread (a new one if it has none), run the assistant and follow
+        the run's event stream until it finishes, handling function calls as they arrive
+
+        Returns:
+            The thread ID, the final run and the assistant messages it wrote, newest first
+        """
+        texts: Dict[str, str] = {}
+
+        # A request slot is held only until the stream opens; reading the run's events does not need one
+        async with openai_client.slots:
+            stream = await self._start_run(handle.thread_id, assistant_id, content, stream=True)
+        run = await self._consume_run_stream(stream, texts, handle)
+        thread_id = handle.thread_id
+
+        while run is not None and run.status == "requires_action":
+            # Tools run without holding a request slot; only opening the next stream needs one
+            tool_calls = run.required_action.submit_tool_outputs.tool_calls
+            handle.tools.extend(tool_call.function.name for tool_call in tool_calls)
+            handle.steps += 1
+            tool_outputs = await self._run_tool_calls(tool_calls)
+            async with openai_client.slots:
+                stream = await self.client.beta.threads.runs.submit_tool_outputs(
+                    thread_id=thread_id,
+                    run_id=run.id,
+                    tool_outputs=tool_outputs,
+                    stream=True
+                )
+            run = await self._consume_run_stream(stream, texts, handle)
+
+        if run is None or run.status not in TERMINAL_RUN_STATUSES:
+            raise ValueError("Run stream ended before the run finished")
+
+        if texts:
+            thread_cursors.advance(thread_id, list(texts)[-1])
+        messages = [ChatMessage(role="assistant", content=text) for text in texts.values()]
+        return thread_id, run, list(reversed(messages))
+
+    @staticmethod
+    async def _consume_run_stream(stream, texts: Dict[str, str], handle: Optional[RunHandle] = None):
+        """Read a run event stream until the run needs tool outputs or finishes
+
+        Assistant text is collected into texts, keyed by message ID, as the deltas arrive, and
+        handle follows the run as soon as it is created. Returns the last run object seen.
+        """
+        run = None
+        async with stream:
+            async for event in stream:
+                if event.event == "thread.message.delta":
+                    for delta in event.data.delta.content or []:
+                        if delta.type == "text" and delta.text and delta.text.value:
+                            texts[event.data.id] = texts.get(event.data.id, "") + delta.text.value
+                elif event.event == "thread.message.completed":
+                    # The completed message is authoritative, e.g. if a delta was missed
+                    text = next((c.text.value for c in event.data.content if c.type == "text"), None)
+                    if text is not None:
+                        texts[event.data.id] = text
+                elif event.event.startswith("thread.run.") and not event.event.startswith("thread.run.step"):
+                    run = event.data
+                    if handle is not None:
+                        handle.track(run)
+                    if run.status == "requires_action" or run.status in TERMINAL_RUN_STATUSES:
+                        break
+                elif event.event == "error":
+                    raise ValueError(f"Run stream error: {event.data.message}")
+        return run
+
+    async def _list_run_messages(self, thread_id: str, run_id: str) -> List[ChatMessage]:
+        """Get the messages a run added, newest first, as plain-text chat messages
+
+        Only this run's messages are listed, starting after the newest message already seen on
+        the thread, so each turn fetches just the new reply instead of the last 10 messages.
+        """
+        cursor = thread_cursors.get(thread_id)
+        params = {"thread_id": thread_id, "run_id": run_id, "order": "asc", "limit": 20}
+        if cursor:
+            params["after"] = cursor
+        messages = await self._request(self.client.beta.threads.messages.list, **params)
+        if cursor and not messages.data:
+            # The cursor message may be gone (e.g. deleted); list the run's messages without it
+            del params["after"]
+            messages = await self._request(self.client.beta.threads.messages.list, **params)
+
+        processed_messages = []
+        for msg in messages.data:
+            # Extract just the text content
+            text = next((item.text.value for item in msg.content if item.type == "text"), "")
+            processed_messages.append(ChatMessage(role=msg.role, content=text))
+        if messages.data:
+            thread_cursors.advance(thread_id, messages.data[-1].id)
+        return list(reversed(processed_messages))
 
     async def expire_run(self, thread_id: str, run_id: str) -> RunStatus:
         """Expire a run by cancelling it and updating its status."""
         try:
-            # The OpenAI client already handles async operations internally
-            run = self.client.beta.threads.runs.cancel(
+            run = await self._request(
+                self.client.beta.threads.runs.cancel,
                 thread_id=thread_id,
                 run_id=run_id
             )
             return RunStatus(
-                run_id=run.id,
                 status="expired",
-                required_action=None,
-                last_error=None
+                response_data=run.model_dump()
             )
         except Exception as e:
             raise Exception(f"Failed to expire run: {str(e)}")
 
+    async def rotate_thread(self, thread_id: str) -> Optional[str]:
+        """
+        Replace a thread that has grown too long with a new one seeded with a summary of it.
+
+        The latest OPENAI_THREAD_SUMMARY_MESSAGES messages are summarized and the new thread
+        gets the summary followed by the last OPENAI_THREAD_CARRY_MESSAGES messages verbatim.
+        Messages that reach the old thread meanwhile are copied over once its run has finished.
+        Returns the new thread ID, or None if the thread wasn't rotated.
+        """
+        if not thread_rotation.begin(thread_id):
+            return None
+        new_thread_id = None
+        try:
+            messages = await self._request(
+                self.client.beta.threads.messages.list,
+                thread_id=thread_id,
+                order="desc",
+                limit=OPENAI_THREAD_SUMMARY_MESSAGES
+            )
+            history = [(msg.role, self._message_text(msg)) for msg in reversed(messages.data)]
+            if not history:
+                return None
+
+            completion = await self._request(
+                self.client.chat.completions.create,
+                model=OPENAI_THREAD_SUMMARY_MODEL,
+                messages=[
+                    {"role": "system", "content": THREAD_SUMMARY_PROMPT},
+                    {"role": "user", "content": "\n".join(f"{role}: {text}" for role, text in history)}
+                ]
+            )
+            summary = completion.choices[0].message.content
+
+            recent = history[-OPENAI_THREAD_CARRY_MESSAGES:] if OPENAI_THREAD_CARRY_MESSAGES > 0 else []
+            thread = await self._request(
+                self.client.beta.threads.create,
+                messages=[{"role": "user", "content": f"{THREAD_SUMMARY_HEADER}\n{summary}"}] + [
+                    {"role": role, "content": text} for role, text in recent if text
+                ],
+                metadata={"rotated_from": thread_id}
+            )
+
+            if not await self._catch_up_thread(thread_id, thread.id, messages.data[0].id):
+                thread_rotation.aborted += 1
+                logger.info(f"Thread {thread_id} stayed busy while being rotated; trying again after a later turn")
+                await self._request(self.client.beta.threads.delete, thread_id=thread.id)
+                return None
+
+            new_thread_id = thread.id
+            thread_cursors.forget(thread_id)
+            logger.info(f"Rotated thread {thread_id} to {new_thread_id} with a summary of {len(history)} messages")
+            return new_thread_id
+
+        except Exception as e:
+            thread_rotation.failures += 1
+            logger.error(f"Failed to rotate thread {thread_id}: {str(e)}")
+            return None
+        finally:
+            thread_rotation.finish(thread_id, new_thread_id)
+
+    async def _catch_up_thread(self, thread_id: str, new_thread_id: str, last_message_id: str) -> bool:
+        """Copy the messages added to thread_id after last_message_id to new_thread_id, once no run is
+        active on it; False if the thread stayed busy"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + OPENAI_CHAT_BUDGET
+        while loop.time() < deadline:
+            if thread_run_serializer.active(thread_id):
+                await asyncio.sleep(0.1)
+                continue
+
+            newer = await self._request(
+                self.client.beta.threads.messages.list,
+                thread_id=thread_id,
+                order="asc",
+                after=last_message_id,
+                limit=100
+            )
+            if not newer.data:
+                return True
+            for msg in newer.data:
+                await self._request(
+                    self.client.beta.threads.messages.create,
+                    thread_id=new_thread_id,
+                    role=msg.role,
+                    content=self._message_text(msg)
+                )
+            last_message_id = newer.data[-1].id
+        return False
+
+    @staticmethod
+    def _message_text(message) -> str:
+        return "\n".join(item.text.value if item.type == "text" else "[image]" for item in message.content)
+
+    def _take_ready_thread(self) -> Optional[str]:
+        """Take a pre-created thread if the warm pool has one ready for this client"""
+        if warm_thread_pool.serves(self.client):
+            return warm_thread_pool.take_ready()
+        return None
+
     async def _create_initial_thread(self) -> str:
-        """Create a new thread and return its ID"""
-        thread = await self._run_sync(self.client.beta.threads.create)
+        """Get a new empty thread ID, taken from the warm pool when it serves this client"""
+        if warm_thread_pool.serves(self.client):
+            return await warm_thread_pool.take()
+        thread = await self._request(self.client.beta.threads.create)
         return thread.id
 
     async def manychat(self, request: ManyChatRequest) -> ManyChatResponse:
@@ -345,6 +805,9 @@ class OpenAIAssistantService:
             if not request.subscriber_id and not request.phone_number:
                 raise ValueError("Either subscriber_id or phone_number must be provided")
 
+            # Refuse before creating a thread if the chat queue is full
+            chat_job_queue.check_capacity()
+
             # Create thread if not provided
             thread_id = request.thread_id
             if not thread_id:
@@ -355,8 +818,9 @@ class OpenAIAssistantService:
             request_data['thread_id'] = thread_id
             new_request = ManyChatRequest(**request_data)
 
-            # Start background processing
-            asyncio.create_task(self._process_manychat_background(new_request))
+            # Queue background processing
+            chat_job_queue.submit("manychat", lambda: self._process_manychat_background(new_request),
+                                  payload=new_request.model_dump(mode="json"))
 
             # Return immediate response with thread_id
             return ManyChatResponse(
@@ -366,6 +830,8 @@ class OpenAIAssistantService:
                 status="processing"
             )
 
+        except QueueFullError:
+            raise
         except Exception as e:
             raise ValueError(f"ManyChat request error: {str(e)}")
 
@@ -402,13 +868,15 @@ class OpenAIAssistantService:
                             "customer_name": customer_name
                         }
                     })
-                )]
+                )],
+                phone_number=phone_number
             ))
 
             # Get the assistant's response
             assistant_message = next((msg for msg in chat_response.messages if msg.role == "assistant"), None)
             if assistant_message and assistant_message.content:
-                ai_response = assistant_message.content[0].text
+                content = assistant_message.content
+                ai_response = content if isinstance(content, str) else content[0].text
                 
                 # Set custom field with the response
                 if request.subscriber_id:
@@ -428,7 +896,8 @@ class OpenAIAssistantService:
                 )
 
         except Exception as e:
-            print(f"Background task error: {str(e)}")
+            # Logged and counted as a failed job by the chat queue
+            raise ValueError(f"Background task error: {str(e)}")
 
     async def whatsapp_chat(self, request: WhatsAppChatRequest) -> WhatsAppResponse:
         """Handle WhatsApp chat request asynchronously"""
@@ -437,17 +906,20 @@ class OpenAIAssistantService:
             if not request.phone_number:
                 raise ValueError("Phone number is required")
 
+            # Refuse before creating a thread if the chat queue is full
+            chat_job_queue.check_capacity()
+
             # Create thread if not provided
             thread_id = request.thread_id or await self._create_initial_thread()
 
-            # Create background task with updated request
+            # Create background job with updated request
             request_data = request.model_dump()
             request_data['thread_id'] = thread_id  # Update thread_id in data
-            
-            # Create background task without double thread_id
-            asyncio.create_task(self._process_whatsapp_background(
-                WhatsAppChatRequest(**request_data)
-            ))
+            new_request = WhatsAppChatRequest(**request_data)
+
+            # Queue background processing without double thread_id
+            chat_job_queue.submit("whatsapp_chat", lambda: self._process_whatsapp_background(new_request),
+                                  payload=new_request.model_dump(mode="json"))
 
             return WhatsAppResponse(
                 assistant_id=request.assistant_id,
@@ -455,6 +927,8 @@ class OpenAIAssistantService:
                 status="processing"
             )
 
+        except QueueFullError:
+            raise
         except Exception as e:
             raise ValueError(f"WhatsApp chat error: {str(e)}")
 
@@ -482,8 +956,14 @@ class OpenAIAssistantService:
                             "customer_name": request.customer_name
                         }
                     })
-                )]
+                )],
+                phone_number=request.phone_number
             ))
 
         except Exception as e:
-            print(f"Background task error: {str(e)}")
+            # Logged and counted as a failed job by the chat queue
+            raise ValueError(f"Background task error: {str(e)}")
+
+# Run background chats replayed from the job journal after a restart
+chat_job_queue.register("manychat", lambda payload: OpenAIAssistantService()._process_manychat_background(ManyChatRequest(**payload)))
+chat_job_queue.register("whatsapp_chat", lambda payload: OpenAIAssistantService()._process_whatsapp_background(WhatsAppChatRequest(**payload)))
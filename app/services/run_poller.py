@@ -0,0 +1,122 @@
+import os
+import random
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# First wait between polls, the cap it backs off to, and the growth factor per poll (seconds)
+OPENAI_POLL_INITIAL_DELAY = float(os.getenv('OPENAI_POLL_INITIAL_DELAY', '0.2'))
+OPENAI_POLL_MAX_DELAY = float(os.getenv('OPENAI_POLL_MAX_DELAY', '0.8'))
+OPENAI_POLL_MULTIPLIER = float(os.getenv('OPENAI_POLL_MULTIPLIER', '2.0'))
+# Recent waits remembered to predict how long the next one takes; 0 turns prediction off
+OPENAI_POLL_HISTORY = int(os.getenv('OPENAI_POLL_HISTORY', '50'))
+
+# Waits needed before predictions are trusted, the share of them finishing earlier than the first
+# poll, and how far ahead of that point the first poll is made
+MIN_HISTORY = 5
+EARLY_QUANTILE = 0.1
+FIRST_POLL_MARGIN = 0.9
+
+class RunPoller:
+    """
+    Polls an OpenAI run with exponential backoff and jitter.
+
+    Short runs are seen finishing within a few hundred milliseconds, while long runs settle at
+    about one request every OPENAI_POLL_MAX_DELAY seconds. Once a few waits have finished, the
+    first poll is held back until shortly before the quickest of them were done, so polls that
+    would only find the run still in progress are skipped. The number of polls per run is
+    recorded so the delays can be tuned.
+    """
+    def __init__(self, initial_delay: float = OPENAI_POLL_INITIAL_DELAY, max_delay: float = OPENAI_POLL_MAX_DELAY,
+                 multiplier: float = OPENAI_POLL_MULTIPLIER, history: int = OPENAI_POLL_HISTORY):
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+        # How long recent waits took until done, in seconds
+        self._durations: Deque[float] = deque(maxlen=history or None)
+        self.history = history
+
+        self.runs = 0
+        self.polls = 0
+        self.max_polls = 0
+        self.timeouts = 0
+
+    def delays(self) -> Iterator[float]:
+        """Yield the waits between polls: growing exponentially up to the cap, each jittered by up to a fifth either way"""
+        delay = self.initial_delay
+        while True:
+            # Jitter keeps runs that started together from polling in lockstep, without changing the average interval
+            yield random.uniform(delay * 0.8, delay * 1.2)
+            delay = min(self.max_delay, delay * self.multiplier)
+
+    def first_delay(self) -> float:
+        """How long to wait before the first poll, judging by how long recent waits took"""
+        if self.history <= 0 or len(self._durations) < MIN_HISTORY:
+            return 0.0
+        durations = sorted(self._durations)
+        return durations[int(len(durations) * EARLY_QUANTILE)] * FIRST_POLL_MARGIN
+
+    async def poll(self, fetch: Callable[[], Awaitable[Any]], done: Callable[[Any], bool],
+                   deadline: Optional[float] = None) -> Tuple[Any, int]:
+        """
+        Call fetch until done(result) is true or the deadline passes.
+
+        Args:
+            fetch: Coroutine function returning the current run state
+            done: Whether a result ends the wait
+            deadline: Event loop time (loop.time()) to give up at
+
+        Returns:
+            The last result and the number of polls made
+        """
+        loop = asyncio.get_running_loop()
+        started_at = loop.time()
+        delays = self.delays()
+        polls = 0
+
+        first_delay = self.first_delay()
+        if deadline is not None:
+            first_delay = min(first_delay, deadline - started_at)
+        if first_delay > 0:
+            await asyncio.sleep(first_delay)
+
+        while True:
+            result = await fetch()
+            polls += 1
+            if done(result):
+                if self.history > 0:
+                    self._durations.append(loop.time() - started_at)
+                return result, polls
+
+            delay = next(delays)
+            if deadline is not None:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    return result, polls
+                delay = min(delay, remaining)
+            await asyncio.sleep(delay)
+
+    def record(self, polls: int, timed_out: bool = False) -> None:
+        """Publish how many polls one run took"""
+        self.runs += 1
+        self.polls += polls
+        self.max_polls = max(self.max_polls, polls)
+        if timed_out:
+            self.timeouts += 1
+        logger.debug(f"Run finished after {polls} polls{' (timed out)' if timed_out else ''}")
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "runs": self.runs,
+            "polls": self.polls,
+            "polls_per_run": round(self.polls / self.runs, 2) if self.runs else 0.0,
+            "max_polls": self.max_polls,
+            "timeouts": self.timeouts,
+            "first_poll_delay": round(self.first_delay(), 3)
+        }
+
+# Create singleton instance
+run_poller = RunPoller()
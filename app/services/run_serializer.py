@@ -0,0 +1,119 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Runs a message (content) on a thread and returns the chat response
+RunMessage = Callable[[Any], Awaitable[Any]]
+
+def merge_contents(contents: List[Any]) -> Any:
+    """Combine several message contents into one: text is joined by newlines, content lists are concatenated"""
+    if all(isinstance(content, str) for content in contents):
+        return "\n".join(contents)
+
+    merged = []
+    for content in contents:
+        if isinstance(content, str):
+            merged.append({"type": "text", "text": content})
+        else:
+            merged.extend(item.model_dump(exclude_none=True) if hasattr(item, "model_dump") else item for item in content)
+    return merged
+
+class ThreadRunSerializer:
+    """
+    One run at a time per thread, with messages that arrive meanwhile merged into a follow-up run.
+
+    OpenAI rejects new messages on a thread while a run is active. Instead, messages sent during
+    a run wait here; when the run ends they are posted together as one message and answered by
+    a single run. The newest message's caller gets that reply; the others get `coalesced`, so
+    one answer is sent for the whole burst.
+    """
+    def __init__(self):
+        # Threads with an active run, and the messages waiting for it to finish
+        self._pending: Dict[str, List[Tuple[Any, RunMessage, asyncio.Future]]] = {}
+        self._follow_ups: Set[asyncio.Task] = set()
+
+        self.runs = 0
+        self.follow_up_runs = 0
+        self.coalesced_messages = 0
+
+    def active(self, thread_id: str) -> bool:
+        return thread_id in self._pending
+
+    async def submit(self, thread_id: str, content: Any, run: RunMessage, coalesced: Callable[[], Any]) -> Any:
+        """
+        Run a message on a thread, or queue it behind the thread's active run.
+
+        Args:
+            thread_id: Thread to post to
+            content: Message content
+            run: Coroutine function posting content and running the assistant, returning the response
+            coalesced: Builds the response for callers whose message was answered by another caller's reply
+        """
+        if thread_id in self._pending:
+            future = asyncio.get_running_loop().create_future()
+            self._pending[thread_id].append((content, run, future))
+            self.coalesced_messages += 1
+            result = await future
+            return coalesced() if result is None else result
+
+        self._pending[thread_id] = []
+        self.runs += 1
+        try:
+            return await run(content)
+        finally:
+            if self._pending[thread_id]:
+                task = asyncio.create_task(self._run_follow_ups(thread_id))
+                # Keep a reference so the task isn't garbage collected mid-run
+                self._follow_ups.add(task)
+                task.add_done_callback(self._follow_ups.discard)
+            else:
+                del self._pending[thread_id]
+
+    async def _run_follow_ups(self, thread_id: str) -> None:
+        """Answer the messages queued during a run with one run per batch, until none are left"""
+        batch = []
+        try:
+            while self._pending[thread_id]:
+                batch = self._pending[thread_id]
+                self._pending[thread_id] = []
+                self.runs += 1
+                self.follow_up_runs += 1
+                if len(batch) > 1:
+                    logger.info(f"Merging {len(batch)} messages into one run on thread {thread_id}")
+
+                try:
+                    # The newest message's run function (e.g. its assistant) answers the batch
+                    content = merge_contents([item[0] for item in batch])
+                    run = batch[-1][1]
+                    result = await run(content)
+                except Exception as e:
+                    for _, _, future in batch:
+                        if not future.done():
+                            future.set_exception(e)
+                    continue
+
+                # Callers that gave up (e.g. timed out) are skipped; the newest one still waiting gets the reply
+                waiting = [future for _, _, future in batch if not future.done()]
+                for future in waiting[:-1]:
+                    future.set_result(None)
+                if waiting:
+                    waiting[-1].set_result(result)
+        finally:
+            # However the loop ended (e.g. cancelled at shutdown), the thread must accept runs again
+            # and no caller may be left waiting on a batch that will never run
+            for _, _, future in batch + self._pending.pop(thread_id, []):
+                if not future.done():
+                    future.set_exception(RuntimeError(f"Follow-up run on thread {thread_id} was stopped"))
+
+    def metrics(self) -> Dict[str, int]:
+        return {
+            "runs": self.runs,
+            "follow_up_runs": self.follow_up_runs,
+            "coalesced_messages": self.coalesced_messages,
+            "active_threads": len(self._pending)
+        }
+
+# Create singleton instance
+thread_run_serializer = ThreadRunSerializer()
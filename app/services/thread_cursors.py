@@ -0,0 +1,33 @@
+import os
+from collections import OrderedDict
+from typing import Optional
+
+# Threads whose latest seen message is remembered; the least recently active are forgotten first
+OPENAI_THREAD_CURSORS_MAX = int(os.getenv('OPENAI_THREAD_CURSORS_MAX', '10000'))
+
+class ThreadCursors:
+    """
+    The newest message seen on each thread, used as the `after` cursor when listing messages.
+
+    Only messages added since the last chat turn are fetched. A forgotten thread simply
+    starts again from its run's messages.
+    """
+    def __init__(self, max_threads: int = OPENAI_THREAD_CURSORS_MAX):
+        self.max_threads = max_threads
+        self._cursors: "OrderedDict[str, str]" = OrderedDict()
+
+    def get(self, thread_id: str) -> Optional[str]:
+        return self._cursors.get(thread_id)
+
+    def advance(self, thread_id: str, message_id: str) -> None:
+        """Record the newest message seen on a thread"""
+        self._cursors[thread_id] = message_id
+        self._cursors.move_to_end(thread_id)
+        while len(self._cursors) > self.max_threads:
+            self._cursors.popitem(last=False)
+
+    def forget(self, thread_id: str) -> None:
+        self._cursors.pop(thread_id, None)
+
+# Create singleton instance
+thread_cursors = ThreadCursors()
@@ -0,0 +1,188 @@
+import os
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+from openai import AsyncOpenAI
+from .openai_client import openai_client
+
+logger = logging.getLogger(__name__)
+
+# Empty threads kept ready for first messages; 0 turns the pool off. Off by default: with combined
+# runs a new thread is created along with its first run, so a pooled thread saves little
+OPENAI_THREAD_POOL_SIZE = int(os.getenv('OPENAI_THREAD_POOL_SIZE', '0'))
+# Refill starts when fewer threads than this are left, creating this many at once
+OPENAI_THREAD_POOL_LOW_WATER = int(os.getenv('OPENAI_THREAD_POOL_LOW_WATER', '3'))
+OPENAI_THREAD_POOL_REFILL_CONCURRENCY = int(os.getenv('OPENAI_THREAD_POOL_REFILL_CONCURRENCY', '2'))
+# Pooled threads older than this (seconds) are not handed out
+OPENAI_THREAD_POOL_MAX_AGE = float(os.getenv('OPENAI_THREAD_POOL_MAX_AGE', '86400'))
+# Seconds shutdown spends deleting the threads still in the pool
+OPENAI_THREAD_POOL_CLEANUP_TIMEOUT = float(os.getenv('OPENAI_THREAD_POOL_CLEANUP_TIMEOUT', '10'))
+
+class WarmThreadPool:
+    """
+    Pool of pre-created empty OpenAI threads.
+
+    First messages from new customers take a thread from the pool instead of waiting for
+    threads.create. The pool is refilled in the background once it drops below the low-water
+    mark; when it is empty a thread is created inline as before. Threads that expire in the
+    pool, and those left over at shutdown, are deleted so none are left behind unused.
+    """
+    def __init__(self, size: int = OPENAI_THREAD_POOL_SIZE, low_water: int = OPENAI_THREAD_POOL_LOW_WATER,
+                 refill_concurrency: int = OPENAI_THREAD_POOL_REFILL_CONCURRENCY, max_age: float = OPENAI_THREAD_POOL_MAX_AGE):
+        self.size = size
+        self.low_water = low_water
+        self.refill_concurrency = max(1, refill_concurrency)
+        self.max_age = max_age
+        self._client: Optional[AsyncOpenAI] = None
+        self._threads: Deque[Tuple[str, float]] = deque()
+        self._refill_task: Optional[asyncio.Task] = None
+        self._delete_tasks: Set[asyncio.Task] = set()
+
+        self.hits = 0
+        self.misses = 0
+        self.created = 0
+        self.deleted = 0
+        self.refill_errors = 0
+
+    @property
+    def client(self) -> AsyncOpenAI:
+        """The client threads are created with; the shared client unless one was set"""
+        return self._client or openai_client.client
+
+    @client.setter
+    def client(self, client: Optional[AsyncOpenAI]) -> None:
+        self._client = client
+        self._threads.clear()
+
+    def serves(self, client: AsyncOpenAI) -> bool:
+        """Whether pooled threads can be used with this client"""
+        if self.size <= 0:
+            return False
+        try:
+            return client is self.client
+        except ValueError:
+            # No API key, so there is no shared client to pool threads for
+            return False
+
+    @property
+    def available(self) -> int:
+        return len(self._threads)
+
+    async def _create(self) -> str:
+        async with openai_client.slots:
+            thread = await self.client.beta.threads.create()
+        self.created += 1
+        return thread.id
+
+    async def _delete(self, thread_ids: List[str]) -> None:
+        """Delete pooled threads that will never be handed out"""
+        async def delete(thread_id: str) -> None:
+            try:
+                async with openai_client.slots:
+                    await self.client.beta.threads.delete(thread_id)
+                self.deleted += 1
+            except Exception as e:
+                logger.warning(f"Failed to delete pooled thread {thread_id}: {str(e)}")
+
+        await asyncio.gather(*[delete(thread_id) for thread_id in thread_ids])
+
+    def take_ready(self) -> Optional[str]:
+        """Get a pooled thread ID without waiting, or None if the pool is empty"""
+        now = time.monotonic()
+        thread_id = None
+        expired = []
+        while self._threads:
+            pooled_id, created_at = self._threads.popleft()
+            if now - created_at < self.max_age:
+                thread_id = pooled_id
+                break
+            expired.append(pooled_id)
+
+        if expired:
+            task = asyncio.create_task(self._delete(expired))
+            self._delete_tasks.add(task)
+            task.add_done_callback(self._delete_tasks.discard)
+
+        if thread_id is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+        self._maybe_refill()
+        return thread_id
+
+    async def take(self) -> str:
+        """Get an empty thread ID, from the pool if one is ready"""
+        return self.take_ready() or await self._create()
+
+    def _maybe_refill(self) -> None:
+        if self.size <= 0 or len(self._threads) >= self.low_water:
+            return
+        if self._refill_task is None or self._refill_task.done():
+            self._refill_task = asyncio.create_task(self._refill())
+
+    async def _refill(self) -> None:
+        """Create threads until the pool is full, refill_concurrency at a time"""
+        while len(self._threads) < self.size:
+            batch = min(self.size - len(self._threads), self.refill_concurrency)
+            results = await asyncio.gather(*[self._create() for _ in range(batch)], return_exceptions=True)
+            for result in results:
+                if isinstance(result, BaseException):
+                    continue
+                self._threads.append((result, time.monotonic()))
+
+            failures = [result for result in results if isinstance(result, BaseException)]
+            if failures:
+                # Try again on the next take rather than hammering a failing API
+                self.refill_errors += len(failures)
+                logger.warning(f"Failed to pre-create {len(failures)} threads: {str(failures[0])}")
+                return
+
+    async def start(self) -> None:
+        """Fill the pool in the background"""
+        if self.size <= 0:
+            return
+        try:
+            self.client
+        except ValueError as e:
+            logger.warning(f"Thread pool not started: {str(e)}")
+            return
+        if self._refill_task is None or self._refill_task.done():
+            self._refill_task = asyncio.create_task(self._refill())
+
+    async def stop(self) -> None:
+        """Stop refilling and delete the threads nobody took"""
+        if self._refill_task is not None and not self._refill_task.done():
+            self._refill_task.cancel()
+            try:
+                await self._refill_task
+            except asyncio.CancelledError:
+                pass
+        self._refill_task = None
+
+        thread_ids = [thread_id for thread_id, _ in self._threads]
+        self._threads.clear()
+        if not thread_ids and not self._delete_tasks:
+            return
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(self._delete(thread_ids), *self._delete_tasks),
+                timeout=OPENAI_THREAD_POOL_CLEANUP_TIMEOUT
+            )
+        except asyncio.TimeoutError:
+            logger.warning(f"Gave up deleting pooled threads after {OPENAI_THREAD_POOL_CLEANUP_TIMEOUT}s")
+        logger.info(f"Deleted {self.deleted} unused pooled threads")
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "available": len(self._threads),
+            "hits": self.hits,
+            "misses": self.misses,
+            "created": self.created,
+            "deleted": self.deleted,
+            "refill_errors": self.refill_errors
+        }
+
+# Create singleton instance
+warm_thread_pool = WarmThreadPool()
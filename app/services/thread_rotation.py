@@ -0,0 +1,99 @@
+import os
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Set, Tuple
+from ..utils.usage_store import usage_store
+
+logger = logging.getLogger(__name__)
+
+# A thread is replaced by a summarized one once its last run's prompt per model step reached this
+# many tokens, or after this many runs; 0 turns a limit off
+OPENAI_THREAD_MAX_PROMPT_TOKENS = int(os.getenv('OPENAI_THREAD_MAX_PROMPT_TOKENS', '12000'))
+OPENAI_THREAD_MAX_TURNS = int(os.getenv('OPENAI_THREAD_MAX_TURNS', '40'))
+# Model writing the summary, how many of the latest messages it reads, and how many of them
+# are copied to the new thread word for word after the summary
+OPENAI_THREAD_SUMMARY_MODEL = os.getenv('OPENAI_THREAD_SUMMARY_MODEL', 'gpt-4o-mini')
+OPENAI_THREAD_SUMMARY_MESSAGES = int(os.getenv('OPENAI_THREAD_SUMMARY_MESSAGES', '40'))
+OPENAI_THREAD_CARRY_MESSAGES = int(os.getenv('OPENAI_THREAD_CARRY_MESSAGES', '4'))
+# Threads whose size is tracked in memory; the least recently active are forgotten first
+OPENAI_THREAD_SIZES_MAX = int(os.getenv('OPENAI_THREAD_SIZES_MAX', '10000'))
+
+class ThreadRotationPolicy:
+    """
+    Tracks how large each thread's context has become and decides when to rotate it.
+
+    Every run re-reads the whole thread, so prompt tokens, cost and latency grow with a
+    customer's tenure. Once a thread passes the prompt token or turn limit, the caller starts
+    a fresh thread seeded with a summary of it (OpenAIAssistantService.rotate_thread). Sizes
+    come from finished runs and, for threads not seen since a restart, from the usage store.
+    """
+    def __init__(self, max_prompt_tokens: int = OPENAI_THREAD_MAX_PROMPT_TOKENS, max_turns: int = OPENAI_THREAD_MAX_TURNS,
+                 max_threads: int = OPENAI_THREAD_SIZES_MAX):
+        self.max_prompt_tokens = max_prompt_tokens
+        self.max_turns = max_turns
+        self.max_threads = max_threads
+        # Runs seen and the prompt tokens per model step of the latest one, per thread
+        self._sizes: "OrderedDict[str, Tuple[int, int]]" = OrderedDict()
+        self._rotating: Set[str] = set()
+
+        self.rotations = 0
+        self.aborted = 0
+        self.failures = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_prompt_tokens > 0 or self.max_turns > 0
+
+    def observe(self, thread_id: str, prompt_tokens: int) -> None:
+        """Record a finished run on a thread, with the prompt tokens of one of its model steps"""
+        turns = self.size(thread_id)[0] + 1
+        self._sizes[thread_id] = (turns, prompt_tokens)
+        self._sizes.move_to_end(thread_id)
+        while len(self._sizes) > self.max_threads:
+            self._sizes.popitem(last=False)
+
+    def size(self, thread_id: str) -> Tuple[int, int]:
+        """Runs on a thread and the prompt tokens of the latest one"""
+        size = self._sizes.get(thread_id)
+        if size is None and usage_store is not None:
+            try:
+                size = usage_store.thread_size(thread_id)
+            except Exception as e:
+                logger.error(f"Failed to read the size of thread {thread_id}: {str(e)}")
+        return size or (0, 0)
+
+    def should_rotate(self, thread_id: Optional[str]) -> bool:
+        """Whether a thread has outgrown its budget and isn't being rotated already"""
+        if not thread_id or not self.enabled or thread_id in self._rotating:
+            return False
+        turns, prompt_tokens = self.size(thread_id)
+        return ((self.max_prompt_tokens > 0 and prompt_tokens >= self.max_prompt_tokens)
+                or (self.max_turns > 0 and turns >= self.max_turns))
+
+    def begin(self, thread_id: str) -> bool:
+        """Claim a thread for rotation; False if it is already being rotated"""
+        if thread_id in self._rotating:
+            return False
+        self._rotating.add(thread_id)
+        return True
+
+    def finish(self, thread_id: str, new_thread_id: Optional[str]) -> None:
+        """Release a thread after rotating it; new_thread_id is None if the rotation didn't happen"""
+        self._rotating.discard(thread_id)
+        if new_thread_id:
+            self.rotations += 1
+            self._sizes.pop(thread_id, None)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "max_prompt_tokens": self.max_prompt_tokens,
+            "max_turns": self.max_turns,
+            "tracked_threads": len(self._sizes),
+            "rotating": len(self._rotating),
+            "rotations": self.rotations,
+            "aborted": self.aborted,
+            "failures": self.failures
+        }
+
+# Create singleton instance
+thread_rotation = ThreadRotationPolicy()
@@ -8,6 +8,7 @@ from typing import Dict, Any, List, Optional
 import logging
 from ..models.whatsapp_models import WhatsAppWebhookRequest, WhatsAppMessage, WhatsAppContact
 from ..services.openai_service import OpenAIAssistantService
+from ..services.thread_rotation import thread_rotation
 from ..models.assistant_models import ChatRequest, ChatMessage, ContentItem, ImageFileContent, TextContent
 from ..utils.google_sheets import check_customer_exists, update_customer, insert_customer, update_thread_id
 from ..utils.logging_utils import log_whatsapp_message
@@ -73,6 +74,8 @@ class WhatsAppService:
 
         # Initialize message cache for deduplication
         self.message_cache = MessageCache()
+        # Thread rotations running in the background
+        self._rotation_tasks = set()
 
         if not all([self.phone_number_id, self.access_token]):
             raise ValueError("Missing required WhatsApp environment variables")
@@ -330,16 +333,20 @@ class WhatsAppService:
                 messages=[ChatMessage(
                     role="user",
                     content=content_items  # Send content_items directly
-                )]
+                )],
+                phone_number=messages[0].from_
             ))
             
             # Update thread_id if needed
-            if customer and thread_id != chat_response.thread_id:
+            if customer and chat_response.thread_id and thread_id != chat_response.thread_id:
                 logger.info(f"Updating thread_id for customer {customer['phone']} from {thread_id} to {chat_response.thread_id}")
                 await update_thread_id(customer, chat_response.thread_id)
             
             # Send response
-            if chat_response.messages:
+            if chat_response.status == "coalesced":
+                # Merged with other messages sent during the active run; that reply is sent once
+                logger.info(f"Message from {messages[0].from_} merged into the thread's follow-up run")
+            elif chat_response.messages:
                 assistant_message = next(
                     (msg for msg in chat_response.messages if msg.role == "assistant"),
                     None
@@ -370,6 +377,10 @@ class WhatsAppService:
                     logger.error("No assistant message or content found")
             else:
                 logger.error("No messages in chat response")
+
+            # A thread past its context budget is replaced by a summarized one after the reply is sent
+            if customer and thread_rotation.should_rotate(chat_response.thread_id):
+                self._rotate_thread_later({**customer, 'thread_id': chat_response.thread_id}, chat_response.thread_id)
             
             return {"status": "success"}
             
@@ -387,6 +398,24 @@ class WhatsAppService:
             
             return {"status": "error", "message": str(e)}
 
+    def _rotate_thread_later(self, customer: Dict[str, Any], thread_id: str) -> None:
+        """Rotate a customer's thread in the background so the reply isn't held up by summarizing"""
+        task = asyncio.create_task(self._rotate_thread(customer, thread_id))
+        # Keep a reference so the task isn't garbage collected before it finishes
+        self._rotation_tasks.add(task)
+        task.add_done_callback(self._rotation_tasks.discard)
+
+    async def _rotate_thread(self, customer: Dict[str, Any], thread_id: str) -> None:
+        """Start a summarized thread for the customer and store it as their thread_id"""
+        new_thread_id = await self.assistant_service.rotate_thread(thread_id)
+        if not new_thread_id:
+            return
+        try:
+            await update_thread_id(customer, new_thread_id)
+            logger.info(f"Customer {customer['phone']} moved from thread {thread_id} to summarized thread {new_thread_id}")
+        except Exception as e:
+            logger.error(f"Error storing rotated thread for {customer['phone']}: {str(e)}")
+
     async def _download_media(self, media_id: str) -> bytes:
         """Download media from WhatsApp"""
         # First get media URL
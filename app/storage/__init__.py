@@ -0,0 +1,28 @@
+import os
+from typing import Optional
+from .base import StorageBackend
+
+# "sheets" (default) or "sqlite"
+STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'sheets').lower()
+# With the SQLite backend, replay every write to Google Sheets so staff can still see the data
+STORAGE_SHEETS_MIRROR = os.getenv('STORAGE_SHEETS_MIRROR', 'false').lower() == 'true'
+
+_backend: Optional[StorageBackend] = None
+
+def get_storage_backend() -> StorageBackend:
+    """Get the process-wide storage backend selected by STORAGE_BACKEND"""
+    global _backend
+    if _backend is None:
+        if STORAGE_BACKEND == 'sqlite':
+            from .sqlite_backend import SQLiteStorageBackend
+            mirror = None
+            if STORAGE_SHEETS_MIRROR:
+                from .sheets_backend import SheetsStorageBackend
+                mirror = SheetsStorageBackend()
+            _backend = SQLiteStorageBackend(mirror=mirror)
+        elif STORAGE_BACKEND == 'sheets':
+            from .sheets_backend import SheetsStorageBackend
+            _backend = SheetsStorageBackend()
+        else:
+            raise ValueError(f"Unknown STORAGE_BACKEND: {STORAGE_BACKEND}")
+    return _backend
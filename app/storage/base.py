@@ -0,0 +1,73 @@
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Any
+
+# Customer fields update_customer_fields accepts
+UPDATABLE_CUSTOMER_FIELDS = ('name', 'chat_status', 'thread_id')
+
+def check_customer_fields(fields: Dict[str, Any]) -> None:
+    """Raise ValueError if fields names anything update_customer_fields does not update"""
+    unknown = [field for field in fields if field not in UPDATABLE_CUSTOMER_FIELDS]
+    if unknown:
+        raise ValueError(f"Cannot update customer fields: {', '.join(unknown)}")
+
+class StorageBackend(ABC):
+    """
+    Storage for customer, loyalty stamp and invoice data.
+
+    Customer records are dicts with name, phone, email, stamps, chat_status,
+    thread_id and row_number keys. Invoice records are dicts with total, claimed,
+    claimed_by, claimed_at and row_number keys.
+    """
+
+    @abstractmethod
+    async def get_customer(self, phone_number: str) -> Optional[Dict[str, Any]]:
+        """Get a copy of the customer record for a phone number, or None"""
+
+    @abstractmethod
+    async def list_customers(self) -> List[Dict[str, Any]]:
+        """Get copies of all customer records"""
+
+    @abstractmethod
+    async def insert_customer(self, record: Dict[str, Any]) -> None:
+        """Insert a new customer record"""
+
+    @abstractmethod
+    async def update_customer_fields(self, phone_number: str, fields: Dict[str, Any]) -> bool:
+        """Update name, chat_status and/or thread_id; returns False if the customer doesn't exist
+
+        Raises:
+            ValueError: If fields contains any other key
+        """
+
+    @abstractmethod
+    async def set_stamps(self, phone_number: str, balance: int) -> bool:
+        """Store a customer's stamp balance; returns False if the customer doesn't exist"""
+
+    @abstractmethod
+    async def append_stamp_event(self, event: Dict[str, Any]) -> None:
+        """Append a stamp change to the stamp ledger"""
+
+    @abstractmethod
+    async def get_invoices(self, invoice_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Get up-to-date records for the given invoice IDs; unknown IDs are left out"""
+
+    @abstractmethod
+    async def list_invoices(self) -> Dict[str, Dict[str, Any]]:
+        """Get all invoice records keyed by invoice ID"""
+
+    @abstractmethod
+    async def claim_invoices(self, new_invoices: List[Dict[str, Any]], existing_ids: List[str], claimed_by: str, claimed_at: str) -> None:
+        """Record a claim: insert new invoices and mark existing unclaimed ones as claimed
+
+        Args:
+            new_invoices: Invoices not known yet, as {'id': ..., 'total': ...} dicts
+            existing_ids: IDs of known, unclaimed invoices to mark as claimed
+            claimed_by: Claimant description, e.g. "Budi (6281234567890)"
+            claimed_at: Claim timestamp
+        """
+
+    async def start(self) -> None:
+        """Start background work, such as syncing external edits"""
+
+    async def close(self) -> None:
+        """Flush pending writes and release resources"""
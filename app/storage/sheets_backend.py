@@ -0,0 +1,392 @@
+import os
+import re
+import json
+import time
+import hashlib
+import asyncio
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional, Any
+from ..utils.sheets_base import GoogleSheetsBase
+from ..utils.sheets_write_buffer import sheets_write_buffer
+from ..utils.tool_result_cache import tool_result_cache
+from .base import StorageBackend, check_customer_fields
+
+logger = logging.getLogger(__name__)
+
+# How long the in-memory customer index is trusted before it is reloaded from the sheet
+CUSTOMER_CACHE_TTL = int(os.getenv('CUSTOMER_CACHE_TTL', '300'))
+# How long the invoice index is trusted before it is rebuilt from a full sheet read
+INVOICE_CACHE_TTL = int(os.getenv('INVOICE_CACHE_TTL', '600'))
+INVOICE_SHEET_ID = os.getenv('INVOICE_SHEET_ID', '1n0mHlQRbFOVSoykTwUuGIFb9AFbvV9XEHeiJM69Wo5s')
+# Append-only file every stamp change is recorded in
+STAMP_LEDGER_PATH = Path(os.getenv('STAMP_LEDGER_PATH', 'app/data/stamp_ledger.jsonl'))
+
+# Sheet columns of the customer fields that can be updated
+CUSTOMER_COLUMNS = {
+    'name': 'A',
+    'chat_status': 'E',
+    'thread_id': 'F',
+}
+
+def _first_appended_row(result: Optional[Dict[str, Any]]) -> Optional[int]:
+    """Get the first row written by an append, e.g. 57 for "Sheet1!A57:F58" """
+    updated_range = (result or {}).get('updates', {}).get('updatedRange', '')
+    match = re.search(r'![A-Z]+(\d+)', updated_range)
+    return int(match.group(1)) if match else None
+
+class SheetsStorageBackend(StorageBackend):
+    """
+    Google Sheets storage with in-memory indexes in front of it.
+
+    Customers live in Sheet1!A2:F of the loyalty sheet (one row per phone number),
+    invoices in Sheet1!A2:E of the invoice sheet.
+    """
+    def __init__(self):
+        self.customer_sheet = GoogleSheetsBase(
+            sheet_id=os.getenv('LOYALTY_SHEET_ID'),
+            range_name="Sheet1!A2:F"  # A-F for the 6 columns
+        )
+        self.invoice_sheet = GoogleSheetsBase(
+            sheet_id=INVOICE_SHEET_ID,
+            range_name='Sheet1!A2:E'  # A-E for ID, Total, Claimed, Claimed By, Claimed At columns
+        )
+
+        # Phone number -> customer record, loaded once and patched in place on writes
+        self._customers: Dict[str, Dict[str, Any]] = {}
+        self._customers_loaded_at: Optional[float] = None
+        self._customers_lock: Optional[asyncio.Lock] = None
+        # Hash of each sheet row as last seen (index 0 = row 2), used by the change sync
+        self._row_hashes: List[bytes] = []
+        # Phone number -> when this process last wrote the customer, so the sync doesn't undo it
+        self._local_writes: Dict[str, float] = {}
+        self._sync = None
+
+        # Invoice ID -> invoice record, kept across calls
+        self._invoices: Dict[str, Dict[str, Any]] = {}
+        # First sheet row that has not been read into the invoice index yet
+        self._next_invoice_row = 2
+        self._invoices_loaded_at: Optional[float] = None
+
+    # Customers
+
+    @staticmethod
+    def _row_to_customer(row, row_number: int) -> Dict[str, Any]:
+        """Convert a raw sheet row into a customer record"""
+        return {
+            'name': row[0],  # Name (Column A)
+            'phone': row[1],  # Phone Number (Column B)
+            'email': row[2] if len(row) > 2 else None,  # Email (Column C)
+            'stamps': row[3] if len(row) > 3 else '0',  # Loyalty Stamps (Column D)
+            'chat_status': row[4] if len(row) > 4 else None,  # Chat Status (Column E)
+            'thread_id': row[5] if len(row) > 5 else None,  # Thread ID (Column F)
+            'row_number': row_number
+        }
+
+    def _customers_are_fresh(self) -> bool:
+        return (
+            self._customers_loaded_at is not None
+            and time.monotonic() - self._customers_loaded_at < CUSTOMER_CACHE_TTL
+        )
+
+    async def _ensure_customers(self) -> None:
+        """Load the phone number index from the sheet if it is missing or expired"""
+        if self._customers_are_fresh():
+            return
+
+        # The lock is created lazily so it binds to the running event loop
+        if self._customers_lock is None:
+            self._customers_lock = asyncio.Lock()
+
+        async with self._customers_lock:
+            # Another coroutine may have reloaded the index while we were waiting
+            if self._customers_are_fresh():
+                return
+
+            # Make sure queued writes are in the sheet before we read it back
+            await sheets_write_buffer.flush()
+            values = await self.customer_sheet.get_values()
+            self._build_customer_index(values or [])
+
+    @staticmethod
+    def _row_hash(row: List[str]) -> bytes:
+        return hashlib.blake2b('\x1f'.join(row).encode(), digest_size=8).digest()
+
+    def _build_customer_index(self, values: List[List[str]]) -> None:
+        """Replace the phone number index with the given sheet rows"""
+        index = {}
+        for row_num, row in enumerate(values):
+            # Phone number is in column B (index 1); keep the first match like the old linear scan
+            if len(row) > 1 and row[1] not in index:
+                index[row[1]] = self._row_to_customer(row, row_num + 2)  # Data starts from row 2
+
+        self._customers = index
+        self._row_hashes = [self._row_hash(row) for row in values]
+        self._customers_loaded_at = time.monotonic()
+        # Stamps may have been corrected in the sheet since cached lookups read them
+        tool_result_cache.invalidate("get_stamp_loyalty")
+        logger.info(f"Loaded customer index with {len(index)} entries")
+
+    def patch_customers(self, values: List[List[str]], read_started_at: float) -> int:
+        """
+        Apply a fresh read of the customer rows to the index, touching only rows whose hash changed.
+
+        Customers written by this process after read_started_at are left alone, since the
+        read may predate the write. Returns the number of changed rows.
+        """
+        if self._customers_loaded_at is None:
+            self._build_customer_index(values)
+            return len(values)
+
+        hashes = [self._row_hash(row) for row in values]
+        changed = [
+            i for i in range(max(len(hashes), len(self._row_hashes)))
+            if i >= len(hashes) or i >= len(self._row_hashes) or hashes[i] != self._row_hashes[i]
+        ]
+
+        if changed:
+            phone_by_row = {customer['row_number']: phone for phone, customer in self._customers.items()}
+            for i in changed:
+                row_number = i + 2
+                row = values[i] if i < len(hashes) else None
+                phone = row[1] if row and len(row) > 1 else None
+
+                # The row was removed or now belongs to someone else, e.g. after a row was deleted
+                old_phone = phone_by_row.get(row_number)
+                if (
+                    old_phone and old_phone != phone
+                    and self._customers.get(old_phone, {}).get('row_number') == row_number
+                    and self._local_writes.get(old_phone, 0) < read_started_at
+                ):
+                    del self._customers[old_phone]
+                if not phone:
+                    continue
+                if self._local_writes.get(phone, 0) >= read_started_at:
+                    # Forget the hash so the row is compared again on the next sync
+                    hashes[i] = b''
+                    continue
+
+                existing = self._customers.get(phone)
+                # Keep the first row for a phone number listed twice
+                if existing and existing['row_number'] < row_number:
+                    continue
+                customer = self._row_to_customer(row, row_number)
+                if existing and existing.get('stamps') != customer['stamps']:
+                    # Stamps were corrected by hand; cached lookups would show the old balance
+                    tool_result_cache.invalidate("get_stamp_loyalty")
+                self._customers[phone] = customer
+            logger.info(f"Customer sync patched {len(changed)} changed rows")
+
+        self._row_hashes = hashes
+        self._local_writes = {
+            phone: written_at for phone, written_at in self._local_writes.items() if written_at >= read_started_at
+        }
+        self.mark_customers_fresh()
+        return len(changed)
+
+    def mark_customers_fresh(self) -> None:
+        """Record that the index is known to match the sheet, postponing the next full reload"""
+        if self._customers_loaded_at is not None:
+            self._customers_loaded_at = time.monotonic()
+
+    def invalidate_customers(self) -> None:
+        """Force the next lookup to reload the customer index from the sheet"""
+        self._customers_loaded_at = None
+
+    async def get_customer(self, phone_number: str) -> Optional[Dict[str, Any]]:
+        await self._ensure_customers()
+        customer = self._customers.get(phone_number)
+        # Hand out a copy so callers can't mutate the cached record
+        return dict(customer) if customer else None
+
+    async def list_customers(self) -> List[Dict[str, Any]]:
+        await self._ensure_customers()
+        return [dict(customer) for customer in self._customers.values()]
+
+    async def insert_customer(self, record: Dict[str, Any]) -> None:
+        new_row = [
+            record['name'],
+            record['phone'],
+            record.get('email') or '',
+            str(record.get('stamps') or '0'),
+            record.get('chat_status') or '',
+            record.get('thread_id') or ''
+        ]
+        self._local_writes[record['phone']] = time.monotonic()
+        # Explicitly specify the range to ensure we start from column A
+        result = await self.customer_sheet.append_values([new_row], range_name="Sheet1!A1")
+
+        row_number = _first_appended_row(result)
+        if row_number and self._customers_loaded_at is not None:
+            self._customers.setdefault(record['phone'], self._row_to_customer(new_row, row_number))
+        else:
+            # We don't know where the row landed, so reload on the next lookup
+            self.invalidate_customers()
+
+    async def update_customer_fields(self, phone_number: str, fields: Dict[str, Any]) -> bool:
+        check_customer_fields(fields)
+        await self._ensure_customers()
+        customer = self._customers.get(phone_number)
+        if not customer:
+            return False
+
+        # Queue only the changed cells instead of the entire row. This prevents race conditions
+        # when multiple processes update different parts of the same row, and lets the write
+        # buffer send them together with other customers' updates
+        for field, value in fields.items():
+            self.customer_sheet.queue_update(
+                f'Sheet1!{CUSTOMER_COLUMNS[field]}{customer["row_number"]}',
+                [[value]]
+            )
+        customer.update(fields)
+        self._local_writes[phone_number] = time.monotonic()
+        return True
+
+    async def set_stamps(self, phone_number: str, balance: int) -> bool:
+        await self._ensure_customers()
+        customer = self._customers.get(phone_number)
+        if not customer:
+            return False
+
+        # Stamps are written straight away rather than through the write-behind buffer
+        await self.customer_sheet.update_values(
+            f'Sheet1!D{customer["row_number"]}',
+            [[str(balance)]]
+        )
+        customer['stamps'] = str(balance)
+        self._local_writes[phone_number] = time.monotonic()
+        return True
+
+    async def append_stamp_event(self, event: Dict[str, Any]) -> None:
+        try:
+            STAMP_LEDGER_PATH.parent.mkdir(parents=True, exist_ok=True)
+            with open(STAMP_LEDGER_PATH, 'a') as f:
+                f.write(json.dumps(event, separators=(',', ':')) + "\n")
+        except Exception as e:
+            # The sheet already holds the new balance; a missing audit line must not fail the claim
+            logger.error(f"Error writing stamp ledger event: {str(e)}")
+
+    # Invoices
+
+    @staticmethod
+    def _row_to_invoice(row, row_number: int) -> Dict[str, Any]:
+        """Convert a raw sheet row into an invoice record"""
+        return {
+            "total": row[1],
+            "claimed": row[2].lower() == "true",
+            "claimed_by": row[3] if len(row) > 3 else None,
+            "claimed_at": row[4] if len(row) > 4 else None,
+            "row_number": row_number
+        }
+
+    async def _load_invoice_rows(self, first_row: int) -> None:
+        """Read sheet rows from first_row to the end into the invoice index"""
+        values = await self.invoice_sheet.get_values(f'Sheet1!A{first_row}:E')
+        for offset, row in enumerate(values):
+            if len(row) >= 3 and row[0] not in self._invoices:
+                self._invoices[row[0]] = self._row_to_invoice(row, first_row + offset)
+        self._next_invoice_row = max(self._next_invoice_row, first_row + len(values))
+
+    async def _refresh_invoices(self, invoice_ids: List[str]) -> None:
+        """Make sure the index is current enough to decide on the given invoice IDs
+
+        The whole ledger is only read when the index is missing or expired. Unknown IDs
+        trigger a read of the rows appended since the last load, e.g. invoices added by the POS.
+        The cached rows of the given IDs are then read back, since staff edits, sorting and
+        other workers' claims all change the sheet behind the index.
+        """
+        if self._invoices_loaded_at is None or time.monotonic() - self._invoices_loaded_at >= INVOICE_CACHE_TTL:
+            await self._reload_invoices()
+            return
+        if any(invoice_id not in self._invoices for invoice_id in invoice_ids):
+            await self._load_invoice_rows(self._next_invoice_row)
+        if not await self._verify_invoice_rows(invoice_ids):
+            logger.info("Invoice rows moved since the index was loaded; reloading it")
+            await self._reload_invoices()
+
+    async def _reload_invoices(self) -> None:
+        self._invoices = {}
+        self._next_invoice_row = 2
+        await self._load_invoice_rows(2)
+        self._invoices_loaded_at = time.monotonic()
+
+    async def _verify_invoice_rows(self, invoice_ids: List[str]) -> bool:
+        """Re-read the cached rows of the given invoices with one request and refresh their entries
+
+        Returns False if a row no longer holds the invoice the index expects there.
+        """
+        known = [invoice_id for invoice_id in dict.fromkeys(invoice_ids) if invoice_id in self._invoices]
+        if not known:
+            return True
+        rows = await self.invoice_sheet.batch_get_values([
+            f'Sheet1!A{row_num}:E{row_num}'
+            for row_num in (self._invoices[invoice_id]["row_number"] for invoice_id in known)
+        ])
+        for invoice_id, values in zip(known, rows):
+            row = values[0] if values else []
+            if len(row) < 3 or row[0] != invoice_id:
+                return False
+            self._invoices[invoice_id] = self._row_to_invoice(row, self._invoices[invoice_id]["row_number"])
+        return True
+
+    async def get_invoices(self, invoice_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        await self._refresh_invoices(invoice_ids)
+        return {
+            invoice_id: dict(self._invoices[invoice_id])
+            for invoice_id in invoice_ids if invoice_id in self._invoices
+        }
+
+    async def list_invoices(self) -> Dict[str, Dict[str, Any]]:
+        await self._refresh_invoices([])
+        return {invoice_id: dict(invoice) for invoice_id, invoice in self._invoices.items()}
+
+    async def claim_invoices(self, new_invoices: List[Dict[str, Any]], existing_ids: List[str], claimed_by: str, claimed_at: str) -> None:
+        if existing_ids:
+            # Check the rows again right before writing them: they may have moved, or been claimed
+            # by another worker since the caller looked
+            await self._refresh_invoices(existing_ids)
+            missing = [invoice_id for invoice_id in existing_ids if invoice_id not in self._invoices]
+            if missing:
+                raise ValueError(f"Invoices no longer in the sheet: {', '.join(missing)}")
+            claimed = [invoice_id for invoice_id in existing_ids if self._invoices[invoice_id]["claimed"]]
+            if claimed:
+                raise ValueError(f"Invoices claimed meanwhile: {', '.join(claimed)}")
+            updates = []
+            for invoice_id in existing_ids:
+                row_num = self._invoices[invoice_id]["row_number"]
+                updates.append({
+                    'range': f'Sheet1!C{row_num}:E{row_num}',
+                    'values': [["true", claimed_by, claimed_at]]
+                })
+            await self.invoice_sheet.batch_update_values(updates)
+            for invoice_id in existing_ids:
+                self._invoices[invoice_id].update(claimed=True, claimed_by=claimed_by, claimed_at=claimed_at)
+
+        if new_invoices:
+            new_rows = [
+                [invoice['id'], str(invoice['total']), "true", claimed_by, claimed_at]
+                for invoice in new_invoices
+            ]
+            result = await self.invoice_sheet.append_values(new_rows)
+            first_row = _first_appended_row(result)
+            if first_row:
+                for offset, row in enumerate(new_rows):
+                    self._invoices[row[0]] = self._row_to_invoice(row, first_row + offset)
+                if first_row == self._next_invoice_row:
+                    self._next_invoice_row = first_row + len(new_rows)
+            else:
+                # We don't know where the rows landed, so rebuild on the next claim
+                self._invoices_loaded_at = None
+
+    async def start(self) -> None:
+        # Imported here because the sync module depends on this one
+        from .sheets_sync import CustomerSheetSync, SHEETS_SYNC_INTERVAL
+        if SHEETS_SYNC_INTERVAL > 0 and self._sync is None:
+            self._sync = CustomerSheetSync(self)
+            self._sync.start()
+
+    async def close(self) -> None:
+        if self._sync is not None:
+            await self._sync.stop()
+            self._sync = None
+        await sheets_write_buffer.flush()
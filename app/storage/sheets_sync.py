@@ -0,0 +1,75 @@
+import os
+import time
+import asyncio
+import logging
+from typing import Optional
+from ..utils.sheets_write_buffer import sheets_write_buffer
+from .sheets_backend import SheetsStorageBackend
+
+logger = logging.getLogger(__name__)
+
+# Seconds between checks of the loyalty sheet for hand edits (0 disables the sync)
+SHEETS_SYNC_INTERVAL = float(os.getenv('SHEETS_SYNC_INTERVAL', '30'))
+
+class CustomerSheetSync:
+    """
+    Keeps the customer index in step with edits staff make directly in the loyalty sheet.
+
+    Each cycle asks Drive for the sheet's version, which is a single small request. Only
+    when it changed are the customer columns read again, and only rows whose hash changed
+    are patched into the index. While the sync keeps up, the index never needs a full
+    CUSTOMER_CACHE_TTL reload.
+    """
+    def __init__(self, backend: SheetsStorageBackend, interval: float = SHEETS_SYNC_INTERVAL):
+        self.backend = backend
+        self.interval = interval
+        self._revision: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def _get_revision(self) -> Optional[str]:
+        try:
+            return await self.backend.customer_sheet.get_revision()
+        except Exception as e:
+            # E.g. the sheet isn't visible to Drive; fall back to comparing row hashes every cycle
+            logger.warning(f"Could not read loyalty sheet revision: {str(e)}")
+            return None
+
+    async def sync_once(self) -> int:
+        """Check the sheet for changes and patch the customer index; returns the number of changed rows"""
+        read_started_at = time.monotonic()
+        # Our own queued writes must be in the sheet, or the read would look like they were undone
+        await sheets_write_buffer.flush()
+        if sheets_write_buffer.size:
+            return 0
+
+        revision = await self._get_revision()
+        if revision is not None and revision == self._revision:
+            self.backend.mark_customers_fresh()
+            return 0
+
+        values = await self.backend.customer_sheet.get_values()
+        changed = self.backend.patch_customers(values or [], read_started_at)
+        self._revision = revision
+        return changed
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.sync_once()
+            except Exception as e:
+                logger.error(f"Error syncing customer sheet: {str(e)}")
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        """Run the sync in the background on the current event loop"""
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
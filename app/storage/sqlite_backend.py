@@ -0,0 +1,234 @@
+import os
+import asyncio
+import sqlite3
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional, Any
+from .base import StorageBackend, check_customer_fields
+
+logger = logging.getLogger(__name__)
+
+SQLITE_DB_PATH = Path(os.getenv('SQLITE_DB_PATH', 'app/data/storage.db'))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS customers (
+    phone TEXT PRIMARY KEY,
+    name TEXT,
+    email TEXT,
+    stamps TEXT NOT NULL DEFAULT '0',
+    chat_status TEXT,
+    thread_id TEXT,
+    row_number INTEGER
+);
+CREATE TABLE IF NOT EXISTS invoices (
+    id TEXT PRIMARY KEY,
+    total TEXT,
+    claimed INTEGER NOT NULL DEFAULT 0,
+    claimed_by TEXT,
+    claimed_at TEXT,
+    row_number INTEGER
+);
+CREATE TABLE IF NOT EXISTS stamp_events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL,
+    phone_number TEXT NOT NULL,
+    delta INTEGER NOT NULL,
+    previous_balance INTEGER NOT NULL,
+    balance INTEGER NOT NULL,
+    source TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_stamp_events_phone ON stamp_events (phone_number);
+"""
+
+CUSTOMER_FIELDS = ('name', 'phone', 'email', 'stamps', 'chat_status', 'thread_id', 'row_number')
+
+class SQLiteStorageBackend(StorageBackend):
+    """
+    Local SQLite storage with primary-key indexes on phone number and invoice ID.
+
+    Queries are sub-millisecond, so they run directly on the event loop. When a mirror
+    backend is given (normally Google Sheets), every write is replayed to it in the
+    background so staff keep seeing the data, and an empty database is seeded from it.
+    """
+    def __init__(self, db_path: Path = SQLITE_DB_PATH, mirror: Optional[StorageBackend] = None):
+        self.db_path = db_path
+        self.mirror = mirror
+        self._conn: Optional[sqlite3.Connection] = None
+        self._seeded = mirror is None
+        self._seed_lock: Optional[asyncio.Lock] = None
+        self._mirror_tasks = set()
+        self._mirror_lock: Optional[asyncio.Lock] = None
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """Lazy open the database and create the schema"""
+        if self._conn is None:
+            if str(self.db_path) != ':memory:':
+                Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    async def _ensure_seeded(self) -> None:
+        """Copy customers and invoices from the mirror the first time an empty database is used"""
+        if self._seeded:
+            return
+        if self._seed_lock is None:
+            self._seed_lock = asyncio.Lock()
+
+        async with self._seed_lock:
+            if self._seeded:
+                return
+            empty = self.conn.execute("SELECT COUNT(*) FROM customers").fetchone()[0] == 0
+            if empty:
+                customers = await self.mirror.list_customers()
+                invoices = await self.mirror.list_invoices()
+                with self.conn:
+                    self.conn.executemany(
+                        "INSERT OR IGNORE INTO customers (name, phone, email, stamps, chat_status, thread_id, row_number) "
+                        "VALUES (:name, :phone, :email, :stamps, :chat_status, :thread_id, :row_number)",
+                        customers
+                    )
+                    self.conn.executemany(
+                        "INSERT OR IGNORE INTO invoices (id, total, claimed, claimed_by, claimed_at, row_number) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        [
+                            (invoice_id, invoice['total'], int(invoice['claimed']), invoice['claimed_by'],
+                             invoice['claimed_at'], invoice['row_number'])
+                            for invoice_id, invoice in invoices.items()
+                        ]
+                    )
+                logger.info(f"Seeded SQLite storage with {len(customers)} customers and {len(invoices)} invoices")
+            self._seeded = True
+
+    def _mirror(self, method: str, *args) -> None:
+        """Replay a write to the mirror backend without waiting for it"""
+        if self.mirror is None:
+            return
+
+        if self._mirror_lock is None:
+            self._mirror_lock = asyncio.Lock()
+
+        async def replay():
+            # The lock hands out turns in FIFO order, so writes reach the mirror in the order they were made
+            async with self._mirror_lock:
+                try:
+                    if await getattr(self.mirror, method)(*args) is False:
+                        logger.warning(f"Mirror skipped {method}: record not found")
+                except Exception as e:
+                    logger.error(f"Error mirroring {method} to Sheets: {str(e)}")
+
+        task = asyncio.get_running_loop().create_task(replay())
+        # Keep a reference so the task isn't garbage collected before it finishes
+        self._mirror_tasks.add(task)
+        task.add_done_callback(self._mirror_tasks.discard)
+
+    # Customers
+
+    async def get_customer(self, phone_number: str) -> Optional[Dict[str, Any]]:
+        await self._ensure_seeded()
+        row = self.conn.execute("SELECT * FROM customers WHERE phone = ?", (phone_number,)).fetchone()
+        return dict(row) if row else None
+
+    async def list_customers(self) -> List[Dict[str, Any]]:
+        await self._ensure_seeded()
+        return [dict(row) for row in self.conn.execute("SELECT * FROM customers ORDER BY row_number")]
+
+    async def insert_customer(self, record: Dict[str, Any]) -> None:
+        await self._ensure_seeded()
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR IGNORE INTO customers (name, phone, email, stamps, chat_status, thread_id) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (record['name'], record['phone'], record.get('email') or '', str(record.get('stamps') or '0'),
+                 record.get('chat_status') or '', record.get('thread_id') or '')
+            )
+        self._mirror('insert_customer', dict(record))
+
+    async def update_customer_fields(self, phone_number: str, fields: Dict[str, Any]) -> bool:
+        check_customer_fields(fields)
+        await self._ensure_seeded()
+        if not fields:
+            return await self.get_customer(phone_number) is not None
+
+        # Column names were checked against the fixed field list, so none come from user input
+        assignments = ", ".join(f"{field} = ?" for field in fields)
+        with self.conn:
+            cursor = self.conn.execute(
+                f"UPDATE customers SET {assignments} WHERE phone = ?",
+                list(fields.values()) + [phone_number]
+            )
+        if cursor.rowcount == 0:
+            return False
+        self._mirror('update_customer_fields', phone_number, dict(fields))
+        return True
+
+    async def set_stamps(self, phone_number: str, balance: int) -> bool:
+        await self._ensure_seeded()
+        with self.conn:
+            cursor = self.conn.execute(
+                "UPDATE customers SET stamps = ? WHERE phone = ?", (str(balance), phone_number)
+            )
+        if cursor.rowcount == 0:
+            return False
+        self._mirror('set_stamps', phone_number, balance)
+        return True
+
+    async def append_stamp_event(self, event: Dict[str, Any]) -> None:
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO stamp_events (timestamp, phone_number, delta, previous_balance, balance, source) "
+                "VALUES (:timestamp, :phone_number, :delta, :previous_balance, :balance, :source)",
+                event
+            )
+        self._mirror('append_stamp_event', dict(event))
+
+    # Invoices
+
+    @staticmethod
+    def _row_to_invoice(row: sqlite3.Row) -> Dict[str, Any]:
+        return {
+            "total": row['total'],
+            "claimed": bool(row['claimed']),
+            "claimed_by": row['claimed_by'],
+            "claimed_at": row['claimed_at'],
+            "row_number": row['row_number']
+        }
+
+    async def get_invoices(self, invoice_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        await self._ensure_seeded()
+        if not invoice_ids:
+            return {}
+        placeholders = ", ".join("?" for _ in invoice_ids)
+        rows = self.conn.execute(f"SELECT * FROM invoices WHERE id IN ({placeholders})", list(invoice_ids))
+        return {row['id']: self._row_to_invoice(row) for row in rows}
+
+    async def list_invoices(self) -> Dict[str, Dict[str, Any]]:
+        await self._ensure_seeded()
+        return {row['id']: self._row_to_invoice(row) for row in self.conn.execute("SELECT * FROM invoices")}
+
+    async def claim_invoices(self, new_invoices: List[Dict[str, Any]], existing_ids: List[str], claimed_by: str, claimed_at: str) -> None:
+        await self._ensure_seeded()
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO invoices (id, total, claimed, claimed_by, claimed_at) VALUES (?, ?, 1, ?, ?)",
+                [(invoice['id'], str(invoice['total']), claimed_by, claimed_at) for invoice in new_invoices]
+            )
+            self.conn.executemany(
+                "UPDATE invoices SET claimed = 1, claimed_by = ?, claimed_at = ? WHERE id = ?",
+                [(claimed_by, claimed_at, invoice_id) for invoice_id in existing_ids]
+            )
+        self._mirror('claim_invoices', list(new_invoices), list(existing_ids), claimed_by, claimed_at)
+
+    async def close(self) -> None:
+        if self._mirror_tasks:
+            await asyncio.gather(*self._mirror_tasks, return_exceptions=True)
+        if self.mirror is not None:
+            await self.mirror.close()
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
@@ -15,6 +15,7 @@ import asyncio
 from pathlib import Path
 import argparse
 from .google_sheets import check_customer_exists, set_chat_status
+from ..storage import get_storage_backend
 
 async def list_chat_statuses():
     """List all customers with their chat statuses"""
@@ -64,6 +65,14 @@ async def get_customer_chat_status(phone_number):
     print(f"Chat status for {phone_number}: '{status}'")
     return True
 
+async def run_command(command):
+    """Run a command, then send buffered storage writes before the process exits"""
+    try:
+        return await command
+    finally:
+        # Customer field writes wait in the write-behind buffer, whose timer would never fire after exit
+        await get_storage_backend().close()
+
 def main():
     parser = argparse.ArgumentParser(description="Manage chat statuses in the Google Sheet")
     subparsers = parser.add_subparsers(dest="command", help="Command to run")
@@ -87,13 +96,13 @@ def main():
     args = parser.parse_args()
     
     if args.command == "list":
-        asyncio.run(list_chat_statuses())
+        asyncio.run(run_command(list_chat_statuses()))
     elif args.command == "set":
-        asyncio.run(set_customer_chat_status(args.phone_number, args.status))
+        asyncio.run(run_command(set_customer_chat_status(args.phone_number, args.status)))
     elif args.command == "clear":
-        asyncio.run(clear_customer_chat_status(args.phone_number))
+        asyncio.run(run_command(clear_customer_chat_status(args.phone_number)))
     elif args.command == "get":
-        asyncio.run(get_customer_chat_status(args.phone_number))
+        asyncio.run(run_command(get_customer_chat_status(args.phone_number)))
     else:
         parser.print_help()
 
@@ -1,62 +1,235 @@
 import os
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
-from pathlib import Path
-from typing import Optional, List
+import time
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import httplib2
+import google_auth_httplib2
+from typing import Optional, List, Dict, Tuple, Callable, Any
+from .sheets_write_buffer import sheets_write_buffer
+from .sheets_rate_limiter import sheets_rate_limiter
+from .sheets_client import sheets_client
+
+# Maximum number of Sheets requests in flight at once across every sheet instance
+SHEETS_MAX_CONCURRENCY = int(os.getenv('SHEETS_MAX_CONCURRENCY', '8'))
+# Socket timeout (seconds) for a single Sheets HTTP request
+SHEETS_HTTP_TIMEOUT = int(os.getenv('SHEETS_HTTP_TIMEOUT', '30'))
+# Seconds a finished range read is reused by later identical reads (0 = only share reads still in flight)
+SHEETS_READ_FRESHNESS = float(os.getenv('SHEETS_READ_FRESHNESS', '0'))
 
 class GoogleSheetsBase:
-    SCOPES = ['https://www.googleapis.com/auth/spreadsheets']
-    
+    # googleapiclient is blocking, so every request runs on this bounded pool instead of the event loop
+    _executor = ThreadPoolExecutor(max_workers=SHEETS_MAX_CONCURRENCY, thread_name_prefix='sheets')
+    # httplib2 connections are not thread-safe, so each worker thread keeps its own keep-alive connections
+    _thread_local = threading.local()
+    # Identical concurrent reads share one request: (sheet_id, range) -> in-flight fetch
+    _inflight_reads: Dict[Tuple[str, str], 'asyncio.Task'] = {}
+    # Finished reads reused within SHEETS_READ_FRESHNESS: (sheet_id, range) -> (fetched at, values)
+    _recent_reads: Dict[Tuple[str, str], Tuple[float, List[List[str]]]] = {}
+
     def __init__(self, sheet_id: str, range_name: str):
         self.sheet_id = sheet_id
         self.range_name = range_name
         self._service = None
-    
+        self._credentials = None
+
     @property
     def service(self):
-        """Lazy load the Google Sheets service"""
+        """The Google Sheets service shared by every sheet instance"""
         if not self._service:
-            credentials = self._get_credentials()
-            self._service = build('sheets', 'v4', credentials=credentials)
+            self._service = sheets_client.service
         return self._service
-    
-    def _get_credentials(self):
-        """Get credentials from file"""
-        creds_path = Path(__file__).parent.parent.parent / 'config' / 'credentials' / 'loyalty-service-account.json'
-        if not creds_path.exists():
-            raise FileNotFoundError("Service account credentials not found")
-        
-        return service_account.Credentials.from_service_account_file(
-            str(creds_path),
-            scopes=self.SCOPES
+
+    @property
+    def credentials(self):
+        """The service account credentials shared by every sheet instance"""
+        if not self._credentials:
+            self._credentials = sheets_client.credentials
+        return self._credentials
+
+    def _authorized_http(self):
+        """Get the current worker thread's authorized HTTP connection for these credentials"""
+        connections = getattr(self._thread_local, 'connections', None)
+        if connections is None:
+            connections = self._thread_local.connections = {}
+
+        credentials = self.credentials
+        http = connections.get(id(credentials))
+        if http is None:
+            http = google_auth_httplib2.AuthorizedHttp(
+                credentials,
+                http=httplib2.Http(timeout=SHEETS_HTTP_TIMEOUT)
+            )
+            connections[id(credentials)] = http
+        return http
+
+    def _execute_blocking(self, build_request: Callable[[Any], Any]):
+        """Build and execute a Sheets request on the calling (worker) thread"""
+        request = build_request(self.service)
+        return request.execute(http=self._authorized_http())
+
+    async def _execute(self, build_request: Callable[[Any], Any], kind: str = 'read', retry_server_errors: bool = True):
+        """Execute a Sheets request on the Sheets executor without blocking the event loop
+
+        The request waits for the shared read or write quota first, and is retried with
+        backoff when Sheets answers 429 or a transient 5xx error.
+
+        Args:
+            build_request: Callable that receives the Sheets service and returns a request object
+            kind: Quota the request counts against, 'read' or 'write'
+            retry_server_errors: Whether 5xx errors are retried (unsafe for non-idempotent writes)
+        """
+        loop = asyncio.get_running_loop()
+        attempt = 0
+        while True:
+            await sheets_rate_limiter.acquire(kind)
+            try:
+                result = await loop.run_in_executor(self._executor, self._execute_blocking, build_request)
+            except Exception as e:
+                delay = sheets_rate_limiter.should_retry(kind, e, attempt, retry_server_errors)
+                if delay is None:
+                    raise
+                attempt += 1
+                await asyncio.sleep(delay)
+                continue
+
+            sheets_rate_limiter.record_success(kind)
+            return result
+
+    async def _execute_write(self, build_request: Callable[[Any], Any], retry_server_errors: bool = True):
+        """Execute a Sheets write, then drop shared reads of this sheet that may predate it"""
+        try:
+            return await self._execute(build_request, kind='write', retry_server_errors=retry_server_errors)
+        finally:
+            self._invalidate_reads()
+
+    async def get_values(self, range_name: Optional[str] = None) -> List[List[str]]:
+        """Get all values from the specified range
+
+        Concurrent calls for the same sheet and range share a single Sheets request,
+        so a burst of webhooks costs one read instead of one per webhook.
+        """
+        key = (self.sheet_id, range_name if range_name else self.range_name)
+
+        recent = self._recent_reads.get(key)
+        if recent and time.monotonic() - recent[0] < SHEETS_READ_FRESHNESS:
+            return self._copy_values(recent[1])
+
+        task = self._inflight_reads.get(key)
+        if task is None:
+            task = asyncio.get_running_loop().create_task(self._fetch_values(key[1]))
+            self._inflight_reads[key] = task
+            task.add_done_callback(lambda done: self._finish_read(key, done))
+
+        # Shield the shared fetch so one cancelled caller doesn't cancel it for everyone else
+        values = await asyncio.shield(task)
+        return self._copy_values(values)
+
+    async def _fetch_values(self, range_name: str) -> List[List[str]]:
+        result = await self._execute(
+            lambda service: service.spreadsheets().values().get(
+                spreadsheetId=self.sheet_id,
+                range=range_name
+            )
         )
-    
-    async def get_values(self) -> List[List[str]]:
-        """Get all values from the specified range"""
-        result = self.service.spreadsheets().values().get(
-            spreadsheetId=self.sheet_id,
-            range=self.range_name
-        ).execute()
-        
+
         return result.get('values', [])
-    
+
+    async def batch_get_values(self, ranges: List[str]) -> List[List[List[str]]]:
+        """Get the values of several ranges in a single request, in the order given
+
+        Unlike get_values, reads are never shared or reused: callers use this to check
+        rows they are about to act on.
+        """
+        result = await self._execute(
+            lambda service: service.spreadsheets().values().batchGet(
+                spreadsheetId=self.sheet_id,
+                ranges=ranges
+            )
+        )
+
+        return [value_range.get('values', []) for value_range in result.get('valueRanges', [])]
+
+    async def get_revision(self) -> Optional[str]:
+        """Get the spreadsheet's Drive version, which changes whenever any cell is edited"""
+        result = await self._execute(
+            lambda service: sheets_client.drive.files().get(
+                fileId=self.sheet_id,
+                fields='version'
+            )
+        )
+
+        return result.get('version')
+
+    @classmethod
+    def _finish_read(cls, key: Tuple[str, str], task: 'asyncio.Task') -> None:
+        """Stop sharing a finished fetch and keep its result for the freshness window"""
+        # A write may already have detached this fetch, in which case its result is stale
+        if cls._inflight_reads.get(key) is not task:
+            return
+        del cls._inflight_reads[key]
+
+        if task.cancelled() or task.exception() is not None:
+            return
+        if SHEETS_READ_FRESHNESS > 0:
+            cls._recent_reads[key] = (time.monotonic(), task.result())
+
+    def _invalidate_reads(self) -> None:
+        """Make reads after a write to this sheet fetch fresh values"""
+        for key in [key for key in self._inflight_reads if key[0] == self.sheet_id]:
+            del self._inflight_reads[key]
+        for key in [key for key in self._recent_reads if key[0] == self.sheet_id]:
+            del self._recent_reads[key]
+
+    @staticmethod
+    def _copy_values(values: List[List[str]]) -> List[List[str]]:
+        # Callers share one result, so each gets its own rows to modify
+        return [list(row) for row in values]
+
     async def update_values(self, range_name: str, values: List[List[str]], value_input_option: str = 'RAW'):
         """Update values in the specified range"""
         body = {'values': values}
-        self.service.spreadsheets().values().update(
-            spreadsheetId=self.sheet_id,
-            range=range_name,
-            valueInputOption=value_input_option,
-            body=body
-        ).execute()
-    
+        return await self._execute_write(
+            lambda service: service.spreadsheets().values().update(
+                spreadsheetId=self.sheet_id,
+                range=range_name,
+                valueInputOption=value_input_option,
+                body=body
+            )
+        )
+
     async def append_values(self, values: List[List[str]], range_name: Optional[str] = None, value_input_option: str = 'RAW'):
         """Append values to the sheet"""
         body = {'values': values}
-        self.service.spreadsheets().values().append(
-            spreadsheetId=self.sheet_id,
-            range=range_name if range_name else self.range_name,
-            valueInputOption=value_input_option,
-            insertDataOption='INSERT_ROWS',
-            body=body
-        ).execute()
+        return await self._execute_write(
+            lambda service: service.spreadsheets().values().append(
+                spreadsheetId=self.sheet_id,
+                range=range_name if range_name else self.range_name,
+                valueInputOption=value_input_option,
+                insertDataOption='INSERT_ROWS',
+                body=body
+            ),
+            # A 5xx may arrive after the rows were added, so retrying could append them twice
+            retry_server_errors=False
+        )
+
+    async def batch_update_values(self, data: List[Dict[str, Any]], value_input_option: str = 'RAW'):
+        """Update several ranges in a single request
+
+        Args:
+            data: List of {'range': ..., 'values': ...} entries
+        """
+        body = {
+            'valueInputOption': value_input_option,
+            'data': data
+        }
+        return await self._execute_write(
+            lambda service: service.spreadsheets().values().batchUpdate(
+                spreadsheetId=self.sheet_id,
+                body=body
+            )
+        )
+
+    def queue_update(self, range_name: str, values: List[List[str]]) -> None:
+        """Queue a write-behind update that is sent with the next batched flush"""
+        sheets_write_buffer.add(self, range_name, values)
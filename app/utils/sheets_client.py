@@ -0,0 +1,103 @@
+import os
+import asyncio
+import logging
+import threading
+from pathlib import Path
+from google.auth.credentials import AnonymousCredentials
+from google.auth.transport.requests import Request
+from google.oauth2 import service_account
+from googleapiclient.discovery import build
+
+logger = logging.getLogger(__name__)
+
+SCOPES = [
+    'https://www.googleapis.com/auth/spreadsheets',
+    # Only used to read a sheet's revision, to skip syncing sheets that haven't changed
+    'https://www.googleapis.com/auth/drive.metadata.readonly',
+]
+CREDENTIALS_PATH = Path(__file__).parent.parent.parent / 'config' / 'credentials' / 'loyalty-service-account.json'
+# host:port of a local fake Sheets server (see tests/fake_sheets_server.py); requests go there unauthenticated
+SHEETS_EMULATOR_HOST = os.getenv('SHEETS_EMULATOR_HOST')
+
+class SheetsClient:
+    """
+    Process-wide Google Sheets service and service account credentials.
+
+    Every sheet instance shares one credentials object, so an access token refreshed
+    by one request is reused by all of them, and one service object built from the
+    discovery document bundled with googleapiclient instead of fetching it over HTTP.
+    """
+    def __init__(self, credentials_path: Path = CREDENTIALS_PATH):
+        self.credentials_path = credentials_path
+        self._credentials = None
+        self._service = None
+        self._drive = None
+        # Executor threads may ask for the client at the same time on the first request;
+        # reentrant because building a service loads the credentials under the same lock
+        self._lock = threading.RLock()
+
+    @property
+    def credentials(self):
+        """Lazy load the service account credentials"""
+        if self._credentials is None:
+            with self._lock:
+                if self._credentials is None and SHEETS_EMULATOR_HOST:
+                    self._credentials = AnonymousCredentials()
+                elif self._credentials is None:
+                    if not self.credentials_path.exists():
+                        raise FileNotFoundError("Service account credentials not found")
+                    self._credentials = service_account.Credentials.from_service_account_file(
+                        str(self.credentials_path),
+                        scopes=SCOPES
+                    )
+        return self._credentials
+
+    def _build(self, name: str, version: str, emulator_path: str):
+        client_options = None
+        if SHEETS_EMULATOR_HOST:
+            client_options = {'api_endpoint': f'http://{SHEETS_EMULATOR_HOST}/{emulator_path}'}
+        return build(
+            name, version,
+            credentials=self.credentials,
+            static_discovery=True,
+            cache_discovery=False,
+            client_options=client_options
+        )
+
+    @property
+    def service(self):
+        """Lazy build the Google Sheets service"""
+        if self._service is None:
+            with self._lock:
+                if self._service is None:
+                    self._service = self._build('sheets', 'v4', '')
+        return self._service
+
+    @property
+    def drive(self):
+        """Lazy build the Google Drive service, used for file revisions"""
+        if self._drive is None:
+            with self._lock:
+                if self._drive is None:
+                    self._drive = self._build('drive', 'v3', 'drive/v3/')
+        return self._drive
+
+    def _warm_up_blocking(self) -> None:
+        self.service
+        if not SHEETS_EMULATOR_HOST:
+            # Fetch the first access token now rather than on the first customer's request
+            self.credentials.refresh(Request())
+
+    async def warm_up(self) -> bool:
+        """Load credentials, build the service and fetch an access token ahead of the first request"""
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, self._warm_up_blocking)
+            logger.info("Google Sheets client warmed up")
+            return True
+        except Exception as e:
+            # Not fatal: requests will retry the same steps lazily
+            logger.warning(f"Could not warm up Google Sheets client: {str(e)}")
+            return False
+
+# Create singleton instance
+sheets_client = SheetsClient()
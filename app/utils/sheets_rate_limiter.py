@@ -0,0 +1,164 @@
+import os
+import time
+import random
+import asyncio
+import logging
+from typing import Dict, Optional, Any
+
+logger = logging.getLogger(__name__)
+
+# Sheets API quota per minute; the default per-user quota is 60 reads and 60 writes
+SHEETS_READ_QUOTA_PER_MINUTE = float(os.getenv('SHEETS_READ_QUOTA_PER_MINUTE', '60'))
+SHEETS_WRITE_QUOTA_PER_MINUTE = float(os.getenv('SHEETS_WRITE_QUOTA_PER_MINUTE', '60'))
+# Requests that may be sent back to back before the per-minute rate applies
+SHEETS_QUOTA_BURST = int(os.getenv('SHEETS_QUOTA_BURST', '10'))
+# Retries for a request rejected with 429 or a 5xx error, and the base/maximum backoff in seconds
+SHEETS_MAX_RETRIES = int(os.getenv('SHEETS_MAX_RETRIES', '5'))
+SHEETS_BACKOFF_BASE = float(os.getenv('SHEETS_BACKOFF_BASE', '1.0'))
+SHEETS_BACKOFF_MAX = float(os.getenv('SHEETS_BACKOFF_MAX', '32.0'))
+
+# Status codes worth retrying: quota exceeded and transient server errors
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+class TokenBucket:
+    """
+    Token bucket for one Sheets quota.
+
+    Requests wait their turn in FIFO order. When Sheets answers 429 the bucket halves
+    its rate and pauses every caller for the backoff, then grows back towards the
+    configured rate with each successful request.
+    """
+    def __init__(self, name: str, rate_per_minute: float, burst: int = SHEETS_QUOTA_BURST):
+        self.name = name
+        self.max_rate = rate_per_minute / 60
+        self.rate = self.max_rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated_at = time.monotonic()
+        self.paused_until = 0.0
+        self._lock: Optional[asyncio.Lock] = None
+
+        self.requests = 0
+        self.queued_total = 0.0
+        self.queued_max = 0.0
+        self.throttled = 0
+        self.retries = 0
+        self.failures = 0
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    async def acquire(self) -> float:
+        """Wait for a token and return the time spent queued in seconds"""
+        # Created lazily so the lock binds to the running event loop
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        start = time.monotonic()
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                wait = self.paused_until - now
+                if wait <= 0:
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        break
+                    wait = (1 - self.tokens) / self.rate
+                await asyncio.sleep(wait)
+
+        queued = time.monotonic() - start
+        self.requests += 1
+        self.queued_total += queued
+        self.queued_max = max(self.queued_max, queued)
+        return queued
+
+    def throttle(self, delay: float) -> None:
+        """Slow down after a 429: pause every caller for the delay and halve the rate"""
+        self.throttled += 1
+        self.paused_until = max(self.paused_until, time.monotonic() + delay)
+        self.rate = max(self.max_rate / 10, self.rate / 2)
+        self.tokens = 0.0
+
+    def recover(self) -> None:
+        """Grow the rate back towards the configured quota after a successful request"""
+        if self.rate < self.max_rate:
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "queued_avg_ms": round(self.queued_total / self.requests * 1000, 1) if self.requests else 0.0,
+            "queued_max_ms": round(self.queued_max * 1000, 1),
+            "throttled": self.throttled,
+            "retries": self.retries,
+            "failures": self.failures,
+            "rate_per_minute": round(self.rate * 60, 1)
+        }
+
+class SheetsRateLimiter:
+    """Read and write quota buckets shared by every GoogleSheetsBase instance"""
+    def __init__(self):
+        self.buckets = {
+            "read": TokenBucket("read", SHEETS_READ_QUOTA_PER_MINUTE),
+            "write": TokenBucket("write", SHEETS_WRITE_QUOTA_PER_MINUTE)
+        }
+
+    async def acquire(self, kind: str) -> float:
+        """Wait for the read or write budget and return the time spent queued in seconds"""
+        return await self.buckets[kind].acquire()
+
+    @staticmethod
+    def error_status(error: Exception) -> Optional[int]:
+        """Get the HTTP status of a googleapiclient error, if it has one"""
+        resp = getattr(error, 'resp', None)
+        status = getattr(resp, 'status', None)
+        return int(status) if status is not None else None
+
+    @staticmethod
+    def backoff_delay(error: Exception, attempt: int) -> float:
+        """Exponential backoff with full jitter, honouring Retry-After when Sheets sends it"""
+        resp = getattr(error, 'resp', None)
+        retry_after = resp.get('retry-after') if hasattr(resp, 'get') else None
+        if retry_after:
+            try:
+                return min(SHEETS_BACKOFF_MAX, float(retry_after))
+            except ValueError:
+                pass
+        return random.uniform(0, min(SHEETS_BACKOFF_MAX, SHEETS_BACKOFF_BASE * 2 ** attempt))
+
+    def should_retry(self, kind: str, error: Exception, attempt: int, retry_server_errors: bool = True) -> Optional[float]:
+        """
+        Decide whether a failed request is retried.
+
+        Returns:
+            The delay in seconds before the next attempt, or None to give up
+        """
+        bucket = self.buckets[kind]
+        status = self.error_status(error)
+        if status not in RETRYABLE_STATUSES or (status != 429 and not retry_server_errors):
+            bucket.failures += 1
+            return None
+
+        delay = self.backoff_delay(error, attempt)
+        if status == 429:
+            bucket.throttle(delay)
+        if attempt >= SHEETS_MAX_RETRIES:
+            bucket.failures += 1
+            logger.error(f"Sheets {kind} request failed with {status} after {attempt} retries")
+            return None
+
+        bucket.retries += 1
+        logger.warning(f"Sheets {kind} request failed with {status}, retrying in {delay:.1f}s")
+        return delay
+
+    def record_success(self, kind: str) -> None:
+        self.buckets[kind].recover()
+
+    def metrics(self) -> Dict[str, Dict[str, Any]]:
+        """Queued time, throttling and retry counters for each quota"""
+        return {kind: bucket.metrics() for kind, bucket in self.buckets.items()}
+
+# Create singleton instance
+sheets_rate_limiter = SheetsRateLimiter()
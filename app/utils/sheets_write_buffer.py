@@ -0,0 +1,130 @@
+import os
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from .sheets_rate_limiter import sheets_rate_limiter, RETRYABLE_STATUSES
+
+logger = logging.getLogger(__name__)
+
+# Flush as soon as this many cell writes are pending
+SHEETS_BATCH_MAX_SIZE = int(os.getenv('SHEETS_BATCH_MAX_SIZE', '50'))
+# Otherwise flush this many seconds after the first pending write
+SHEETS_BATCH_INTERVAL = float(os.getenv('SHEETS_BATCH_INTERVAL', '1.0'))
+# Flushes a write may fail with a retryable error before it is dropped; other errors drop it at once
+SHEETS_FLUSH_MAX_ATTEMPTS = int(os.getenv('SHEETS_FLUSH_MAX_ATTEMPTS', '3'))
+
+class SheetsWriteBuffer:
+    """
+    Write-behind buffer that coalesces cell updates into spreadsheets.values.batchUpdate calls.
+
+    Writes are grouped per spreadsheet. A later write to the same range replaces the
+    pending one, so only the latest value is sent. A failed write is retried on later
+    flushes until it has failed max_attempts times, or dropped at once if Sheets rejected
+    it outright (e.g. a bad range or a lost permission).
+    """
+    def __init__(self, max_size: int = SHEETS_BATCH_MAX_SIZE, interval: float = SHEETS_BATCH_INTERVAL,
+                 max_attempts: int = SHEETS_FLUSH_MAX_ATTEMPTS):
+        self.max_size = max_size
+        self.interval = interval
+        self.max_attempts = max_attempts
+        # spreadsheet ID -> range -> values
+        self._pending: Dict[str, "OrderedDict[str, List[List[str]]]"] = {}
+        # spreadsheet ID -> sheet instance used to send the batch
+        self._sheets: Dict[str, "GoogleSheetsBase"] = {}
+        # (spreadsheet ID, range) -> failed flushes of the pending value
+        self._attempts: Dict[Tuple[str, str], int] = {}
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+
+    @property
+    def size(self) -> int:
+        return sum(len(writes) for writes in self._pending.values())
+
+    def add(self, sheet: "GoogleSheetsBase", range_name: str, values: List[List[str]]) -> None:
+        """Queue a range update; must be called from the event loop"""
+        writes = self._pending.setdefault(sheet.sheet_id, OrderedDict())
+        writes.pop(range_name, None)
+        writes[range_name] = values
+        # A new value gets its own attempts
+        self._attempts.pop((sheet.sheet_id, range_name), None)
+        self._sheets[sheet.sheet_id] = sheet
+
+        loop = asyncio.get_running_loop()
+        if self.size >= self.max_size:
+            self._cancel_timer()
+            loop.create_task(self.flush())
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.interval, lambda: loop.create_task(self.flush()))
+
+    def _cancel_timer(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+    async def flush(self) -> None:
+        """Send every pending write, one batchUpdate request per spreadsheet"""
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+
+        async with self._flush_lock:
+            self._cancel_timer()
+            pending, self._pending = self._pending, {}
+
+            for sheet_id, writes in pending.items():
+                sheet = self._sheets[sheet_id]
+                try:
+                    await self._send(sheet, writes)
+                    logger.info(f"Flushed {len(writes)} batched cell updates to sheet {sheet_id}")
+                except Exception as e:
+                    logger.error(f"Error flushing batched cell updates to sheet {sheet_id}: {str(e)}")
+                    if self._is_permanent(e) and len(writes) > 1:
+                        # One bad range rejects the whole batch; send the writes one by one so only it is dropped
+                        for range_name, values in writes.items():
+                            try:
+                                await self._send(sheet, {range_name: values})
+                            except Exception as e:
+                                self._requeue(sheet_id, {range_name: values}, e)
+                    else:
+                        self._requeue(sheet_id, writes, e)
+
+            if self._pending and self._flush_handle is None:
+                loop = asyncio.get_running_loop()
+                self._flush_handle = loop.call_later(self.interval, lambda: loop.create_task(self.flush()))
+
+    async def _send(self, sheet: "GoogleSheetsBase", writes: "OrderedDict[str, List[List[str]]]") -> None:
+        await sheet.batch_update_values([
+            {'range': range_name, 'values': values}
+            for range_name, values in writes.items()
+        ])
+        for range_name in writes:
+            self._attempts.pop((sheet.sheet_id, range_name), None)
+
+    @staticmethod
+    def _is_permanent(error: Exception) -> bool:
+        """Whether Sheets rejected the request itself, so sending it again cannot succeed"""
+        status = sheets_rate_limiter.error_status(error)
+        return status is not None and status not in RETRYABLE_STATUSES
+
+    def _requeue(self, sheet_id: str, writes: Dict[str, List[List[str]]], error: Exception) -> None:
+        """Put failed writes back for the next flush, or drop them if they cannot succeed"""
+        permanent = self._is_permanent(error)
+        requeue = self._pending.setdefault(sheet_id, OrderedDict())
+        for range_name, values in writes.items():
+            key = (sheet_id, range_name)
+            if range_name in requeue:
+                # A newer value for the same range arrived meanwhile and replaces this one
+                continue
+            attempts = self._attempts.get(key, 0) + 1
+            if permanent or attempts >= self.max_attempts:
+                self._attempts.pop(key, None)
+                logger.error(f"Dropped cell update {range_name} = {values} on sheet {sheet_id} "
+                             f"({attempts} failed flushes): {str(error)}")
+                continue
+            self._attempts[key] = attempts
+            requeue[range_name] = values
+        if not requeue:
+            del self._pending[sheet_id]
+
+# Shared by every sheet so writes from different customers land in the same batch
+sheets_write_buffer = SheetsWriteBuffer()
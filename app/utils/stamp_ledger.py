@@ -0,0 +1,44 @@
+import os
+import zlib
+import asyncio
+from datetime import datetime
+from typing import Dict, List, Optional, Any
+
+# Number of locks phone numbers are spread over; updates for one phone always use the same lock
+STAMP_LOCK_STRIPES = int(os.getenv('STAMP_LOCK_STRIPES', '64'))
+
+class StampLedger:
+    """
+    Per-phone ordering and event building for the append-only stamp ledger.
+
+    Callers hold lock_for(phone) around read-compute-write so updates for one customer
+    are applied strictly in order, while different customers proceed in parallel.
+    The balance stored by the backend is the source of truth; the events built here are
+    persisted by the storage backend.
+    """
+    def __init__(self, stripes: int = STAMP_LOCK_STRIPES):
+        self.stripes = stripes
+        self._locks: Optional[List[asyncio.Lock]] = None
+
+    def lock_for(self, phone_number: str) -> asyncio.Lock:
+        """Get the lock guarding stamp updates for a phone number"""
+        # Locks are created lazily so they bind to the running event loop
+        if self._locks is None:
+            self._locks = [asyncio.Lock() for _ in range(self.stripes)]
+        # crc32 is stable across processes, unlike hash()
+        return self._locks[zlib.crc32(phone_number.encode()) % self.stripes]
+
+    def record(self, phone_number: str, delta: int, previous_balance: int, source: str = "add_stamps") -> Dict[str, Any]:
+        """Build a ledger event for a stamp change"""
+        event = {
+            "timestamp": datetime.now().isoformat(),
+            "phone_number": phone_number,
+            "delta": delta,
+            "previous_balance": previous_balance,
+            "balance": previous_balance + delta,
+            "source": source
+        }
+        return event
+
+# Create singleton instance
+stamp_ledger = StampLedger()
@@ -0,0 +1,112 @@
+import os
+import copy
+import json
+import time
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Most results kept across all cached actions; the least recently used are evicted first
+TOOL_CACHE_MAX_ENTRIES = int(os.getenv('TOOL_CACHE_MAX_ENTRIES', '1000'))
+
+class ToolResultCache:
+    """
+    TTL + LRU cache of assistant tool results.
+
+    Actions opt in with "cache_ttl" (seconds) in actions.json. Entries are keyed by the
+    function name and its arguments in canonical JSON form, so argument order doesn't matter.
+    Code that changes the underlying data calls invalidate() for the actions whose results it
+    makes stale. Each invalidation bumps the function's generation, so a result read before
+    the change but finished after it is not stored (see generation() and put()).
+    """
+    def __init__(self, max_entries: int = TOOL_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, Any]]" = OrderedDict()
+        self._generations: Dict[str, int] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.stale_puts = 0
+
+    @staticmethod
+    def _key(function_name: str, arguments: Dict[str, Any]) -> Tuple[str, str]:
+        return function_name, json.dumps(arguments, sort_keys=True, separators=(",", ":"), default=str)
+
+    @staticmethod
+    def cacheable(result: Any) -> bool:
+        """Only successful results are reused; errors and not-found answers are retried"""
+        return not (isinstance(result, dict) and "status" in result and result["status"] != "success")
+
+    def get(self, function_name: str, arguments: Dict[str, Any]) -> Tuple[bool, Any]:
+        """Look up a result; returns (found, result)"""
+        key = self._key(function_name, arguments)
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return False, None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        # Callers get their own copy so they can't change the cached result
+        return True, copy.deepcopy(entry[1])
+
+    def generation(self, function_name: str) -> int:
+        """How many times a function's results have been invalidated; taken before computing a result to put()"""
+        return self._generations.get(function_name, 0)
+
+    def put(self, function_name: str, arguments: Dict[str, Any], result: Any, ttl: float,
+            generation: Optional[int] = None) -> None:
+        """Store a result for ttl seconds, unless the function was invalidated since generation was taken"""
+        if ttl <= 0 or not self.cacheable(result):
+            return
+        if generation is not None and generation != self.generation(function_name):
+            self.stale_puts += 1
+            return
+        key = self._key(function_name, arguments)
+        self._entries[key] = (time.monotonic() + ttl, copy.deepcopy(result))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, function_name: str, arguments: Optional[Dict[str, Any]] = None) -> int:
+        """Drop cached results of a function, for one set of arguments or all of them"""
+        # Results being computed right now may predate the change, whatever their arguments
+        self._generations[function_name] = self.generation(function_name) + 1
+        if arguments is not None:
+            keys = [self._key(function_name, arguments)]
+        else:
+            keys = [key for key in self._entries if key[0] == function_name]
+
+        removed = 0
+        for key in keys:
+            if self._entries.pop(key, None) is not None:
+                removed += 1
+        if removed:
+            self.invalidations += removed
+            logger.debug(f"Invalidated {removed} cached results of {function_name}")
+        return removed
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def metrics(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "stale_puts": self.stale_puts
+        }
+
+# Create singleton instance
+tool_result_cache = ToolResultCache()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+"""
+Utility script to report OpenAI token usage and cost of assistant runs.
+
+Usage:
+    python -m app.utils.usage_report top [--by phone|thread|assistant|model|tool] [--days 7] [--limit 20]
+    python -m app.utils.usage_report runs [--thread <thread_id>] [--phone <phone_number>] [--limit 50]
+    python -m app.utils.usage_report prune [--days 90]
+"""
+
+import sys
+import json
+import datetime
+import argparse
+from typing import Any, Dict, List, Optional
+from .usage_store import usage_store, GROUP_COLUMNS
+
+def format_time(timestamp: Optional[float]) -> str:
+    if not timestamp:
+        return "-"
+    return datetime.datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S')
+
+def print_top(group_by: str, days: Optional[float], limit: int):
+    """Print the most expensive groups, e.g. customers or threads"""
+    totals = usage_store.totals(days)
+    period = f"the last {days:g} days" if days is not None else "all time"
+    print(f"{totals['runs']} runs in {period}: {totals['total_tokens']} tokens "
+          f"({totals['prompt_tokens']} prompt, {totals['completion_tokens']} completion), ${totals['cost']:.4f}")
+    print()
+
+    groups = usage_store.summary(group_by, days, limit)
+    print(f"{group_by:<36} {'runs':>6} {'tokens':>10} {'avg prompt':>11} {'avg secs':>9} {'cost ($)':>10}  last run")
+    print("-" * 108)
+    for group in groups:
+        print(f"{str(group['key'] or '-'):<36} {group['runs']:>6} {group['total_tokens']:>10} "
+              f"{group['average_prompt_tokens'] or 0:>11.0f} {group['average_duration'] or 0:>9.2f} "
+              f"{group['cost']:>10.4f}  {format_time(group['last_run'])}")
+
+def print_runs(thread_id: Optional[str], phone_number: Optional[str], limit: int):
+    """Print the latest runs of a thread or customer, newest first"""
+    runs: List[Dict[str, Any]] = usage_store.runs(thread_id, phone_number, limit)
+    print(f"Found {len(runs)} runs:")
+    for run in runs:
+        tools = ", ".join(f"{name} x{calls}" for name, calls in run["tools"].items()) or "no tools"
+        print(f"- {format_time(run['created_at'])} {run['run_id']} on {run['thread_id']} ({run['status']}): "
+              f"{run['prompt_tokens']} prompt + {run['completion_tokens']} completion tokens, "
+              f"${run['cost']:.4f}, {run['duration'] or 0:.2f}s, {tools}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="OpenAI Token Usage Report")
+    subparsers = parser.add_subparsers(dest="command", help="Command to run")
+
+    # Top command
+    top_parser = subparsers.add_parser("top", help="Most expensive customers, threads, assistants, models or tools")
+    top_parser.add_argument("--by", choices=list(GROUP_COLUMNS), default="phone", help="What to group usage by")
+    top_parser.add_argument("--days", type=float, default=7, help="Number of days to look back")
+    top_parser.add_argument("--limit", type=int, default=20, help="Number of rows to show")
+    top_parser.add_argument("--json", action="store_true", help="Print JSON instead of a table")
+
+    # Runs command
+    runs_parser = subparsers.add_parser("runs", help="Latest runs of a thread or phone number")
+    runs_parser.add_argument("--thread", help="Thread ID")
+    runs_parser.add_argument("--phone", help="Phone number")
+    runs_parser.add_argument("--limit", type=int, default=50, help="Number of runs to show")
+
+    # Prune command
+    prune_parser = subparsers.add_parser("prune", help="Delete usage records older than N days")
+    prune_parser.add_argument("--days", type=float, default=90, help="Maximum age of records in days")
+
+    args = parser.parse_args()
+
+    if args.command and usage_store is None:
+        print("Usage recording is turned off (USAGE_DB_PATH is empty)")
+        sys.exit(1)
+
+    if args.command == "top":
+        if args.json:
+            print(json.dumps({
+                "totals": usage_store.totals(args.days),
+                "groups": usage_store.summary(args.by, args.days, args.limit)
+            }, indent=2))
+        else:
+            print_top(args.by, args.days, args.limit)
+
+    elif args.command == "runs":
+        print_runs(args.thread, args.phone, args.limit)
+
+    elif args.command == "prune":
+        deleted = usage_store.prune(args.days)
+        print(f"Deleted {deleted} usage records older than {args.days:g} days")
+
+    else:
+        parser.print_help()
@@ -0,0 +1,213 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Where token usage of assistant runs is recorded; empty turns recording off
+USAGE_DB_PATH = os.getenv('USAGE_DB_PATH', 'app/data/usage.db')
+
+# USD per million input and output tokens, by model name prefix; OPENAI_TOKEN_PRICES (same JSON
+# shape) adds or overrides models, e.g. {"gpt-4o-mini": [0.15, 0.6]}
+DEFAULT_TOKEN_PRICES = {
+    "gpt-4o-mini": [0.15, 0.60],
+    "gpt-4o": [2.50, 10.00],
+    "gpt-4.1-nano": [0.10, 0.40],
+    "gpt-4.1-mini": [0.40, 1.60],
+    "gpt-4.1": [2.00, 8.00],
+    "gpt-4-turbo": [10.00, 30.00],
+    "gpt-3.5-turbo": [0.50, 1.50],
+}
+OPENAI_TOKEN_PRICES = {**DEFAULT_TOKEN_PRICES, **json.loads(os.getenv('OPENAI_TOKEN_PRICES') or '{}')}
+
+# What usage can be grouped by, and the column holding it
+GROUP_COLUMNS = {
+    "assistant": "runs.assistant_id",
+    "thread": "runs.thread_id",
+    "phone": "runs.phone_number",
+    "model": "runs.model",
+    "tool": "run_tools.function_name",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    thread_id TEXT,
+    assistant_id TEXT,
+    phone_number TEXT,
+    model TEXT,
+    status TEXT,
+    prompt_tokens INTEGER NOT NULL DEFAULT 0,
+    completion_tokens INTEGER NOT NULL DEFAULT 0,
+    total_tokens INTEGER NOT NULL DEFAULT 0,
+    cost REAL NOT NULL DEFAULT 0,
+    duration REAL,
+    steps INTEGER NOT NULL DEFAULT 1,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_created_at ON runs (created_at);
+CREATE INDEX IF NOT EXISTS runs_thread_id ON runs (thread_id);
+CREATE INDEX IF NOT EXISTS runs_phone_number ON runs (phone_number);
+CREATE TABLE IF NOT EXISTS run_tools (
+    run_id TEXT NOT NULL,
+    function_name TEXT NOT NULL,
+    calls INTEGER NOT NULL,
+    PRIMARY KEY (run_id, function_name)
+);
+"""
+
+def token_cost(model: Optional[str], prompt_tokens: int, completion_tokens: int) -> float:
+    """Price of a run in USD; 0 for models without a known price"""
+    # The longest matching prefix wins, so "gpt-4o-mini-2024-07-18" is priced as gpt-4o-mini, not gpt-4o
+    prefix = max((name for name in OPENAI_TOKEN_PRICES if (model or "").startswith(name)), key=len, default=None)
+    if prefix is None:
+        return 0.0
+    input_price, output_price = OPENAI_TOKEN_PRICES[prefix]
+    return (prompt_tokens * input_price + completion_tokens * output_price) / 1_000_000
+
+class UsageStore:
+    """
+    Local SQLite record of the tokens and cost of every assistant run.
+
+    One row per run with its thread, assistant, customer phone number and the functions it
+    called, so spend can be summed per assistant, thread, phone number, model or tool. A run
+    counts in full towards every tool it called. Inserts take well under a millisecond and run
+    directly on the event loop.
+    """
+    def __init__(self, db_path: str = USAGE_DB_PATH):
+        self.db_path = db_path
+        self._conn: Optional[sqlite3.Connection] = None
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """Lazy open the database and create the schema"""
+        if self._conn is None:
+            if str(self.db_path) != ':memory:':
+                Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            # Databases created before runs recorded their model steps
+            if "steps" not in {row["name"] for row in conn.execute("PRAGMA table_info(runs)")}:
+                conn.execute("ALTER TABLE runs ADD COLUMN steps INTEGER NOT NULL DEFAULT 1")
+            self._conn = conn
+        return self._conn
+
+    def record(self, run_id: str, thread_id: Optional[str], assistant_id: Optional[str], model: Optional[str],
+               status: str, prompt_tokens: int, completion_tokens: int, phone_number: Optional[str] = None,
+               tools: Iterable[str] = (), duration: Optional[float] = None, steps: int = 1) -> float:
+        """Store a finished run's usage and return its cost; steps is the number of model steps the run took"""
+        cost = token_cost(model, prompt_tokens, completion_tokens)
+        calls: Dict[str, int] = {}
+        for name in tools:
+            calls[name] = calls.get(name, 0) + 1
+
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO runs (run_id, thread_id, assistant_id, phone_number, model, status, "
+                "prompt_tokens, completion_tokens, total_tokens, cost, duration, steps, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (run_id, thread_id, assistant_id, phone_number, model, status, prompt_tokens, completion_tokens,
+                 prompt_tokens + completion_tokens, cost, duration, steps, time.time())
+            )
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO run_tools (run_id, function_name, calls) VALUES (?, ?, ?)",
+                [(run_id, name, count) for name, count in calls.items()]
+            )
+        return cost
+
+    def summary(self, group_by: str = "phone", days: Optional[float] = None, limit: int = 20) -> List[Dict[str, Any]]:
+        """
+        Usage summed per group, most expensive first.
+
+        Args:
+            group_by: One of GROUP_COLUMNS
+            days: Only runs from the last N days; all runs if None
+            limit: Number of groups returned
+        """
+        if group_by not in GROUP_COLUMNS:
+            raise ValueError(f"Cannot group usage by {group_by}; use one of {', '.join(GROUP_COLUMNS)}")
+
+        join = "JOIN run_tools ON run_tools.run_id = runs.run_id" if group_by == "tool" else ""
+        since = time.time() - days * 86400 if days is not None else 0
+        rows = self.conn.execute(
+            f"SELECT {GROUP_COLUMNS[group_by]} AS key, COUNT(*) AS runs, SUM(prompt_tokens) AS prompt_tokens, "
+            "SUM(completion_tokens) AS completion_tokens, SUM(total_tokens) AS total_tokens, SUM(cost) AS cost, "
+            "AVG(prompt_tokens) AS average_prompt_tokens, AVG(duration) AS average_duration, MAX(created_at) AS last_run "
+            f"FROM runs {join} WHERE created_at >= ? GROUP BY key ORDER BY cost DESC, total_tokens DESC LIMIT ?",
+            (since, limit)
+        )
+        return [self._round(dict(row)) for row in rows]
+
+    def totals(self, days: Optional[float] = None) -> Dict[str, Any]:
+        """Usage of all runs, or of those from the last N days"""
+        since = time.time() - days * 86400 if days is not None else 0
+        row = self.conn.execute(
+            "SELECT COUNT(*) AS runs, COALESCE(SUM(prompt_tokens), 0) AS prompt_tokens, "
+            "COALESCE(SUM(completion_tokens), 0) AS completion_tokens, COALESCE(SUM(total_tokens), 0) AS total_tokens, "
+            "COALESCE(SUM(cost), 0) AS cost FROM runs WHERE created_at >= ?",
+            (since,)
+        ).fetchone()
+        return self._round(dict(row))
+
+    def runs(self, thread_id: Optional[str] = None, phone_number: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """The latest runs of a thread or customer, with the functions each called"""
+        conditions, params = [], []
+        if thread_id:
+            conditions.append("thread_id = ?")
+            params.append(thread_id)
+        if phone_number:
+            conditions.append("phone_number = ?")
+            params.append(phone_number)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        rows = [dict(row) for row in self.conn.execute(
+            f"SELECT * FROM runs {where} ORDER BY created_at DESC LIMIT ?", (*params, limit)
+        )]
+
+        for row in rows:
+            row["tools"] = {
+                tool["function_name"]: tool["calls"]
+                for tool in self.conn.execute("SELECT function_name, calls FROM run_tools WHERE run_id = ?", (row["run_id"],))
+            }
+            self._round(row)
+        return rows
+
+    def thread_size(self, thread_id: str) -> Optional[Tuple[int, int]]:
+        """Runs recorded on a thread and the prompt tokens per model step of the latest one, or None if it has none"""
+        row = self.conn.execute(
+            "SELECT COUNT(*) AS runs, (SELECT prompt_tokens / MAX(steps, 1) FROM runs WHERE thread_id = ? "
+            "ORDER BY created_at DESC LIMIT 1) AS prompt_tokens FROM runs WHERE thread_id = ?",
+            (thread_id, thread_id)
+        ).fetchone()
+        return (row["runs"], row["prompt_tokens"]) if row["runs"] else None
+
+    def prune(self, days: float) -> int:
+        """Delete runs older than N days; returns how many were deleted"""
+        cutoff = time.time() - days * 86400
+        with self.conn:
+            self.conn.execute(
+                "DELETE FROM run_tools WHERE run_id IN (SELECT run_id FROM runs WHERE created_at < ?)", (cutoff,)
+            )
+            deleted = self.conn.execute("DELETE FROM runs WHERE created_at < ?", (cutoff,)).rowcount
+        return deleted
+
+    @staticmethod
+    def _round(row: Dict[str, Any]) -> Dict[str, Any]:
+        for key in ("cost", "average_prompt_tokens", "average_duration", "duration"):
+            if row.get(key) is not None:
+                row[key] = round(row[key], 6 if key == "cost" else 2)
+        return row
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+# Create singleton instance
+usage_store = UsageStore() if USAGE_DB_PATH else None
@@ -0,0 +1,281 @@
+import asyncio
+import itertools
+import json
+import re
+import time
+from collections import Counter
+from typing import Any, AsyncIterator, Dict, List, Optional
+import httpx
+
+# Plug into OpenAI/AsyncOpenAI with http_client=httpx.(Async)Client(transport=api.async_transport())
+
+class FakeOpenAIAPI:
+    """
+    In-process stand-in for the Assistants API endpoints used by OpenAIAssistantService.
+
+    Every request takes `latency` seconds. A run completes after `run_duration` seconds, plus
+    `context_latency` per message in its thread (longer threads take the model longer),
+    first asking for `tool_calls` (function name -> arguments) if any are configured.
+    Request counts are kept per endpoint.
+    """
+    def __init__(self, latency: float = 0.2, run_duration: float = 0.0, tool_calls: Optional[Dict[str, Dict[str, Any]]] = None,
+                 reply: str = "Halo! Ada yang bisa kami bantu?", context_latency: float = 0.0):
+        self.latency = latency
+        self.run_duration = run_duration
+        self.context_latency = context_latency
+        self.tool_calls = tool_calls or {}
+        self.reply = reply
+        self.requests = Counter()
+        self.threads: Dict[str, List[Dict[str, Any]]] = {}
+        self.runs: Dict[str, Dict[str, Any]] = {}
+        self._ids = itertools.count(1)
+
+    def _id(self, prefix: str) -> str:
+        return f"{prefix}_{next(self._ids)}"
+
+    def _message(self, thread_id: str, role: str, text: str, run_id: Optional[str] = None) -> Dict[str, Any]:
+        return {
+            "id": self._id("msg"), "object": "thread.message", "created_at": int(time.time()),
+            "thread_id": thread_id, "role": role, "run_id": run_id, "status": "completed",
+            "content": [{"type": "text", "text": {"value": text, "annotations": []}}],
+            "attachments": [], "metadata": {}
+        }
+
+    def _add_user_message(self, thread_id: str, content: Any, role: str = "user") -> Dict[str, Any]:
+        text = content if isinstance(content, str) else " ".join(
+            item.get("text", "") for item in content if isinstance(item, dict)
+        )
+        message = self._message(thread_id, role, text)
+        self.threads.setdefault(thread_id, []).append(message)
+        return message
+
+    def _create_run(self, thread_id: str, assistant_id: str) -> Dict[str, Any]:
+        run = {
+            "id": self._id("run"), "object": "thread.run", "created_at": int(time.time()),
+            "thread_id": thread_id, "assistant_id": assistant_id, "status": "queued",
+            "required_action": None, "usage": None, "instructions": "", "model": "gpt-4o-mini",
+            "tools": [], "metadata": {}, "parallel_tool_calls": True,
+            "_started": time.monotonic(), "_pending_tools": dict(self.tool_calls)
+        }
+        self.runs[run["id"]] = run
+        return run
+
+    def _create_and_run(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        """A new thread holding body["thread"]["messages"] and a run on it"""
+        thread_id = self._id("thread")
+        self.threads[thread_id] = []
+        for message in (body.get("thread") or {}).get("messages", []):
+            self._add_user_message(thread_id, message["content"])
+        return self._create_run(thread_id, body["assistant_id"])
+
+    def _advance(self, run: Dict[str, Any]) -> None:
+        """Move a run forward based on the time since it was created"""
+        if run["status"] in ("completed", "cancelled", "failed", "expired", "requires_action"):
+            return
+        if time.monotonic() - run["_started"] < self._run_duration(run):
+            run["status"] = "in_progress"
+        elif run["_pending_tools"]:
+            # Each model step reads the whole thread again, and the run's usage adds them all up
+            run["_step_prompt_tokens"] = run.get("_step_prompt_tokens", 0) + self._prompt_tokens(run)
+            run["status"] = "requires_action"
+            run["required_action"] = {"type": "submit_tool_outputs", "submit_tool_outputs": {"tool_calls": [
+                {"id": self._id("call"), "type": "function",
+                 "function": {"name": name, "arguments": json.dumps(arguments)}}
+                for name, arguments in run["_pending_tools"].items()
+            ]}}
+            run["_pending_tools"] = {}
+        else:
+            run["status"] = "completed"
+            prompt_tokens = run.get("_step_prompt_tokens", 0) + self._prompt_tokens(run)
+            run["usage"] = {"prompt_tokens": prompt_tokens, "completion_tokens": 50, "total_tokens": prompt_tokens + 50}
+            self.threads.setdefault(run["thread_id"], []).append(
+                self._message(run["thread_id"], "assistant", self.reply, run["id"])
+            )
+
+    def _prompt_tokens(self, run: Dict[str, Any]) -> int:
+        """Like the real API, the whole thread is sent to the model, so prompts grow with the thread"""
+        return 300 + 100 * len(self.threads.get(run["thread_id"], []))
+
+    def _run_duration(self, run: Dict[str, Any]) -> float:
+        return self.run_duration + self.context_latency * len(self.threads.get(run["thread_id"], []))
+
+    def _active_run(self, thread_id: str) -> Optional[Dict[str, Any]]:
+        """The thread's run that hasn't finished yet, if any"""
+        for run in self.runs.values():
+            if run["thread_id"] == thread_id:
+                self._advance(run)
+                if run["status"] not in ("completed", "cancelled", "failed", "expired"):
+                    return run
+        return None
+
+    def _reject_if_active(self, thread_id: str) -> Optional[httpx.Response]:
+        """Like the real API, refuse messages and runs on a thread with an active run"""
+        run = self._active_run(thread_id)
+        if run is None:
+            return None
+        self.requests["rejected_active_run"] += 1
+        return httpx.Response(400, json={"error": {
+            "message": f"Thread {thread_id} already has an active run {run['id']}.", "type": "invalid_request_error"
+        }})
+
+    @staticmethod
+    def _public(run: Dict[str, Any]) -> Dict[str, Any]:
+        return {key: value for key, value in run.items() if not key.startswith("_")}
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        """Answer one API request"""
+        path = request.url.path.split("/v1", 1)[-1]
+        body = json.loads(request.content) if request.content else {}
+        method = request.method
+
+        if method == "POST" and path == "/threads":
+            self.requests["threads.create"] += 1
+            thread_id = self._id("thread")
+            self.threads[thread_id] = []
+            for message in body.get("messages", []):
+                self._add_user_message(thread_id, message["content"], message.get("role", "user"))
+            return httpx.Response(200, json={"id": thread_id, "object": "thread", "created_at": int(time.time()),
+                                             "metadata": body.get("metadata") or {}})
+
+        match = re.match(r"^/threads/([^/]+)$", path)
+        if match and method == "DELETE":
+            self.requests["threads.delete"] += 1
+            self.threads.pop(match.group(1), None)
+            return httpx.Response(200, json={"id": match.group(1), "object": "thread.deleted", "deleted": True})
+
+        if method == "POST" and path == "/chat/completions":
+            self.requests["chat.completions.create"] += 1
+            transcript = body["messages"][-1]["content"]
+            return httpx.Response(200, json={
+                "id": self._id("chatcmpl"), "object": "chat.completion", "created": int(time.time()), "model": body["model"],
+                "choices": [{"index": 0, "finish_reason": "stop", "message": {
+                    "role": "assistant", "content": f"Summary of {transcript.count(chr(10)) + 1} messages."
+                }}],
+                "usage": {"prompt_tokens": len(transcript) // 4, "completion_tokens": 20, "total_tokens": len(transcript) // 4 + 20}
+            })
+
+        if method == "POST" and path == "/threads/runs":
+            self.requests["threads.create_and_run"] += 1
+            return httpx.Response(200, json=self._public(self._create_and_run(body)))
+
+        match = re.match(r"^/threads/([^/]+)/messages$", path)
+        if match and method == "POST":
+            self.requests["messages.create"] += 1
+            rejection = self._reject_if_active(match.group(1))
+            if rejection is not None:
+                return rejection
+            return httpx.Response(200, json=self._add_user_message(match.group(1), body["content"], body.get("role", "user")))
+        if match and method == "GET":
+            self.requests["messages.list"] += 1
+            messages = list(reversed(self.threads.get(match.group(1), [])))
+            if request.url.params.get("order") == "asc":
+                messages.reverse()
+            after = request.url.params.get("after")
+            if after:
+                ids = [m["id"] for m in messages]
+                messages = messages[ids.index(after) + 1:] if after in ids else []
+            if request.url.params.get("run_id"):
+                messages = [m for m in messages if m["run_id"] == request.url.params["run_id"]]
+            limit = int(request.url.params.get("limit", 20))
+            page = messages[:limit]
+            return httpx.Response(200, json={
+                "object": "list", "data": page, "has_more": len(messages) > limit,
+                "first_id": page[0]["id"] if page else None, "last_id": page[-1]["id"] if page else None
+            })
+
+        match = re.match(r"^/threads/([^/]+)/runs$", path)
+        if match and method == "POST":
+            self.requests["runs.create"] += 1
+            rejection = self._reject_if_active(match.group(1))
+            if rejection is not None:
+                return rejection
+            for message in body.get("additional_messages") or []:
+                self._add_user_message(match.group(1), message["content"])
+            return httpx.Response(200, json=self._public(self._create_run(match.group(1), body["assistant_id"])))
+
+        match = re.match(r"^/threads/([^/]+)/runs/([^/]+)$", path)
+        if match and method == "GET":
+            self.requests["runs.retrieve"] += 1
+            run = self.runs[match.group(2)]
+            self._advance(run)
+            return httpx.Response(200, json=self._public(run))
+
+        match = re.match(r"^/threads/([^/]+)/runs/([^/]+)/submit_tool_outputs$", path)
+        if match and method == "POST":
+            self.requests["runs.submit_tool_outputs"] += 1
+            run = self.runs[match.group(2)]
+            run.update(status="in_progress", required_action=None, _started=time.monotonic())
+            return httpx.Response(200, json=self._public(run))
+
+        match = re.match(r"^/threads/([^/]+)/runs/([^/]+)/cancel$", path)
+        if match and method == "POST":
+            self.requests["runs.cancel"] += 1
+            run = self.runs[match.group(2)]
+            run["status"] = "cancelled"
+            return httpx.Response(200, json=self._public(run))
+
+        return httpx.Response(404, json={"error": {"message": f"Unknown endpoint {method} {path}"}})
+
+    async def _run_events(self, run: Dict[str, Any]) -> AsyncIterator[bytes]:
+        """Server-sent events for a streamed run, up to requires_action or completion"""
+        def sse(event: str, data: Any) -> bytes:
+            return f"event: {event}\ndata: {json.dumps(data)}\n\n".encode()
+
+        yield sse("thread.run.created", self._public(run))
+        await asyncio.sleep(max(0.0, self._run_duration(run) - (time.monotonic() - run["_started"])))
+        self._advance(run)
+
+        if run["status"] == "completed":
+            message = self.threads[run["thread_id"]][-1]
+            text = message["content"][0]["text"]["value"]
+            yield sse("thread.message.created", dict(message, content=[], status="in_progress"))
+            for start in range(0, len(text), 8):
+                yield sse("thread.message.delta", {"id": message["id"], "object": "thread.message.delta", "delta": {
+                    "content": [{"index": 0, "type": "text", "text": {"value": text[start:start + 8], "annotations": []}}]
+                }})
+            yield sse("thread.message.completed", message)
+        yield sse(f"thread.run.{run['status']}", self._public(run))
+        yield b"event: done\ndata: [DONE]\n\n"
+
+    def handle_stream(self, request: httpx.Request) -> httpx.Response:
+        """Answer a run request made with stream=True"""
+        path = request.url.path.split("/v1", 1)[-1]
+        body = json.loads(request.content)
+
+        match = re.match(r"^/threads/([^/]+)/runs$", path)
+        if path == "/threads/runs":
+            self.requests["threads.create_and_run"] += 1
+            run = self._create_and_run(body)
+        elif match:
+            self.requests["runs.create"] += 1
+            rejection = self._reject_if_active(match.group(1))
+            if rejection is not None:
+                return rejection
+            for message in body.get("additional_messages") or []:
+                self._add_user_message(match.group(1), message["content"])
+            run = self._create_run(match.group(1), body["assistant_id"])
+        else:
+            match = re.match(r"^/threads/([^/]+)/runs/([^/]+)/submit_tool_outputs$", path)
+            if not match:
+                return httpx.Response(404, json={"error": {"message": f"Unknown streaming endpoint {path}"}})
+            self.requests["runs.submit_tool_outputs"] += 1
+            run = self.runs[match.group(2)]
+            run.update(status="in_progress", required_action=None, _started=time.monotonic())
+
+        return httpx.Response(200, headers={"content-type": "text/event-stream"}, content=self._run_events(run))
+
+    def sync_transport(self) -> httpx.MockTransport:
+        """Transport for the sync client; latency blocks the calling thread like a real socket"""
+        def handler(request: httpx.Request) -> httpx.Response:
+            time.sleep(self.latency)
+            return self.handle(request)
+        return httpx.MockTransport(handler)
+
+    def async_transport(self) -> httpx.MockTransport:
+        """Transport for the async client"""
+        async def handler(request: httpx.Request) -> httpx.Response:
+            await asyncio.sleep(self.latency)
+            if request.content and json.loads(request.content).get("stream"):
+                return self.handle_stream(request)
+            return self.handle(request)
+        return httpx.MockTransport(handler)
@@ -0,0 +1,208 @@
+import json
+import re
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+from typing import Dict, List, Optional, Tuple
+
+# Point the app at this server with SHEETS_EMULATOR_HOST=127.0.0.1:<port>
+
+def column_index(letters: str) -> int:
+    """A -> 0, F -> 5, AA -> 26"""
+    index = 0
+    for letter in letters:
+        index = index * 26 + ord(letter) - ord('A') + 1
+    return index - 1
+
+def column_letters(index: int) -> str:
+    letters = ''
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(ord('A') + remainder) + letters
+    return letters
+
+def parse_range(range_name: str) -> Tuple[int, int, Optional[int], Optional[int]]:
+    """Parse "Sheet1!A2:F" into (first column, first row, last column, last row); rows are 1-based"""
+    cells = range_name.split('!')[-1]
+    start, _, end = cells.partition(':')
+    start_col, start_row = re.match(r'([A-Z]+)(\d*)', start).groups()
+    end_col, end_row = re.match(r'([A-Z]+)(\d*)', end or start).groups()
+    return (
+        column_index(start_col),
+        int(start_row) if start_row else 1,
+        column_index(end_col),
+        int(end_row) if end_row else None
+    )
+
+class FakeSpreadsheet:
+    """A single-tab spreadsheet with a Drive version that changes on every edit"""
+    def __init__(self, rows: Optional[List[List[str]]] = None):
+        self.rows: List[List[str]] = [list(row) for row in rows or []]
+        self.version = 1
+        self.lock = threading.Lock()
+
+    def read(self, range_name: str) -> List[List[str]]:
+        first_col, first_row, last_col, last_row = parse_range(range_name)
+        last_row = min(last_row or len(self.rows), len(self.rows))
+        values = []
+        for row in self.rows[first_row - 1:last_row]:
+            cells = row[first_col:last_col + 1]
+            # Like the real API, trailing empty cells and rows are left out
+            while cells and cells[-1] == '':
+                cells.pop()
+            values.append(cells)
+        while values and not values[-1]:
+            values.pop()
+        return values
+
+    def write(self, range_name: str, values: List[List[str]]) -> None:
+        first_col, first_row, _, _ = parse_range(range_name)
+        for offset, row_values in enumerate(values):
+            row_number = first_row + offset
+            while len(self.rows) < row_number:
+                self.rows.append([])
+            row = self.rows[row_number - 1]
+            for col_offset, value in enumerate(row_values):
+                col = first_col + col_offset
+                while len(row) <= col:
+                    row.append('')
+                row[col] = str(value)
+        self.version += 1
+
+    def append(self, values: List[List[str]]) -> str:
+        first_row = len(self.rows) + 1
+        self.write(f'A{first_row}', values)
+        last_col = column_letters(max(len(row) for row in values) - 1)
+        return f'Sheet1!A{first_row}:{last_col}{first_row + len(values) - 1}'
+
+class FakeSheetsServer:
+    """
+    Local stand-in for the Sheets v4 values API and the Drive v3 files.get call.
+
+    Implements just what GoogleSheetsBase uses: values get, batchGet, update, append and batchUpdate,
+    plus the file version used by the customer sync. Request counts are kept per call type.
+    """
+    def __init__(self, host: str = '127.0.0.1', port: int = 0):
+        self.spreadsheets: Dict[str, FakeSpreadsheet] = {}
+        self.requests = Counter()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def _reply(self, body: dict, status: int = 200):
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _body(self) -> dict:
+                length = int(self.headers.get('Content-Length') or 0)
+                return json.loads(self.rfile.read(length) or b'{}')
+
+            def _handle(self, method: str):
+                path = unquote(urlparse(self.path).path)
+                match = re.match(r'^/drive/v3/files/([^/]+)$', path)
+                if match and method == 'GET':
+                    sheet = server.spreadsheets.get(match.group(1))
+                    if sheet is None:
+                        return self._reply({'error': {'code': 404, 'message': 'File not found'}}, 404)
+                    server.requests['drive.get'] += 1
+                    return self._reply({'version': str(sheet.version)})
+
+                match = re.match(r'^/v4/spreadsheets/([^/]+)/values(?:/(.+?))?(:append|:batchUpdate|:batchGet)?$', path)
+                if not match:
+                    return self._reply({'error': {'code': 404, 'message': f'Unknown path {path}'}}, 404)
+                sheet_id, range_name, action = match.groups()
+                sheet = server.spreadsheets.get(sheet_id)
+                if sheet is None:
+                    return self._reply({'error': {'code': 404, 'message': 'Spreadsheet not found'}}, 404)
+
+                with sheet.lock:
+                    if method == 'GET' and action == ':batchGet':
+                        server.requests['values.batchGet'] += 1
+                        value_ranges = []
+                        for requested in parse_qs(urlparse(self.path).query).get('ranges', []):
+                            value_range = {'range': requested, 'majorDimension': 'ROWS'}
+                            values = sheet.read(requested)
+                            if values:
+                                value_range['values'] = values
+                            value_ranges.append(value_range)
+                        return self._reply({'spreadsheetId': sheet_id, 'valueRanges': value_ranges})
+                    if method == 'GET':
+                        server.requests['values.get'] += 1
+                        values = sheet.read(range_name)
+                        body = {'range': range_name, 'majorDimension': 'ROWS'}
+                        if values:
+                            body['values'] = values
+                        return self._reply(body)
+                    if method == 'PUT':
+                        server.requests['values.update'] += 1
+                        sheet.write(range_name, self._body().get('values', []))
+                        return self._reply({'spreadsheetId': sheet_id, 'updatedRange': range_name})
+                    if action == ':append':
+                        server.requests['values.append'] += 1
+                        updated_range = sheet.append(self._body().get('values', []))
+                        return self._reply({'spreadsheetId': sheet_id, 'updates': {'updatedRange': updated_range}})
+                    if action == ':batchUpdate':
+                        server.requests['values.batchUpdate'] += 1
+                        data = self._body().get('data', [])
+                        for entry in data:
+                            sheet.write(entry['range'], entry['values'])
+                        return self._reply({'spreadsheetId': sheet_id, 'totalUpdatedRanges': len(data)})
+                return self._reply({'error': {'code': 400, 'message': 'Unsupported request'}}, 400)
+
+            def do_GET(self):
+                self._handle('GET')
+
+            def do_PUT(self):
+                self._handle('PUT')
+
+            def do_POST(self):
+                self._handle('POST')
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def host(self) -> str:
+        """host:port to use as SHEETS_EMULATOR_HOST"""
+        host, port = self.httpd.server_address[:2]
+        return f'{host}:{port}'
+
+    def add_spreadsheet(self, sheet_id: str, rows: List[List[str]]) -> FakeSpreadsheet:
+        self.spreadsheets[sheet_id] = FakeSpreadsheet(rows)
+        return self.spreadsheets[sheet_id]
+
+    def edit(self, sheet_id: str, range_name: str, values: List[List[str]]) -> None:
+        """Change cells directly, like a staff member editing the sheet by hand"""
+        sheet = self.spreadsheets[sheet_id]
+        with sheet.lock:
+            sheet.write(range_name, values)
+
+    def insert_row(self, sheet_id: str, row_number: int, values: List[str]) -> None:
+        """Insert a row by hand, shifting every row from row_number down by one"""
+        sheet = self.spreadsheets[sheet_id]
+        with sheet.lock:
+            sheet.rows.insert(row_number - 1, list(values))
+            sheet.version += 1
+
+    def delete_row(self, sheet_id: str, row_number: int) -> None:
+        sheet = self.spreadsheets[sheet_id]
+        with sheet.lock:
+            del sheet.rows[row_number - 1]
+            sheet.version += 1
+
+    def start(self) -> 'FakeSheetsServer':
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -0,0 +1,86 @@
+import asyncio
+import itertools
+import time
+from statistics import mean, median
+import os
+import httpx
+from openai import AsyncOpenAI
+from app.services import openai_service
+from app.services.openai_service import OpenAIAssistantService, OPENAI_FALLBACK_REPLY
+from app.services.thread_pool import WarmThreadPool
+from app.models.assistant_models import ChatRequest, ChatMessage
+from tests.fake_openai_api import FakeOpenAIAPI
+
+# Simulated OpenAI API round trip in seconds
+OPENAI_LATENCY = float(os.getenv("OPENAI_LATENCY", "0.1"))
+CHATS = 40
+# One run in STUCK_EVERY never finishes
+STUCK_EVERY = 5
+BUDGET = 3.0
+# How long the benchmark waits for a chat before counting it as stuck
+GIVE_UP_AFTER = 15.0
+
+class StuckRunsAPI(FakeOpenAIAPI):
+    """Every STUCK_EVERY-th run stays in_progress forever"""
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._run_count = itertools.count(1)
+
+    def _create_run(self, thread_id, assistant_id):
+        run = super()._create_run(thread_id, assistant_id)
+        if next(self._run_count) % STUCK_EVERY == 0:
+            run["_started"] = time.monotonic() + 3600
+        return run
+
+async def timed_chat(service: OpenAIAssistantService, client: AsyncOpenAI, index: int, budget):
+    thread_id = (await client.beta.threads.create()).id
+    request = ChatRequest(
+        assistant_id="asst_benchmark",
+        thread_id=thread_id,
+        messages=[ChatMessage(role="user", content=f"Halo {index}")],
+        timeout=budget
+    )
+    start_time = time.perf_counter()
+    try:
+        response = await asyncio.wait_for(service.chat(request), timeout=GIVE_UP_AFTER)
+        outcome = "fallback" if response.status == "timeout" else "reply"
+        if outcome == "fallback":
+            assert response.messages[0].content == OPENAI_FALLBACK_REPLY
+    except asyncio.TimeoutError:
+        outcome = "stuck"
+    elapsed = time.perf_counter() - start_time
+
+    # The thread should take the customer's next message
+    try:
+        await asyncio.wait_for(service.chat(ChatRequest(
+            assistant_id="asst_benchmark", thread_id=thread_id,
+            messages=[ChatMessage(role="user", content="Halo lagi")], timeout=budget
+        )), timeout=GIVE_UP_AFTER)
+        thread_usable = True
+    except Exception:
+        thread_usable = False
+    return outcome, elapsed, thread_usable
+
+async def run_benchmark(name: str, budget: float):
+    api = StuckRunsAPI(latency=OPENAI_LATENCY, run_duration=1.0)
+    client = AsyncOpenAI(api_key="test", http_client=httpx.AsyncClient(transport=api.async_transport()))
+    service = OpenAIAssistantService(client)
+
+    results = await asyncio.gather(*[timed_chat(service, client, i, budget) for i in range(CHATS)])
+    durations = [r[1] for r in results]
+    outcomes = [r[0] for r in results]
+    print(f"\n{name}")
+    print("-" * 50)
+    print(f"Replies {outcomes.count('reply')}, fallback replies {outcomes.count('fallback')}, "
+          f"still waiting after {GIVE_UP_AFTER:.0f}s {outcomes.count('stuck')}")
+    print(f"Latency (seconds): average {mean(durations):.2f}, median {median(durations):.2f}, max {max(durations):.2f}")
+    print(f"Runs cancelled {api.requests['runs.cancel']}, threads accepting the next message {sum(1 for r in results if r[2])}/{CHATS}")
+
+async def main():
+    openai_service.warm_thread_pool = WarmThreadPool(size=0)
+    print(f"{CHATS} chats, one run in {STUCK_EVERY} never finishes")
+    await run_benchmark("No budget", 3600)
+    await run_benchmark(f"{BUDGET:.0f}s budget", BUDGET)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,92 @@
+import asyncio
+import time
+from statistics import mean, median
+import os
+import httpx
+from openai import AsyncOpenAI
+from app.services import openai_service
+from app.services.openai_service import OpenAIAssistantService
+from app.services.thread_pool import WarmThreadPool
+from app.services.job_queue import JobQueue, QueueFullError
+from app.models.assistant_models import ChatRequest, ChatMessage
+from app.models.manychat_models import ManyChatRequest
+from tests.fake_openai_api import FakeOpenAIAPI
+
+# Simulated OpenAI API round trip in seconds
+OPENAI_LATENCY = float(os.getenv("OPENAI_LATENCY", "0.2"))
+BURST = 300
+
+class BenchmarkService(OpenAIAssistantService):
+    """ManyChat requests answered by the fake API, without storage or ManyChat calls"""
+    in_flight = 0
+    peak_in_flight = 0
+    finished = []
+    received = {}
+
+    async def _process_manychat_background(self, request):
+        cls = BenchmarkService
+        cls.in_flight += 1
+        cls.peak_in_flight = max(cls.peak_in_flight, cls.in_flight)
+        try:
+            await self.chat(ChatRequest(
+                assistant_id=request.assistant_id,
+                thread_id=request.thread_id,
+                messages=[ChatMessage(role="user", content=request.messages[-1].content)]
+            ))
+            cls.finished.append(time.perf_counter() - cls.received[request.subscriber_id])
+        finally:
+            cls.in_flight -= 1
+
+class UnboundedService(BenchmarkService):
+    """Previous behaviour: every request starts an untracked task"""
+    async def manychat(self, request):
+        thread_id = await self._create_initial_thread()
+        request = ManyChatRequest(**dict(request.model_dump(), thread_id=thread_id))
+        asyncio.create_task(self._process_manychat_background(request))
+
+async def run_benchmark(name: str, service_class, queue: JobQueue):
+    api = FakeOpenAIAPI(latency=OPENAI_LATENCY, run_duration=1.0)
+    service = service_class(AsyncOpenAI(api_key="test", http_client=httpx.AsyncClient(transport=api.async_transport())))
+    openai_service.chat_job_queue = queue
+    BenchmarkService.in_flight = BenchmarkService.peak_in_flight = 0
+    BenchmarkService.finished = []
+    BenchmarkService.received = {}
+
+    async def request(index: int):
+        BenchmarkService.received[str(index)] = time.perf_counter()
+        try:
+            await service.manychat(ManyChatRequest(
+                assistant_id="asst_benchmark",
+                subscriber_id=str(index),
+                phone_number=f"628{index:09d}",
+                messages=[ChatMessage(role="user", content=f"Halo {index}")]
+            ))
+            return 202
+        except QueueFullError:
+            return 429
+
+    start_time = time.perf_counter()
+    statuses = await asyncio.gather(*[request(i) for i in range(BURST)])
+    accepted_time = time.perf_counter() - start_time
+    while len(BenchmarkService.finished) < statuses.count(202):
+        await asyncio.sleep(0.05)
+    await queue.stop()
+
+    print(f"\n{name}")
+    print("-" * 50)
+    print(f"Accepted {statuses.count(202)}, refused with 429: {statuses.count(429)} (admission took {accepted_time:.2f}s)")
+    print(f"Peak chats in flight: {BenchmarkService.peak_in_flight}")
+    print(f"Reply latency (seconds): average {mean(BenchmarkService.finished):.2f}, median {median(BenchmarkService.finished):.2f}, "
+          f"max {max(BenchmarkService.finished):.2f}")
+    if service_class is not UnboundedService:
+        metrics = queue.metrics()
+        print(f"Queue wait: {metrics['queue_wait_seconds']}, execution: {metrics['execution_seconds']}")
+
+async def main():
+    openai_service.warm_thread_pool = WarmThreadPool(size=0)
+    print(f"Burst of {BURST} ManyChat requests, runs take 1s")
+    await run_benchmark("Untracked tasks", UnboundedService, JobQueue("chat"))
+    await run_benchmark("Job queue (50 workers, 150 waiting)", BenchmarkService, JobQueue("chat", workers=50, max_depth=150))
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,82 @@
+import asyncio
+import json
+import time
+from statistics import mean, median
+import os
+import httpx
+from openai import AsyncOpenAI
+from app.services import openai_service
+from app.services.openai_service import OpenAIAssistantService
+from app.services.thread_pool import WarmThreadPool
+from app.models.assistant_models import ChatRequest, ChatMessage
+from tests.fake_openai_api import FakeOpenAIAPI
+
+# Simulated OpenAI API round trip in seconds
+OPENAI_LATENCY = float(os.getenv("OPENAI_LATENCY", "0.2"))
+CHATS = 20
+
+async def timed_chat(service: OpenAIAssistantService, thread_id, index: int):
+    start_time = time.perf_counter()
+    response = await service.chat(ChatRequest(
+        assistant_id="asst_benchmark",
+        thread_id=thread_id,
+        messages=[ChatMessage(role="user", content=f"Halo, saya pelanggan {index}")]
+    ))
+    return response, time.perf_counter() - start_time
+
+async def run_benchmark(name: str, combined_runs: bool, stream_runs: bool, existing_threads: bool):
+    api = FakeOpenAIAPI(latency=OPENAI_LATENCY)
+    client = AsyncOpenAI(api_key="test", http_client=httpx.AsyncClient(transport=api.async_transport()))
+    service = OpenAIAssistantService(client, stream_runs=stream_runs, combined_runs=combined_runs)
+
+    thread_ids = [None] * CHATS
+    if existing_threads:
+        thread_ids = [(await client.beta.threads.create()).id for _ in range(CHATS)]
+        api.requests.clear()
+
+    results = await asyncio.gather(*[timed_chat(service, thread_ids[i], i) for i in range(CHATS)])
+    durations = [r[1] for r in results]
+    completed = sum(1 for r in results if r[0].status == "completed" and r[0].messages)
+    setup_calls = sum(api.requests[k] for k in ("threads.create", "messages.create", "runs.create", "threads.create_and_run"))
+    print(f"{name:<30} completed {completed}/{CHATS}, latency average {mean(durations):.2f}s median {median(durations):.2f}s, "
+          f"calls before the run starts {setup_calls / CHATS:.1f} per chat")
+
+class NoCombinedRunsAPI(FakeOpenAIAPI):
+    """An API that rejects createAndRun and additional_messages"""
+    def handle(self, request):
+        body = json.loads(request.content) if request.content else {}
+        if request.url.path.endswith("/threads/runs") or body.get("additional_messages"):
+            self.requests["rejected"] += 1
+            return httpx.Response(400, json={"error": {"message": "Unsupported"}})
+        return super().handle(request)
+
+    def handle_stream(self, request):
+        body = json.loads(request.content)
+        if request.url.path.endswith("/threads/runs") or body.get("additional_messages"):
+            self.requests["rejected"] += 1
+            return httpx.Response(400, json={"error": {"message": "Unsupported"}})
+        return super().handle_stream(request)
+
+async def check_fallback():
+    api = NoCombinedRunsAPI(latency=0.01)
+    client = AsyncOpenAI(api_key="test", http_client=httpx.AsyncClient(transport=api.async_transport()))
+    for stream_runs in (True, False):
+        response, _ = await timed_chat(OpenAIAssistantService(client, stream_runs=stream_runs), None, 0)
+        assert response.status == "completed" and response.messages, "fallback did not complete the chat"
+        response, _ = await timed_chat(OpenAIAssistantService(client, stream_runs=stream_runs), response.thread_id, 1)
+        assert response.status == "completed" and response.messages, "fallback did not complete the chat"
+    print(f"\nFallback: chats completed after {api.requests['rejected']} rejected combined requests")
+
+async def main():
+    # Keep the warm thread pool out of the comparison
+    openai_service.warm_thread_pool = WarmThreadPool(size=0)
+    for stream_runs in (True, False):
+        for existing_threads in (False, True):
+            print(f"\n{'Existing' if existing_threads else 'New'} threads, {'streamed' if stream_runs else 'polled'} runs")
+            print("-" * 50)
+            await run_benchmark("Separate message and run", False, stream_runs, existing_threads)
+            await run_benchmark("Combined message and run", True, stream_runs, existing_threads)
+    await check_fallback()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,68 @@
+import asyncio
+import importlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from app.services import openai_service
+from app.services.function_registry import FunctionRegistry
+from app.services.openai_service import OpenAIAssistantService
+
+CALLS = 5000
+
+class FileDispatchService(OpenAIAssistantService):
+    """Previous behaviour: read actions.json and import the function on every call"""
+    async def _execute_function(self, function_name, arguments):
+        with open('app/data/actions.json', 'r') as f:
+            actions = json.load(f)
+        action = actions['actions'][function_name]
+        module_path, func_name = action['function_path'].rsplit('.', 1)
+        func = getattr(importlib.import_module(module_path), func_name)
+        return await func(**arguments)
+
+async def time_dispatch(name: str, service: OpenAIAssistantService):
+    await service._execute_function("get_menu", {"category": "main"})
+    start_time = time.perf_counter()
+    for _ in range(CALLS):
+        await service._execute_function("get_menu", {"category": "main"})
+    elapsed = time.perf_counter() - start_time
+    print(f"{name:<32} {elapsed / CALLS * 1e6:8.1f} us per call")
+
+async def check_hot_reload():
+    workdir = Path(tempfile.mkdtemp())
+    try:
+        actions_file = workdir / "actions.json"
+        shutil.copy("app/data/actions.json", actions_file)
+        registry = FunctionRegistry(actions_file)
+
+        before = registry.get("get_menu")
+        assert registry.get("get_menu") is before, "table rebuilt without a change"
+
+        data = json.loads(actions_file.read_text())
+        data["actions"]["get_menu"]["timeout"] = 5
+        data["actions"]["lihat_menu"] = dict(data["actions"]["get_menu"], name="lihat_menu")
+        actions_file.write_text(json.dumps(data, indent=4))
+
+        after = registry.get("get_menu")
+        assert after is not before and after.timeout == 5, "edit to actions.json not picked up"
+        assert after.func is before.func, "unchanged function was imported again"
+        assert await registry.get("lihat_menu").func("desserts") == ["Ice Cream"]
+
+        actions_file.write_text("{ half written")
+        assert registry.get("get_menu") is after, "a broken file replaced the last good table"
+        print("Hot reload: edits picked up on the next call, unchanged calls reuse the table, broken files ignored")
+    finally:
+        shutil.rmtree(workdir)
+
+async def main():
+    print(f"Dispatching get_menu {CALLS} times")
+    print("-" * 50)
+    await time_dispatch("Before (read file + import)", FileDispatchService())
+    await time_dispatch("After (cached dispatch table)", OpenAIAssistantService())
+    print()
+    await check_hot_reload()
+
+if __name__ == "__main__":
+    asyncio.run(main())
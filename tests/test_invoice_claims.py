@@ -0,0 +1,79 @@
+import asyncio
+import os
+from tests.fake_sheets_server import FakeSheetsServer
+
+# Runs against a local fake Sheets server, no Google credentials needed
+INVOICES = 200
+CUSTOMER_SHEET_ID = "loyalty"
+INVOICE_SHEET_ID = "invoices"
+
+server = FakeSheetsServer().start()
+# The app reads these when it is imported
+os.environ["SHEETS_EMULATOR_HOST"] = server.host
+os.environ["LOYALTY_SHEET_ID"] = CUSTOMER_SHEET_ID
+os.environ["INVOICE_SHEET_ID"] = INVOICE_SHEET_ID
+os.environ["SHEETS_SYNC_INTERVAL"] = "0"
+os.environ.setdefault("STAMP_LEDGER_PATH", os.path.join("/tmp", "test_invoice_claims_ledger.jsonl"))
+os.environ.setdefault("SHEETS_READ_QUOTA_PER_MINUTE", "100000")
+os.environ.setdefault("SHEETS_WRITE_QUOTA_PER_MINUTE", "100000")
+
+from app.storage.sheets_backend import SheetsStorageBackend
+from app.functions.loyalty_functions import InvoiceSheet
+
+PHONE = "628000000001"
+
+class CachedRowsBackend(SheetsStorageBackend):
+    """Previous behaviour: trust the cached invoice rows until the index expires"""
+    async def _verify_invoice_rows(self, invoice_ids):
+        return True
+
+def invoice_rows():
+    return [["Invoice", "Total", "Claimed", "Claimed By", "Claimed At"]] + [
+        [f"INV-{i}", "60000", "false"] for i in range(INVOICES)
+    ]
+
+def row_of(invoice_id: str):
+    return next(row for row in server.spreadsheets[INVOICE_SHEET_ID].rows if row and row[0] == invoice_id)
+
+async def claim(invoice_sheet: InvoiceSheet, invoice_id: str):
+    return await invoice_sheet.process_invoices(
+        invoices=[{"id": invoice_id, "total": "60000"}],
+        metadata={"phone_number": PHONE, "customer_name": "Budi"}
+    )
+
+async def run_benchmark(name: str, backend_class):
+    server.add_spreadsheet(CUSTOMER_SHEET_ID, [
+        ["Name", "Phone", "Email", "Stamps", "Chat Status", "Thread ID"], ["Budi", PHONE, "", "0", "", ""]
+    ])
+    server.add_spreadsheet(INVOICE_SHEET_ID, invoice_rows())
+    invoice_sheet = InvoiceSheet(backend_class())
+
+    # Loads the invoice index, which is then cached for INVOICE_CACHE_TTL
+    await claim(invoice_sheet, "INV-0")
+
+    # Another worker claims INV-1 after this one cached the index
+    server.edit(INVOICE_SHEET_ID, "Sheet1!C3:E3", [["true", "Other worker", "2024-01-01T00:00:00"]])
+    server.requests.clear()
+    result = await claim(invoice_sheet, "INV-1")
+    claimed_twice = result["status"] != "has_been_claimed"
+    requests = sum(server.requests.values())
+
+    # Staff insert a row at the top, moving every invoice down by one
+    server.insert_row(INVOICE_SHEET_ID, 2, ["MANUAL-1", "10000", "false"])
+    await claim(invoice_sheet, "INV-5")
+    wrong_row = row_of("INV-5")[2:3] != ["true"] or row_of("INV-4")[2:3] == ["true"]
+
+    print(f"\n{name}")
+    print("-" * 50)
+    print(f"Invoice claimed by another worker: {'claimed again' if claimed_twice else 'refused'} "
+          f"({requests} Sheets requests for the claim)")
+    print(f"Claim after a row was inserted: {'written to the wrong row' if wrong_row else 'written to the right row'}")
+
+async def main():
+    print(f"{INVOICES} invoices in the sheet")
+    await run_benchmark("Cached invoice rows", CachedRowsBackend)
+    await run_benchmark("Rows checked before claiming", SheetsStorageBackend)
+    server.stop()
+
+if __name__ == "__main__":
+    asyncio.run(main())
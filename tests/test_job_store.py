@@ -0,0 +1,89 @@
+import asyncio
+import os
+import sys
+import time
+import subprocess
+import tempfile
+from collections import Counter
+from app.services.job_queue import JobQueue
+from app.services.job_store import JobStore
+
+JOBS = 100
+# Seconds each background chat takes
+JOB_DURATION = 0.5
+# The first process is killed this long after accepting the jobs
+CRASH_AFTER = 1.2
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def deliver(delivered_path: str):
+    """Stands in for a background chat: takes a while, then records that the reply was sent"""
+    async def handler(payload):
+        await asyncio.sleep(JOB_DURATION)
+        with open(delivered_path, "a") as f:
+            f.write(f"{payload['message']}\n")
+    return handler
+
+def delivered(delivered_path: str) -> Counter:
+    if not os.path.exists(delivered_path):
+        return Counter()
+    with open(delivered_path) as f:
+        return Counter(f.read().split())
+
+async def accept_then_crash(db_path: str, delivered_path: str):
+    """Child process: accept a burst of chats, then die without shutting down"""
+    store = JobStore(db_path, lease=1.0) if db_path else None
+    queue = JobQueue("chat", workers=20, max_depth=JOBS, store=store)
+    handler = deliver(delivered_path)
+    for index in range(JOBS):
+        payload = {"message": str(index)}
+        queue.submit("chat", lambda payload=payload: handler(payload), payload=payload)
+    await asyncio.sleep(CRASH_AFTER)
+    os._exit(1)
+
+async def restart(db_path: str, delivered_path: str):
+    """Two restarted processes share the journal and replay what the crashed one left"""
+    queues = []
+    for _ in range(2):
+        queue = JobQueue("chat", workers=20, max_depth=JOBS, store=JobStore(db_path, lease=1.0))
+        queue.register("chat", deliver(delivered_path))
+        queues.append(queue)
+
+    start_time = time.perf_counter()
+    for queue in queues:
+        await queue.replay()
+    while sum(queues[0].store.counts("chat").values()) > 0:
+        await asyncio.sleep(0.05)
+    for queue in queues:
+        await queue.stop()
+    return time.perf_counter() - start_time, [queue.completed for queue in queues]
+
+def run_scenario(name: str, journal: bool):
+    directory = tempfile.mkdtemp()
+    db_path = os.path.join(directory, "jobs.db") if journal else ""
+    delivered_path = os.path.join(directory, "delivered.txt")
+
+    # Run as a module from the repository root so the child can import app without PYTHONPATH
+    subprocess.run([sys.executable, "-W", "ignore", "-m", "tests.test_job_store", "crash", db_path, delivered_path],
+                   cwd=REPO_ROOT)
+    before_restart = delivered(delivered_path)
+
+    print(f"\n{name}")
+    print("-" * 50)
+    print(f"Delivered before the crash: {sum(before_restart.values())}/{JOBS}")
+    if journal:
+        duration, completed = asyncio.run(restart(db_path, delivered_path))
+        print(f"Replayed after restart in {duration:.2f}s, split between two processes: {completed}")
+    result = delivered(delivered_path)
+    print(f"Delivered in total: {len(result)}/{JOBS} "
+          f"(lost {JOBS - len(result)}, delivered twice {sum(1 for count in result.values() if count > 1)})")
+
+def main():
+    print(f"{JOBS} chats of {JOB_DURATION}s accepted by 20 workers, process killed after {CRASH_AFTER}s")
+    run_scenario("In-memory queue", journal=False)
+    run_scenario("Journalled queue", journal=True)
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "crash":
+        asyncio.run(accept_then_crash(sys.argv[2], sys.argv[3]))
+    else:
+        main()
@@ -0,0 +1,68 @@
+import asyncio
+import time
+from functools import partial
+from statistics import mean, median
+import os
+import httpx
+from openai import OpenAI, AsyncOpenAI
+from app.services.openai_service import OpenAIAssistantService
+from app.models.assistant_models import ChatRequest, ChatMessage
+from tests.fake_openai_api import FakeOpenAIAPI
+
+# Simulated OpenAI API round trip in seconds
+OPENAI_LATENCY = float(os.getenv("OPENAI_LATENCY", "0.2"))
+
+class SyncClientService(OpenAIAssistantService):
+    """Previous behaviour: the sync client, with every call pushed onto the default executor"""
+    def __init__(self, client):
+        super().__init__(client, stream_runs=False, combined_runs=False)
+
+    async def _request(self, func, *args, **kwargs):
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(None, partial(func, *args, **kwargs))
+
+    async def _start_run(self, thread_id, assistant_id, content, **kwargs):
+        if not thread_id:
+            thread_id = (await self._request(self.client.beta.threads.create)).id
+        await self._request(self.client.beta.threads.messages.create, thread_id=thread_id, role="user", content=content)
+        return await self._request(self.client.beta.threads.runs.create, thread_id=thread_id, assistant_id=assistant_id)
+
+async def timed_chat(service: OpenAIAssistantService, index: int):
+    start_time = time.perf_counter()
+    try:
+        response = await service.chat(ChatRequest(
+            assistant_id="asst_benchmark",
+            messages=[ChatMessage(role="user", content=f"Halo, saya pelanggan {index}")]
+        ))
+        success = response.status == "completed"
+    except Exception:
+        success = False
+    return success, time.perf_counter() - start_time
+
+async def run_benchmark(name: str, service: OpenAIAssistantService, concurrent_chats: int):
+    print(f"\n{name} with {concurrent_chats} concurrent chats")
+    print("-" * 50)
+
+    start_time = time.perf_counter()
+    results = await asyncio.gather(*[timed_chat(service, i) for i in range(concurrent_chats)])
+    total_time = time.perf_counter() - start_time
+
+    durations = [r[1] for r in results]
+    print(f"Successful chats: {sum(1 for r in results if r[0])}/{concurrent_chats}")
+    print(f"Total time: {total_time:.2f}s")
+    print(f"Chats per second: {concurrent_chats/total_time:.2f}")
+    print(f"Latency (seconds): average {mean(durations):.2f}, median {median(durations):.2f}, max {max(durations):.2f}")
+
+async def main():
+    for chats in [5, 20, 100]:
+        api = FakeOpenAIAPI(latency=OPENAI_LATENCY)
+        before = SyncClientService(OpenAI(api_key="test", http_client=httpx.Client(transport=api.sync_transport())))
+        await run_benchmark("Before (sync client on the default executor)", before, chats)
+
+        api = FakeOpenAIAPI(latency=OPENAI_LATENCY)
+        after = OpenAIAssistantService(AsyncOpenAI(api_key="test", http_client=httpx.AsyncClient(transport=api.async_transport())),
+                                       stream_runs=False, combined_runs=False)
+        await run_benchmark("After (shared AsyncOpenAI client)", after, chats)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,44 @@
+import asyncio
+import time
+from statistics import mean, median
+import os
+import httpx
+from openai import AsyncOpenAI
+from app.services.openai_service import OpenAIAssistantService
+from app.models.assistant_models import ChatRequest, ChatMessage
+from tests.fake_openai_api import FakeOpenAIAPI
+
+# Simulated OpenAI API round trip, and how long the model works on each run step, in seconds
+OPENAI_LATENCY = float(os.getenv("OPENAI_LATENCY", "0.1"))
+RUN_DURATION = float(os.getenv("RUN_DURATION", "1.3"))
+
+async def timed_chat(service: OpenAIAssistantService, index: int):
+    start_time = time.perf_counter()
+    response = await service.chat(ChatRequest(
+        assistant_id="asst_benchmark",
+        messages=[ChatMessage(role="user", content=f"Menu apa saja yang ada? ({index})")]
+    ))
+    reply = next((msg.content for msg in response.messages if msg.role == "assistant"), None)
+    return reply is not None and response.status == "completed", time.perf_counter() - start_time
+
+async def run_benchmark(name: str, stream_runs: bool, concurrent_chats: int, tool_calls=None):
+    api = FakeOpenAIAPI(latency=OPENAI_LATENCY, run_duration=RUN_DURATION, tool_calls=tool_calls)
+    client = AsyncOpenAI(api_key="test", http_client=httpx.AsyncClient(transport=api.async_transport()))
+    service = OpenAIAssistantService(client, stream_runs=stream_runs)
+
+    print(f"\n{name} with {concurrent_chats} concurrent chats")
+    print("-" * 50)
+    results = await asyncio.gather(*[timed_chat(service, i) for i in range(concurrent_chats)])
+    durations = [r[1] for r in results]
+    print(f"Successful chats: {sum(1 for r in results if r[0])}/{concurrent_chats}")
+    print(f"Reply latency (seconds): average {mean(durations):.2f}, median {median(durations):.2f}, max {max(durations):.2f}")
+    print(f"API requests: {dict(api.requests)}")
+
+async def main():
+    for tool_calls in [None, {"get_menu": {"category": "all"}}]:
+        label = "with a tool call" if tool_calls else "without tools"
+        await run_benchmark(f"Polling every second, {label}", False, 20, tool_calls)
+        await run_benchmark(f"Streaming, {label}", True, 20, tool_calls)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,125 @@
+import asyncio
+import json
+import time
+from collections import Counter
+from statistics import mean, median
+import os
+import httpx
+from openai import AsyncOpenAI
+from app.services import openai_service
+from app.services.openai_service import OpenAIAssistantService
+from app.services.function_registry import RegisteredFunction
+from app.models.assistant_models import Action, ChatRequest, ChatMessage
+from tests.fake_openai_api import FakeOpenAIAPI
+
+# Simulated OpenAI API round trip in seconds
+OPENAI_LATENCY = float(os.getenv("OPENAI_LATENCY", "0.05"))
+
+# Simulated time each tool takes in seconds and whether it only reads data; None hangs
+TOOLS = {
+    "get_stamp_loyalty": (0.8, True),
+    "get_menu": (0.3, True),
+    "get_karyawan": (0.5, True),
+    "get_invoice_status": (None, True),
+    "add_stamps": (1.5, False),
+}
+
+# What happened to each tool call: started, finished or cancelled
+calls = Counter()
+
+def sleeping_tool(name: str, duration):
+    async def tool(**arguments):
+        calls[f"{name} started"] += 1
+        try:
+            await asyncio.sleep(duration if duration is not None else 3600)
+        except asyncio.CancelledError:
+            calls[f"{name} cancelled"] += 1
+            raise
+        calls[f"{name} finished"] += 1
+        return {"status": "success", "function": name}
+    return tool
+
+class StubRegistry:
+    """Registry entries whose functions sleep instead of touching storage"""
+    def __init__(self):
+        self._entries = {
+            name: RegisteredFunction(
+                Action(name=name, description=name, parameters=[], function_path=f"tests.{name}", read_only=read_only),
+                sleeping_tool(name, duration)
+            )
+            for name, (duration, read_only) in TOOLS.items()
+        }
+
+    def get(self, name: str) -> RegisteredFunction:
+        return self._entries[name]
+
+class RecordingService(OpenAIAssistantService):
+    """Runs the real tool call path and notes the outputs sent back to the run"""
+    outputs = Counter()
+
+    async def _run_tool_calls(self, tool_calls):
+        tool_outputs = await super()._run_tool_calls(tool_calls)
+        for tool_output in tool_outputs:
+            error = json.loads(tool_output["output"]).get("error")
+            self.outputs[error["type"] if error else "success"] += 1
+        return tool_outputs
+
+class SequentialToolsService(RecordingService):
+    """Previous behaviour: tools run one after another and the first failure aborts the chat"""
+    async def _run_tool_calls(self, tool_calls):
+        tool_outputs = []
+        for tool_call in tool_calls:
+            result = await self._execute_function(tool_call.function.name, json.loads(tool_call.function.arguments))
+            tool_outputs.append({"tool_call_id": tool_call.id, "output": json.dumps(result)})
+            self.outputs["success"] += 1
+        return tool_outputs
+
+async def timed_chat(service: OpenAIAssistantService, index: int):
+    start_time = time.perf_counter()
+    try:
+        response = await service.chat(ChatRequest(
+            assistant_id="asst_benchmark",
+            messages=[ChatMessage(role="user", content=f"Berapa stamp saya dan apa menunya? {index}")]
+        ))
+        success = response.status == "completed"
+    except Exception:
+        success = False
+    return success, time.perf_counter() - start_time
+
+async def run_benchmark(name: str, service_class, tools, chats: int = 10):
+    api = FakeOpenAIAPI(latency=OPENAI_LATENCY, tool_calls={tool: {} for tool in tools})
+    service = service_class(AsyncOpenAI(api_key="test", http_client=httpx.AsyncClient(transport=api.async_transport())))
+    calls.clear()
+    service.outputs = Counter()
+
+    results = await asyncio.gather(*[timed_chat(service, i) for i in range(chats)])
+    durations = [r[1] for r in results]
+    # Writers the run stopped waiting for finish in the background
+    await asyncio.gather(*openai_service._writer_tasks, return_exceptions=True)
+    print(f"{name:<24} completed {sum(1 for r in results if r[0])}/{chats}, "
+          f"latency average {mean(durations):.2f}s median {median(durations):.2f}s")
+    print(f"{'':<24} tool outputs {dict(service.outputs)}")
+    if "add_stamps" in tools:
+        print(f"{'':<24} add_stamps started {calls['add_stamps started']}, finished {calls['add_stamps finished']}, "
+              f"cancelled {calls['add_stamps cancelled']}")
+    if "get_invoice_status" in tools:
+        print(f"{'':<24} get_invoice_status cancelled {calls['get_invoice_status cancelled']}")
+
+async def main():
+    openai_service.function_registry = StubRegistry()
+    openai_service.OPENAI_TOOL_TIMEOUT = 1.0
+    scenarios = [
+        ("Loyalty lookup + menu", ["get_stamp_loyalty", "get_menu"]),
+        ("Three lookups", ["get_stamp_loyalty", "get_menu", "get_karyawan"]),
+        ("Lookups + a hanging lookup", ["get_stamp_loyalty", "get_menu", "get_invoice_status"]),
+        ("Lookup + a slow writer", ["get_menu", "add_stamps"]),
+    ]
+    for title, tools in scenarios:
+        slowest = max(TOOLS[t][0] or openai_service.OPENAI_TOOL_TIMEOUT for t in tools)
+        print(f"\n{title} (slowest tool {slowest}s, time limit {openai_service.OPENAI_TOOL_TIMEOUT}s)")
+        print("-" * 50)
+        await run_benchmark("Sequential tool calls", SequentialToolsService, tools)
+        await run_benchmark("Parallel tool calls", RecordingService, tools)
+
+if __name__ == "__main__":
+    asyncio.run(main())
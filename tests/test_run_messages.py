@@ -0,0 +1,78 @@
+import asyncio
+import time
+from statistics import mean, median
+import os
+import httpx
+from openai import AsyncOpenAI
+from app.services import openai_service
+from app.services.openai_service import OpenAIAssistantService
+from app.services.thread_pool import WarmThreadPool
+from app.models.assistant_models import ChatRequest, ChatMessage
+from tests.fake_openai_api import FakeOpenAIAPI
+
+# Simulated OpenAI API round trip in seconds
+OPENAI_LATENCY = float(os.getenv("OPENAI_LATENCY", "0.05"))
+CUSTOMERS = 20
+TURNS = 8
+REPLY = "Terima kasih! Stamp Anda saat ini 7. Kumpulkan 10 stamp untuk mendapatkan minuman gratis. " * 6
+
+class LastTenMessagesService(OpenAIAssistantService):
+    """Previous behaviour: list and convert the 10 newest thread messages after every run"""
+    async def _list_run_messages(self, thread_id, run_id):
+        messages = await self._request(self.client.beta.threads.messages.list, thread_id=thread_id, order="desc", limit=10)
+        return [
+            ChatMessage(role=msg.role, content=next((c.text.value for c in msg.content if c.type == "text"), ""))
+            for msg in messages.data
+        ]
+
+class CountingTransport(httpx.AsyncBaseTransport):
+    """Counts bytes of messages.list responses"""
+    def __init__(self, transport: httpx.AsyncBaseTransport):
+        self.transport = transport
+        self.list_bytes = 0
+
+    async def handle_async_request(self, request):
+        response = await self.transport.handle_async_request(request)
+        if request.method == "GET" and request.url.path.endswith("/messages"):
+            await response.aread()
+            self.list_bytes += len(response.content)
+        return response
+
+async def conversation(service: OpenAIAssistantService, index: int):
+    thread_id = None
+    durations = []
+    replies_ok = True
+    for turn in range(TURNS):
+        start_time = time.perf_counter()
+        response = await service.chat(ChatRequest(
+            assistant_id="asst_benchmark",
+            thread_id=thread_id,
+            messages=[ChatMessage(role="user", content=f"Pelanggan {index}, pesan {turn}")]
+        ))
+        durations.append(time.perf_counter() - start_time)
+        thread_id = response.thread_id
+        newest_reply = next((m for m in response.messages if m.role == "assistant"), None)
+        replies_ok = replies_ok and newest_reply is not None and newest_reply.content == REPLY
+    return replies_ok, durations
+
+async def run_benchmark(name: str, service_class):
+    api = FakeOpenAIAPI(latency=OPENAI_LATENCY, reply=REPLY)
+    transport = CountingTransport(api.async_transport())
+    service = service_class(AsyncOpenAI(api_key="test", http_client=httpx.AsyncClient(transport=transport)), stream_runs=False)
+
+    results = await asyncio.gather(*[conversation(service, i) for i in range(CUSTOMERS)])
+    durations = [d for r in results for d in r[1]]
+    turns = CUSTOMERS * TURNS
+    print(f"{name:<22} correct replies {sum(1 for r in results if r[0])}/{CUSTOMERS} conversations, "
+          f"messages.list {transport.list_bytes / turns / 1024:.1f} KiB per turn, "
+          f"turn latency average {mean(durations):.2f}s median {median(durations):.2f}s")
+
+async def main():
+    openai_service.warm_thread_pool = WarmThreadPool(size=0)
+    print(f"{CUSTOMERS} conversations of {TURNS} turns, polled runs")
+    print("-" * 50)
+    await run_benchmark("Last 10 messages", LastTenMessagesService)
+    await run_benchmark("This run's messages", OpenAIAssistantService)
+
+if __name__ == "__main__":
+    asyncio.run(main())
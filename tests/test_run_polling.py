@@ -0,0 +1,81 @@
+import asyncio
+import random
+import time
+from statistics import mean, median
+import os
+import httpx
+from openai import AsyncOpenAI
+from app.services import openai_service
+from app.services.openai_service import OpenAIAssistantService
+from app.services.run_poller import RunPoller
+from app.models.assistant_models import RunStatus
+from tests.fake_openai_api import FakeOpenAIAPI
+
+# Simulated OpenAI API round trip in seconds
+OPENAI_LATENCY = float(os.getenv("OPENAI_LATENCY", "0.05"))
+# Runs vary this much either way around the nominal duration, as real ones do
+RUN_DURATION_SPREAD = 0.2
+# Batches of concurrent runs per duration; the first ones only warm up the adaptive poller
+WAVES = 4
+WARMUP_WAVES = 1
+
+class VaryingRunsAPI(FakeOpenAIAPI):
+    """Each run takes the nominal duration give or take RUN_DURATION_SPREAD"""
+    def _create_run(self, thread_id, assistant_id):
+        run = super()._create_run(thread_id, assistant_id)
+        run["_duration"] = self.run_duration * random.uniform(1 - RUN_DURATION_SPREAD, 1 + RUN_DURATION_SPREAD)
+        return run
+
+    def _run_duration(self, run):
+        return run["_duration"]
+
+class FixedIntervalService(OpenAIAssistantService):
+    """Previous behaviour: poll the run once a second"""
+    async def wait_for_completion(self, thread_id: str, run_id: str, timeout: int = 300) -> RunStatus:
+        start_time = asyncio.get_event_loop().time()
+        polls = 0
+        while (asyncio.get_event_loop().time() - start_time) < timeout:
+            run_status = await self.get_run_status(thread_id, run_id)
+            polls += 1
+            if run_status.status in ["completed", "failed", "expired"]:
+                run_status.polls = polls
+                return run_status
+            await asyncio.sleep(1)
+        return RunStatus(status="timeout", polls=polls)
+
+async def timed_wait(service: OpenAIAssistantService, api: FakeOpenAIAPI):
+    thread = await service.create_thread()
+    run = await service.run_assistant("asst_benchmark", thread.thread_id)
+    run_id = run.response_data["id"]
+    start_time = time.perf_counter()
+    status = await service.wait_for_completion(thread.thread_id, run_id)
+    # Time between the run finishing and the caller finding out
+    lag = time.perf_counter() - start_time - api.runs[run_id]["_duration"]
+    return status.status == "completed", lag, status.polls
+
+async def run_benchmark(name: str, service_class, run_duration: float, runs: int = 10):
+    api = VaryingRunsAPI(latency=OPENAI_LATENCY, run_duration=run_duration)
+    service = service_class(AsyncOpenAI(api_key="test", http_client=httpx.AsyncClient(transport=api.async_transport())))
+    # Each duration starts from a poller that has seen no runs yet
+    openai_service.run_poller = RunPoller()
+
+    results = []
+    for wave in range(WAVES):
+        wave_results = await asyncio.gather(*[timed_wait(service, api) for _ in range(runs)])
+        if wave >= WARMUP_WAVES:
+            results.extend(wave_results)
+    lags = [r[1] for r in results]
+    polls = [r[2] for r in results]
+    print(f"{name:<28} completed {sum(1 for r in results if r[0])}/{len(results)}, "
+          f"detection lag average {mean(lags):.2f}s median {median(lags):.2f}s, polls per run {mean(polls):.1f}")
+
+async def main():
+    print(f"Run durations vary by ±{RUN_DURATION_SPREAD:.0%}; the first {WARMUP_WAVES} of {WAVES} batches are not counted")
+    for run_duration in [0.3, 1.5, 6.0, 20.0]:
+        print(f"\nRuns taking {run_duration}s")
+        print("-" * 50)
+        await run_benchmark("Fixed 1s interval", FixedIntervalService, run_duration)
+        await run_benchmark("Adaptive backoff", OpenAIAssistantService, run_duration)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,75 @@
+import asyncio
+import time
+from statistics import mean
+import os
+import httpx
+from openai import AsyncOpenAI
+from app.services import openai_service
+from app.services.openai_service import OpenAIAssistantService
+from app.services.run_serializer import ThreadRunSerializer
+from app.services.thread_pool import WarmThreadPool
+from app.models.assistant_models import ChatRequest, ChatMessage
+from tests.fake_openai_api import FakeOpenAIAPI
+
+# Simulated OpenAI API round trip in seconds
+OPENAI_LATENCY = float(os.getenv("OPENAI_LATENCY", "0.1"))
+CUSTOMERS = 20
+# Each customer sends a burst of messages this far apart while their first run is still going
+BURST = 4
+BURST_INTERVAL = 0.3
+RUN_DURATION = 1.5
+
+class UnserializedService(OpenAIAssistantService):
+    """Previous behaviour: every message starts its own run straight away"""
+    async def chat(self, request):
+        try:
+            deadline = asyncio.get_running_loop().time() + openai_service.OPENAI_CHAT_BUDGET
+            return await self._run_message(request.thread_id, request.assistant_id, request.messages[-1].content, deadline)
+        except Exception as e:
+            raise ValueError(f"Chat error: {str(e)}")
+
+async def customer(service: OpenAIAssistantService, client: AsyncOpenAI, index: int):
+    thread_id = (await client.beta.threads.create()).id
+
+    async def send(message: int):
+        await asyncio.sleep(message * BURST_INTERVAL)
+        try:
+            return await service.chat(ChatRequest(
+                assistant_id="asst_benchmark",
+                thread_id=thread_id,
+                messages=[ChatMessage(role="user", content=f"Pelanggan {index}, pesan {message}")]
+            ))
+        except ValueError:
+            return None
+
+    start_time = time.perf_counter()
+    responses = await asyncio.gather(*[send(i) for i in range(BURST)])
+    replies = sum(1 for r in responses if r is not None and r.messages)
+    lost = sum(1 for r in responses if r is None)
+    return replies, lost, time.perf_counter() - start_time
+
+async def run_benchmark(name: str, service_class):
+    api = FakeOpenAIAPI(latency=OPENAI_LATENCY, run_duration=RUN_DURATION)
+    client = AsyncOpenAI(api_key="test", http_client=httpx.AsyncClient(transport=api.async_transport()))
+    serializer = ThreadRunSerializer()
+    openai_service.thread_run_serializer = serializer
+
+    results = await asyncio.gather(*[customer(service_class(client), client, i) for i in range(CUSTOMERS)])
+    # Customer messages that reached a thread, merged or not
+    delivered = sum(
+        message["content"][0]["text"]["value"].count("pesan")
+        for messages in api.threads.values() for message in messages if message["role"] == "user"
+    )
+    print(f"{name:<26} replies sent {sum(r[0] for r in results)}, messages lost to errors {sum(r[1] for r in results)}, "
+          f"messages reaching the assistant {delivered}/{CUSTOMERS * BURST}, runs {api.requests['runs.create']}, "
+          f"rejected requests {api.requests['rejected_active_run']}, burst handled in {mean(r[2] for r in results):.2f}s")
+
+async def main():
+    openai_service.warm_thread_pool = WarmThreadPool(size=0)
+    print(f"{CUSTOMERS} customers each sending {BURST} messages {BURST_INTERVAL}s apart; runs take {RUN_DURATION}s")
+    print("-" * 50)
+    await run_benchmark("One run per message", UnserializedService)
+    await run_benchmark("Serialized and merged", OpenAIAssistantService)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,73 @@
+import asyncio
+import time
+import os
+from tests.fake_sheets_server import FakeSheetsServer
+
+# Runs against a local fake Sheets server, no Google credentials needed
+CUSTOMERS = int(os.getenv("TEST_CUSTOMERS", "5000"))
+SHEET_ID = "loyalty"
+
+server = FakeSheetsServer().start()
+# The app reads these when it is imported
+os.environ["SHEETS_EMULATOR_HOST"] = server.host
+os.environ["LOYALTY_SHEET_ID"] = SHEET_ID
+os.environ.setdefault("SHEETS_READ_QUOTA_PER_MINUTE", "100000")
+os.environ.setdefault("SHEETS_WRITE_QUOTA_PER_MINUTE", "100000")
+
+from app.storage.sheets_backend import SheetsStorageBackend
+from app.storage.sheets_sync import CustomerSheetSync
+
+def index_matches_sheet(backend: SheetsStorageBackend) -> bool:
+    """Compare the patched index with one built from a full read of the sheet"""
+    expected = SheetsStorageBackend()
+    expected._build_customer_index(server.spreadsheets[SHEET_ID].read("Sheet1!A2:F"))
+    return expected._customers == backend._customers
+
+async def timed_sync(name: str, sync: CustomerSheetSync):
+    server.requests.clear()
+    start_time = time.perf_counter()
+    changed = await sync.sync_once()
+    duration = time.perf_counter() - start_time
+    print(f"\n{name}")
+    print("-" * 50)
+    print(f"Changed rows: {changed}")
+    print(f"Time: {duration * 1000:.1f}ms")
+    print(f"Requests: {dict(server.requests)}")
+    print(f"Index matches sheet: {index_matches_sheet(sync.backend)}")
+
+async def main():
+    server.add_spreadsheet(SHEET_ID, [["Name", "Phone", "Email", "Stamps", "Chat Status", "Thread ID"]] + [
+        [f"Customer {i}", f"628{i:09d}", "", str(i % 10), "", f"thread_{i}"] for i in range(CUSTOMERS)
+    ])
+    backend = SheetsStorageBackend()
+    sync = CustomerSheetSync(backend)
+
+    server.requests.clear()
+    start_time = time.perf_counter()
+    await backend.get_customer("628000000001")
+    print(f"Initial load of {CUSTOMERS} customers: {(time.perf_counter() - start_time) * 1000:.1f}ms, {dict(server.requests)}")
+
+    await timed_sync("First sync (no revision known yet)", sync)
+    await timed_sync("Sheet unchanged", sync)
+
+    # Staff switch a few customers to live chat and correct someone's stamps
+    for i in range(0, CUSTOMERS, CUSTOMERS // 10):
+        server.edit(SHEET_ID, f"Sheet1!E{i + 2}", [["Live Chat"]])
+    server.edit(SHEET_ID, "Sheet1!D5", [["7"]])
+    await timed_sync("Ten chat status edits and a stamp correction", sync)
+    print(f"Stamps after correction: {(await backend.get_customer('628000000003'))['stamps']}")
+
+    # A row deleted by hand shifts every customer below it up by one
+    server.delete_row(SHEET_ID, CUSTOMERS // 2)
+    await timed_sync("Row deleted in the middle", sync)
+
+    # A name change made by the app while the sheet is being read must survive the sync
+    await backend.update_customer_fields("628000000010", {"name": "Local Edit"})
+    await timed_sync("Local write flushed before reading", sync)
+    print(f"Local edit kept: {(await backend.get_customer('628000000010'))['name'] == 'Local Edit'}")
+
+    await backend.close()
+    server.stop()
+
+if __name__ == "__main__":
+    asyncio.run(main())
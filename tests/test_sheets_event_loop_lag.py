@@ -0,0 +1,102 @@
+import asyncio
+import time
+from statistics import mean, median
+import os
+from app.utils.sheets_base import GoogleSheetsBase
+from app.utils.sheets_rate_limiter import sheets_rate_limiter, TokenBucket
+
+# Simulated Google Sheets round trip in seconds
+SHEETS_LATENCY = float(os.getenv("SHEETS_LATENCY", "0.2"))
+# Interval at which the probe expects to be woken up
+PROBE_INTERVAL = 0.01
+# Number of Sheets requests actually executed, per method
+executed = {"get": 0, "update": 0}
+
+class FakeRequest:
+    """Stand-in for a googleapiclient request whose execute() blocks like the real one"""
+    def __init__(self, method: str):
+        self.method = method
+
+    def execute(self, http=None):
+        executed[self.method] += 1
+        time.sleep(SHEETS_LATENCY)
+        return {"values": [["Budi", "6281234567890", "", "3", "", "thread_abc"]]}
+
+class FakeService:
+    def spreadsheets(self):
+        return self
+
+    def values(self):
+        return self
+
+    def get(self, **kwargs):
+        return FakeRequest("get")
+
+    def update(self, **kwargs):
+        return FakeRequest("update")
+
+class ExecutorSheet(GoogleSheetsBase):
+    """Current behaviour: requests run on the bounded Sheets executor"""
+    def __init__(self):
+        super().__init__(sheet_id="benchmark", range_name="Sheet1!A2:F")
+        self._service = FakeService()
+
+    def _authorized_http(self):
+        return None
+
+class BlockingSheet(ExecutorSheet):
+    """Previous behaviour: every read is its own request, executed directly inside the coroutine"""
+    async def _execute(self, build_request, **kwargs):
+        return build_request(self.service).execute()
+
+    async def get_values(self, range_name=None):
+        return await self._fetch_values(range_name if range_name else self.range_name)
+
+async def simulated_webhook(sheet: GoogleSheetsBase):
+    """A webhook touches Sheets twice: a lookup and a thread_id update"""
+    await sheet.get_values()
+    await sheet.update_values("Sheet1!F2", [["thread_abc"]])
+
+async def measure_loop_lag(stop: asyncio.Event, lags: list):
+    """Record how late the event loop wakes up a coroutine that sleeps PROBE_INTERVAL"""
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        start = loop.time()
+        await asyncio.sleep(PROBE_INTERVAL)
+        lags.append(loop.time() - start - PROBE_INTERVAL)
+
+async def run_benchmark(name: str, sheet: GoogleSheetsBase, concurrent_webhooks: int):
+    print(f"\n{name} with {concurrent_webhooks} concurrent webhooks")
+    print("-" * 50)
+
+    stop = asyncio.Event()
+    lags = []
+    probe = asyncio.create_task(measure_loop_lag(stop, lags))
+
+    executed.update(get=0, update=0)
+    start_time = time.time()
+    await asyncio.gather(*[simulated_webhook(sheet) for _ in range(concurrent_webhooks)])
+    total_time = time.time() - start_time
+
+    stop.set()
+    await probe
+
+    print(f"Total time: {total_time:.2f}s")
+    print(f"Webhooks per second: {concurrent_webhooks/total_time:.2f}")
+    print(f"Sheets reads: {executed['get']}, writes: {executed['update']}")
+    print("\nEvent loop lag (milliseconds):")
+    print(f"Average: {mean(lags) * 1000:.1f}")
+    print(f"Median: {median(lags) * 1000:.1f}")
+    print(f"Max: {max(lags) * 1000:.1f}")
+
+async def main():
+    concurrent_webhooks = [5, 20, 50]
+    # Measure the event loop only; quota throttling has its own benchmark
+    sheets_rate_limiter.buckets = {kind: TokenBucket(kind, 1e6) for kind in ("read", "write")}
+
+    for webhooks in concurrent_webhooks:
+        await run_benchmark("Before (blocking execute)", BlockingSheet(), webhooks)
+        await run_benchmark("After (Sheets executor, coalesced reads)", ExecutorSheet(), webhooks)
+
+if __name__ == "__main__":
+    asyncio.run(main())
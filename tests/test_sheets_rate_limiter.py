@@ -0,0 +1,95 @@
+import asyncio
+import time
+from collections import deque
+from statistics import mean, median
+import os
+from app.utils.sheets_base import GoogleSheetsBase
+from app.utils.sheets_rate_limiter import sheets_rate_limiter, TokenBucket
+
+# Simulated Sheets quota: requests allowed per QUOTA_WINDOW seconds before answering 429
+SHEETS_QUOTA = int(os.getenv("SHEETS_QUOTA", "20"))
+QUOTA_WINDOW = float(os.getenv("QUOTA_WINDOW", "2.0"))
+SHEETS_LATENCY = float(os.getenv("SHEETS_LATENCY", "0.05"))
+
+class FakeResponse(dict):
+    def __init__(self, status: int):
+        super().__init__()
+        self.status = status
+
+class QuotaError(Exception):
+    """Shaped like googleapiclient.errors.HttpError"""
+    def __init__(self):
+        super().__init__("Quota exceeded")
+        self.resp = FakeResponse(429)
+
+class QuotaSheets:
+    """Fake Sheets service that rejects requests above the quota with 429, like the real API"""
+    def __init__(self):
+        self.sent = deque()
+        self.rejected = 0
+
+    def spreadsheets(self):
+        return self
+
+    def values(self):
+        return self
+
+    def get(self, **kwargs):
+        return self
+
+    def execute(self, http=None):
+        now = time.monotonic()
+        while self.sent and now - self.sent[0] > QUOTA_WINDOW:
+            self.sent.popleft()
+        if len(self.sent) >= SHEETS_QUOTA:
+            self.rejected += 1
+            raise QuotaError()
+        self.sent.append(now)
+        time.sleep(SHEETS_LATENCY)
+        return {"values": [["Budi", "6281234567890"]]}
+
+class QuotaSheet(GoogleSheetsBase):
+    def __init__(self, service: QuotaSheets, index: int):
+        # A distinct range per request, so reads aren't coalesced
+        super().__init__(sheet_id="benchmark", range_name=f"Sheet1!A{index + 2}:F{index + 2}")
+        self._service = service
+
+    def _authorized_http(self):
+        return None
+
+async def timed_read(sheet: GoogleSheetsBase):
+    start_time = time.perf_counter()
+    try:
+        await sheet.get_values()
+        return True, time.perf_counter() - start_time
+    except Exception:
+        return False, time.perf_counter() - start_time
+
+async def run_benchmark(name: str, requests: int, rate_per_minute: float):
+    print(f"\n{name} with {requests} concurrent reads")
+    print("-" * 50)
+
+    sheets_rate_limiter.buckets["read"] = TokenBucket("read", rate_per_minute, burst=SHEETS_QUOTA)
+    service = QuotaSheets()
+
+    start_time = time.time()
+    results = await asyncio.gather(*[timed_read(QuotaSheet(service, i)) for i in range(requests)])
+    total_time = time.time() - start_time
+
+    durations = [r[1] for r in results]
+    print(f"Succeeded: {sum(1 for r in results if r[0])}/{requests}")
+    print(f"429 responses: {service.rejected}")
+    print(f"Total time: {total_time:.2f}s")
+    print(f"Latency (seconds): average {mean(durations):.2f}, median {median(durations):.2f}, max {max(durations):.2f}")
+    print(f"Limiter: {sheets_rate_limiter.metrics()['read']}")
+
+async def main():
+    quota_per_minute = SHEETS_QUOTA * 60 / QUOTA_WINDOW
+
+    for requests in [10, 50, 100]:
+        # A budget far above the quota only relies on retrying the 429s
+        await run_benchmark("Retry only", requests, quota_per_minute * 100)
+        await run_benchmark("Token bucket at quota", requests, quota_per_minute)
+
+if __name__ == "__main__":
+    asyncio.run(main())
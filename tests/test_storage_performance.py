@@ -0,0 +1,62 @@
+import asyncio
+import time
+from statistics import mean, median
+import os
+from app.storage.sqlite_backend import SQLiteStorageBackend
+from app.utils.google_sheets import CustomerSheet
+from app.functions.loyalty_functions import InvoiceSheet
+
+# Runs fully offline against a throwaway SQLite database
+CUSTOMERS = int(os.getenv("TEST_CUSTOMERS", "5000"))
+
+async def timed(operation_func, *args, **kwargs):
+    start_time = time.perf_counter()
+    result = await operation_func(*args, **kwargs)
+    return result, time.perf_counter() - start_time
+
+def print_stats(name: str, durations: list, total_time: float):
+    print(f"\n{name}")
+    print("-" * 50)
+    print(f"Operations: {len(durations)} in {total_time:.2f}s ({len(durations)/total_time:.0f}/s)")
+    print("Timing Statistics (microseconds):")
+    print(f"Average: {mean(durations) * 1e6:.1f}")
+    print(f"Median: {median(durations) * 1e6:.1f}")
+    print(f"Max: {max(durations) * 1e6:.1f}")
+
+async def main():
+    backend = SQLiteStorageBackend(":memory:")
+    customer_sheet = CustomerSheet(backend)
+    invoice_sheet = InvoiceSheet(backend)
+
+    for i in range(CUSTOMERS):
+        await customer_sheet.insert_customer({
+            "name": f"Customer {i}",
+            "phone": f"628{i:09d}",
+            "thread_id": ""
+        })
+
+    # Customer lookups, as done on every webhook
+    start_time = time.perf_counter()
+    results = await asyncio.gather(*[
+        timed(customer_sheet.check_customer_exists, f"628{i:09d}") for i in range(CUSTOMERS)
+    ])
+    print_stats("Customer lookup", [r[1] for r in results], time.perf_counter() - start_time)
+
+    # Invoice claims, two invoices per claim
+    start_time = time.perf_counter()
+    results = await asyncio.gather(*[
+        timed(
+            invoice_sheet.process_invoices,
+            invoices=[{"id": f"INV-{i}-A", "total": "60000"}, {"id": f"INV-{i}-B", "total": "45000"}],
+            metadata={"phone_number": f"628{i:09d}", "customer_name": f"Customer {i}"}
+        )
+        for i in range(min(CUSTOMERS, 500))
+    ])
+    successes = sum(1 for r in results if r[0]["status"] == "success")
+    print_stats("Invoice claim", [r[1] for r in results], time.perf_counter() - start_time)
+    print(f"Successful claims: {successes}/{len(results)}")
+
+    await backend.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
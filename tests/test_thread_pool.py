@@ -0,0 +1,57 @@
+import asyncio
+import time
+from statistics import mean, median
+import os
+import httpx
+from openai import AsyncOpenAI
+from app.services.openai_service import OpenAIAssistantService
+from app.services.thread_pool import WarmThreadPool
+from app.services import openai_service
+from app.models.assistant_models import ChatRequest, ChatMessage
+from tests.fake_openai_api import FakeOpenAIAPI
+
+# Simulated OpenAI API round trip in seconds
+OPENAI_LATENCY = float(os.getenv("OPENAI_LATENCY", "0.2"))
+NEW_CUSTOMERS = 30
+# Seconds between first messages from new customers
+ARRIVAL_INTERVAL = 0.1
+
+async def first_message(service: OpenAIAssistantService, index: int, delay: float):
+    await asyncio.sleep(delay)
+    start_time = time.perf_counter()
+    response = await service.chat(ChatRequest(
+        assistant_id="asst_benchmark",
+        messages=[ChatMessage(role="user", content=f"Halo, saya pelanggan baru {index}")]
+    ))
+    return response.status == "completed", time.perf_counter() - start_time
+
+async def run_benchmark(name: str, pool_size: int):
+    api = FakeOpenAIAPI(latency=OPENAI_LATENCY)
+    client = AsyncOpenAI(api_key="test", http_client=httpx.AsyncClient(transport=api.async_transport()))
+    pool = WarmThreadPool(size=pool_size)
+    pool.client = client
+    openai_service.warm_thread_pool = pool
+    await pool.start()
+    # Let the pool fill as it would between startup and the first webhook
+    await asyncio.sleep(1)
+
+    service = OpenAIAssistantService(client)
+    results = await asyncio.gather(*[
+        first_message(service, i, i * ARRIVAL_INTERVAL) for i in range(NEW_CUSTOMERS)
+    ])
+    await pool.stop()
+
+    durations = [r[1] for r in results]
+    print(f"{name:<22} completed {sum(1 for r in results if r[0])}/{NEW_CUSTOMERS}, "
+          f"first reply average {mean(durations):.2f}s median {median(durations):.2f}s, pool {pool.metrics()}")
+    # Every thread left on the API after shutdown should belong to a customer
+    print(f"{'':<22} threads left after shutdown {len(api.threads)} for {NEW_CUSTOMERS} customers")
+
+async def main():
+    print(f"{NEW_CUSTOMERS} new customers, one every {ARRIVAL_INTERVAL}s")
+    print("-" * 50)
+    await run_benchmark("threads.create inline", 0)
+    await run_benchmark("Warm thread pool", 10)
+
+if __name__ == "__main__":
+    asyncio.run(main())
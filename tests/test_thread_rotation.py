@@ -0,0 +1,84 @@
+import asyncio
+import os
+import time
+import tempfile
+from statistics import mean
+import httpx
+from openai import AsyncOpenAI
+from app.services import openai_service, thread_rotation as thread_rotation_module
+from app.services.openai_service import OpenAIAssistantService
+from app.services.thread_pool import WarmThreadPool
+from app.services.thread_rotation import ThreadRotationPolicy
+from app.utils.usage_store import UsageStore
+from app.models.assistant_models import ChatRequest, ChatMessage
+from tests.fake_openai_api import FakeOpenAIAPI
+
+os.environ.setdefault("WHATSAPP_PHONE_NUMBER_ID", "benchmark")
+os.environ.setdefault("WHATSAPP_ACCESS_TOKEN", "benchmark")
+from app.services import whatsapp_service
+from app.services.whatsapp_service import WhatsAppService
+
+# Simulated OpenAI API round trip, and extra run time per message in the thread, in seconds
+OPENAI_LATENCY = float(os.getenv("OPENAI_LATENCY", "0.02"))
+CONTEXT_LATENCY = float(os.getenv("CONTEXT_LATENCY", "0.01"))
+TURNS = 60
+# Seconds the customer takes to read a reply and write again
+THINK_TIME = 0.3
+PHONE = "628000000001"
+
+async def run_benchmark(name: str, policy: ThreadRotationPolicy, directory: str):
+    api = FakeOpenAIAPI(latency=OPENAI_LATENCY, context_latency=CONTEXT_LATENCY)
+    client = AsyncOpenAI(api_key="test", http_client=httpx.AsyncClient(transport=api.async_transport()))
+    store = UsageStore(os.path.join(directory, f"usage_{policy.max_turns}.db"))
+    openai_service.usage_store = store
+    openai_service.thread_rotation = whatsapp_service.thread_rotation = thread_rotation_module.thread_rotation = policy
+
+    # The customer's row in the sheet; update_thread_id writes the rotated thread to it
+    customer = {"phone": PHONE, "name": "Budi", "thread_id": None}
+
+    async def update_thread_id(row, thread_id):
+        customer["thread_id"] = thread_id
+        return True
+    whatsapp_service.update_thread_id = update_thread_id
+
+    service = WhatsAppService()
+    service.assistant_service = OpenAIAssistantService(client)
+
+    latencies = []
+    for turn in range(TURNS):
+        # What process_webhook does for each message: chat on the stored thread, then rotate if needed
+        start_time = time.perf_counter()
+        response = await service.assistant_service.chat(ChatRequest(
+            assistant_id="asst_benchmark",
+            thread_id=customer["thread_id"],
+            messages=[ChatMessage(role="user", content=f"Pesan ke-{turn}")],
+            phone_number=PHONE
+        ))
+        latencies.append(time.perf_counter() - start_time)
+        if customer["thread_id"] != response.thread_id:
+            customer["thread_id"] = response.thread_id
+        if policy.should_rotate(response.thread_id):
+            service._rotate_thread_later(dict(customer), response.thread_id)
+        await asyncio.sleep(THINK_TIME)
+    await asyncio.gather(*service._rotation_tasks)
+
+    runs = list(reversed(store.runs(phone_number=PHONE, limit=TURNS)))
+    print(f"\n{name}")
+    print("-" * 50)
+    print(f"Reply latency (seconds): first 10 messages {mean(latencies[:10]):.2f}, last 10 {mean(latencies[-10:]):.2f}, "
+          f"max {max(latencies):.2f}")
+    print(f"Prompt tokens per run: first 10 {mean(run['prompt_tokens'] for run in runs[:10]):.0f}, "
+          f"last 10 {mean(run['prompt_tokens'] for run in runs[-10:]):.0f}")
+    totals = store.totals()
+    print(f"Tokens {totals['total_tokens']}, cost ${totals['cost']:.4f}; rotations {policy.rotations}, "
+          f"summaries requested {api.requests['chat.completions.create']}")
+
+async def main():
+    openai_service.warm_thread_pool = WarmThreadPool(size=0)
+    directory = tempfile.mkdtemp()
+    print(f"One customer sending {TURNS} messages; each message in a thread adds {CONTEXT_LATENCY * 1000:.0f}ms to a run")
+    await run_benchmark("One thread forever", ThreadRotationPolicy(max_prompt_tokens=0, max_turns=0), directory)
+    await run_benchmark("Rotated at 3000 prompt tokens", ThreadRotationPolicy(max_prompt_tokens=3000, max_turns=0), directory)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,89 @@
+import asyncio
+import time
+from statistics import mean, median
+import os
+from app.storage.sqlite_backend import SQLiteStorageBackend
+from app.utils.google_sheets import CustomerSheet
+from app.utils.tool_result_cache import tool_result_cache
+from app.functions.loyalty_functions import loyalty_sheet
+from app.services.function_registry import function_registry
+from app.services.openai_service import OpenAIAssistantService
+
+# Simulated Google Sheets read in seconds
+SHEETS_LATENCY = float(os.getenv("SHEETS_LATENCY", "0.15"))
+CUSTOMERS = 50
+LOOKUPS_PER_CUSTOMER = 4
+
+class SlowReadBackend(SQLiteStorageBackend):
+    """SQLite storage whose customer lookups take as long as a Sheets read"""
+    def __init__(self):
+        super().__init__(":memory:")
+        self.reads = 0
+
+    async def get_customer(self, phone_number):
+        self.reads += 1
+        await asyncio.sleep(SHEETS_LATENCY)
+        return await super().get_customer(phone_number)
+
+class UncachedService(OpenAIAssistantService):
+    """Previous behaviour: every tool call runs the function"""
+    async def _execute_function(self, function_name, arguments):
+        return await function_registry.get(function_name).func(**arguments)
+
+async def timed_lookup(service: OpenAIAssistantService, phone: str):
+    start_time = time.perf_counter()
+    await service._execute_function("get_stamp_loyalty", {"nomor_telepon": phone})
+    return time.perf_counter() - start_time
+
+async def run_benchmark(name: str, service: OpenAIAssistantService, backend: SlowReadBackend):
+    backend.reads = 0
+    tool_result_cache.clear()
+    durations = []
+    start_time = time.perf_counter()
+    # Each customer asks about their stamps several times in one conversation
+    for _ in range(LOOKUPS_PER_CUSTOMER):
+        durations += await asyncio.gather(*[timed_lookup(service, f"628{i:09d}") for i in range(CUSTOMERS)])
+    total_time = time.perf_counter() - start_time
+    print(f"{name:<20} {len(durations)} lookups in {total_time:.2f}s, storage reads {backend.reads}, "
+          f"latency average {mean(durations) * 1e3:.2f}ms median {median(durations) * 1e6:.0f}us")
+
+async def check_invalidation(service: OpenAIAssistantService):
+    phone = f"628{0:09d}"
+    before = await service._execute_function("get_stamp_loyalty", {"nomor_telepon": phone})
+    await loyalty_sheet.add_stamps(phone, 3)
+    after = await service._execute_function("get_stamp_loyalty", {"nomor_telepon": phone})
+    assert int(after["data"]["jumlah_stamp"]) == int(before["data"]["jumlah_stamp"]) + 3, "cached balance served after add_stamps"
+    print(f"Invalidation: balance {before['data']['jumlah_stamp']} -> {after['data']['jumlah_stamp']} right after add_stamps")
+
+async def check_lookup_during_claim(service: OpenAIAssistantService):
+    """A lookup that reads the balance before add_stamps but finishes after it must not cache the old balance"""
+    phone = f"628{1:09d}"
+    tool_result_cache.invalidate("get_stamp_loyalty")
+    before = int((await loyalty_sheet.get_stamp_loyalty(phone))["data"]["jumlah_stamp"])
+    await asyncio.gather(
+        service._execute_function("get_stamp_loyalty", {"nomor_telepon": phone}),
+        loyalty_sheet.add_stamps(phone, 2)
+    )
+    after = await service._execute_function("get_stamp_loyalty", {"nomor_telepon": phone})
+    assert int(after["data"]["jumlah_stamp"]) == before + 2, "balance read before add_stamps was cached after it"
+    print(f"Lookup racing add_stamps: balance {before} -> {after['data']['jumlah_stamp']}, "
+          f"stale results not cached {tool_result_cache.stale_puts}")
+
+async def main():
+    backend = SlowReadBackend()
+    customer_sheet = CustomerSheet(backend)
+    for i in range(CUSTOMERS):
+        await customer_sheet.insert_customer({"name": f"Customer {i}", "phone": f"628{i:09d}", "thread_id": ""})
+    loyalty_sheet._backend = backend
+
+    print(f"{CUSTOMERS} customers, {LOOKUPS_PER_CUSTOMER} stamp lookups each")
+    print("-" * 50)
+    await run_benchmark("Without cache", UncachedService(), backend)
+    await run_benchmark("With result cache", OpenAIAssistantService(), backend)
+    print(f"Cache: {tool_result_cache.metrics()}")
+    print()
+    await check_invalidation(OpenAIAssistantService())
+    await check_lookup_during_claim(OpenAIAssistantService())
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,71 @@
+import asyncio
+import os
+import time
+import tempfile
+import httpx
+from openai import AsyncOpenAI
+from app.services import openai_service
+from app.services.openai_service import OpenAIAssistantService
+from app.services.thread_pool import WarmThreadPool
+from app.utils.usage_store import UsageStore
+from app.models.assistant_models import ChatRequest, ChatMessage
+from tests.fake_openai_api import FakeOpenAIAPI
+
+# Simulated OpenAI API round trip in seconds
+OPENAI_LATENCY = float(os.getenv("OPENAI_LATENCY", "0.02"))
+# Turns per customer: one long conversation among short ones
+CONVERSATIONS = {"628000000001": 25, "628000000002": 3, "628000000003": 3, "628000000004": 2}
+
+class FakeToolsService(OpenAIAssistantService):
+    """Tools answered instantly instead of touching storage"""
+    async def _execute_function(self, function_name, arguments):
+        return {"status": "success", "function": function_name}
+
+async def converse(service: OpenAIAssistantService, phone_number: str, turns: int):
+    thread_id = None
+    for turn in range(turns):
+        response = await service.chat(ChatRequest(
+            assistant_id="asst_benchmark",
+            thread_id=thread_id,
+            messages=[ChatMessage(role="user", content=f"Pesan {turn}")],
+            phone_number=phone_number
+        ))
+        thread_id = response.thread_id
+
+async def run_benchmark(name: str, stream_runs: bool, store: UsageStore):
+    api = FakeOpenAIAPI(latency=OPENAI_LATENCY, tool_calls={"get_stamp_loyalty": {"phone_number": "628000000001"}})
+    client = AsyncOpenAI(api_key="test", http_client=httpx.AsyncClient(transport=api.async_transport()))
+    service = FakeToolsService(client, stream_runs=stream_runs)
+    await asyncio.gather(*[converse(service, phone, turns) for phone, turns in CONVERSATIONS.items()])
+
+    totals = store.totals()
+    print(f"\n{name}")
+    print("-" * 50)
+    print(f"Recorded {totals['runs']}/{sum(CONVERSATIONS.values())} runs, {totals['total_tokens']} tokens, ${totals['cost']:.4f}")
+    for group in store.summary("phone"):
+        print(f"  {group['key']}: {group['runs']} runs, {group['total_tokens']} tokens, "
+              f"avg prompt {group['average_prompt_tokens']:.0f}, ${group['cost']:.4f}")
+    tools = store.summary("tool")
+    print("  Runs calling tools: " + ", ".join(f"{tool['key']} {tool['runs']}" for tool in tools))
+
+def time_recording(store: UsageStore, count: int = 2000):
+    start_time = time.perf_counter()
+    for index in range(count):
+        store.record(f"run_timing_{index}", "thread_timing", "asst_benchmark", "gpt-4o-mini", "completed",
+                     1000, 50, phone_number="628000000009", tools=["get_menu"], duration=1.0)
+    return (time.perf_counter() - start_time) / count
+
+async def main():
+    openai_service.warm_thread_pool = WarmThreadPool(size=0)
+    directory = tempfile.mkdtemp()
+    print(f"{len(CONVERSATIONS)} customers, {sum(CONVERSATIONS.values())} turns, one tool call per run")
+    for name, stream_runs in (("Polled runs", False), ("Streamed runs", True)):
+        store = UsageStore(os.path.join(directory, f"usage_{stream_runs}.db"))
+        openai_service.usage_store = store
+        await run_benchmark(name, stream_runs, store)
+
+    cost = time_recording(UsageStore(os.path.join(directory, "usage_timing.db")))
+    print(f"\nRecording a run takes {cost * 1e6:.0f}µs")
+
+if __name__ == "__main__":
+    asyncio.run(main())